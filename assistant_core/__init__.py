@@ -0,0 +1 @@
+"""Shared infrastructure for the CFD Assistant Suite (engines, caches, ingestion helpers)"""
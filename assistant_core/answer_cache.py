@@ -0,0 +1,141 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace so trivial rephrasings share a key"""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def exact_key(question, chunk_ids, history_hash):
+    """Cache key: normalized question + retrieved chunk IDs + chat-history hash"""
+    raw = "\x1f".join([normalize_question(question), ",".join(chunk_ids), history_hash])
+    return hash_text(raw)
+
+
+class AnswerCache:
+    """Persistent (SQLite) cache of generated answers.
+
+    Lookups happen in two ways:
+      * exact: by exact_key(), after retrieval, which skips the LLM call
+      * near-duplicate: by cosine similarity of the question embedding, before
+        retrieval, which skips the vector search as well
+
+    Every entry is tagged with the collection version it was generated against
+    (see collection_state); entries from older versions are purged on first use.
+    Entries expire after ``ttl_seconds`` and the least recently used ones are
+    evicted once the cache holds more than ``max_entries``.
+    """
+
+    def __init__(self, path, max_entries=1000, ttl_seconds=7 * 24 * 3600, similarity_threshold=0.95):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._version = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                question TEXT,
+                history_hash TEXT,
+                version TEXT,
+                embedding BLOB,
+                answer TEXT,
+                created_at REAL,
+                last_access REAL,
+                hits INTEGER DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_lookup ON answers (version, history_hash)")
+        self._conn.commit()
+        self.stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+    def _sync_version(self, version):
+        """Drop entries generated against an older version of the collection"""
+        if version != self._version:
+            self._conn.execute("DELETE FROM answers WHERE version != ?", (version,))
+            self._conn.commit()
+            self._version = version
+
+    def _touch(self, key):
+        self._conn.execute(
+            "UPDATE answers SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+        )
+        self._conn.commit()
+
+    def get(self, key, version):
+        """Exact lookup; returns the cached answer or None"""
+        with self._lock:
+            self._sync_version(version)
+            row = self._conn.execute(
+                "SELECT answer FROM answers WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._touch(key)
+            self.stats["exact_hits"] += 1
+            return row[0]
+
+    def find_similar(self, embedding, history_hash, version):
+        """Near-duplicate lookup by question embedding; returns the cached answer or None"""
+        with self._lock:
+            self._sync_version(version)
+            rows = self._conn.execute(
+                "SELECT key, embedding, answer FROM answers WHERE version = ? AND history_hash = ? AND created_at > ?",
+                (version, history_hash, time.time() - self.ttl_seconds),
+            ).fetchall()
+            if not rows:
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+            scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+
+            self._touch(rows[best][0])
+            self.stats["similar_hits"] += 1
+            return rows[best][2]
+
+    def put(self, key, question, history_hash, version, embedding, answer):
+        with self._lock:
+            self._sync_version(version)
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, question, history_hash, version, embedding, answer, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, question, history_hash, version,
+                 np.asarray(embedding, dtype=np.float32).tobytes(), answer, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        # TTL first, then least recently used beyond the size cap
+        self._conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM answers WHERE key IN ("
+            "SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
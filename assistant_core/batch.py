@@ -0,0 +1,189 @@
+"""Answer a file of questions in one run.
+
+    python -m assistant_core.batch questions.jsonl answers.jsonl --mode Auto --concurrency 8
+
+Each input line is ``{"question": "...", "id": "...", "mode": "..."}`` (``id``
+and ``mode`` are optional). Results are appended to the output file one line
+per question as soon as they are ready, so an interrupted run picks up where it
+stopped when started again with the same output file. Questions that failed, or
+were answered with the top passages because the LLM was unavailable
+(``"fallback": true``), are asked again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from assistant_core.config import AUTO_MODE, DOMAINS
+from assistant_core.engines import EngineRegistry
+
+MODES = [AUTO_MODE, *DOMAINS]
+
+
+def question_id(question, mode):
+    """Stable id for lines without one, so resuming works on plain question lists"""
+    return hashlib.sha256(f"{mode}\x00{question}".encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path, default_mode=AUTO_MODE):
+    items = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            question = record.get("question", "").strip()
+            if not question:
+                print(f"⚠️  Line {line_number}: no question, skipped")
+                continue
+            mode = record.get("mode") or default_mode
+            if mode not in MODES:
+                raise ValueError(f"Line {line_number}: unknown mode {mode!r} (expected one of {MODES})")
+            items.append({"id": str(record.get("id") or question_id(question, mode)),
+                          "question": question, "mode": mode})
+    return items
+
+
+def completed_ids(path):
+    """Ids already answered in an existing output file; failed and fallback answers are retried"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that question is simply asked again
+                continue
+            if record.get("error") is None and not record.get("fallback"):
+                done.add(record["id"])
+    return done
+
+
+class JsonlWriter:
+    """Appends one JSON record per line from several threads, flushing each one to disk"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a+")
+        self._lock = threading.Lock()
+        # Terminate a line cut short by a crash so the next record starts on its own line
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def answer_one(engine, item, embedding):
+    start = time.perf_counter()
+    record = {"id": item["id"], "mode": item["mode"], "question": item["question"]}
+    try:
+        answer, trace = engine.query_with_trace(item["question"], embedding=embedding)
+        # The passages-only answer given while the LLM is unavailable is not a real answer yet
+        record.update(answer=answer, error=None,
+                      fallback=bool(trace is not None and trace.counters.get("llm_fallback")))
+        if trace is not None:
+            record.update(route=trace.route, cached=trace.cached, spans=trace.spans, counters=trace.counters)
+    except Exception as e:
+        record.update(answer=None, error=f"{type(e).__name__}: {e}", fallback=False)
+    record["seconds"] = time.perf_counter() - start
+    record["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    return record
+
+
+def run_batch(items, output_path, registry, concurrency=4):
+    """Answer ``items`` not yet in ``output_path`` and return throughput stats"""
+    done = completed_ids(output_path)
+    pending = [item for item in items if item["id"] not in done]
+    stats = {"questions": len(items), "skipped": len(items) - len(pending), "answered": 0, "fallback": 0,
+             "failed": 0, "cached": 0, "embed_s": 0.0, "wall_s": 0.0, "questions_per_min": 0.0}
+    if not pending:
+        return stats
+
+    start = time.perf_counter()
+    engines = {mode: registry.get_engine(mode) for mode in {item["mode"] for item in pending}}
+    not_ready = [mode for mode, engine in engines.items() if not engine.is_ready()]
+    if not_ready:
+        raise RuntimeError(f"No knowledge base for {', '.join(not_ready)}. Run the ingest scripts first.")
+
+    # One batched encode for every question instead of one model call per query
+    embed_start = time.perf_counter()
+    embedding_function = next(iter(engines.values())).embedding_function
+    embeddings = embedding_function.embed_documents([item["question"] for item in pending])
+    stats["embed_s"] = time.perf_counter() - embed_start
+
+    writer = JsonlWriter(output_path)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(answer_one, engines[item["mode"]], item, embedding)
+                       for item, embedding in zip(pending, embeddings)]
+            for finished, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                writer.write(record)
+                if record["error"] is None and record["fallback"]:
+                    stats["fallback"] += 1
+                elif record["error"] is None:
+                    stats["answered"] += 1
+                    stats["cached"] += bool(record.get("cached"))
+                else:
+                    stats["failed"] += 1
+                    print(f"❌ {record['id']}: {record['error']}")
+                if finished % 10 == 0 or finished == len(futures):
+                    elapsed = time.perf_counter() - start
+                    print(f"   {finished}/{len(futures)} done · {finished / elapsed * 60:.1f} questions/min")
+    finally:
+        writer.close()
+
+    stats["wall_s"] = time.perf_counter() - start
+    stats["questions_per_min"] = len(pending) / stats["wall_s"] * 60
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions")
+    parser.add_argument("input", help='JSONL with {"question": ..., "id"?: ..., "mode"?: ...} per line')
+    parser.add_argument("output", help="JSONL results; appended to, and used to skip answered questions on rerun")
+    parser.add_argument("--mode", default=AUTO_MODE, choices=MODES, help="mode for lines without one")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions in flight at once (LLM calls run in parallel)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always call the LLM instead of reusing cached answers")
+    parser.add_argument("--fake-llm", action="store_true", help="use the local stub LLM (dry run of retrieval and prompting)")
+    args = parser.parse_args(argv)
+
+    llm = None
+    if args.fake_llm:
+        from assistant_core.fakes import FakeChatModel
+        llm = FakeChatModel()
+    registry = EngineRegistry(llm=llm, use_answer_cache=not args.no_answer_cache)
+
+    items = read_questions(args.input, args.mode)
+    print(f"📋 {len(items)} questions from {args.input}")
+    stats = run_batch(items, args.output, registry, concurrency=max(1, args.concurrency))
+    if stats["skipped"]:
+        print(f"⏭️  {stats['skipped']} already answered in {args.output}")
+    if stats["wall_s"]:
+        print(f"✅ {stats['answered']} answered ({stats['cached']} from cache), "
+              f"{stats['fallback']} with passages only (LLM unavailable, retried next run), {stats['failed']} failed "
+              f"in {stats['wall_s']:.1f}s · {stats['questions_per_min']:.1f} questions/min "
+              f"(batched embedding {stats['embed_s']:.2f}s)")
+    return 1 if stats["failed"] or stats["fallback"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
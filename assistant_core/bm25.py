@@ -0,0 +1,165 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+# Identifiers (fvSchemes, nutkWallFunction, snappyHexMeshDict), words and numbers
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+(?:\.\d+)?")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how i in is it its of on or that the this to was were what
+when where which who why will with you your can do does should
+""".split())
+
+# SQLite limits the number of "?" parameters per statement
+_BATCH = 500
+
+
+def tokenize(text):
+    """Lowercased tokens; camelCase identifiers also contribute their parts (fvSchemes -> fvschemes, fv, schemes)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text):
+        lower = token.lower()
+        if lower in STOPWORDS:
+            continue
+        tokens.append(lower)
+        parts = _CAMEL_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts if len(part) > 1 and part.lower() not in STOPWORDS)
+    return tokens
+
+
+def bm25_index_path(persist_directory, collection_name):
+    return os.path.join(persist_directory, f"bm25_{collection_name}.sqlite3")
+
+
+class BM25Index:
+    """Persistent inverted index (SQLite) for BM25 keyword search over chunk IDs.
+
+    Only term frequencies and document lengths are stored; chunk text and
+    metadata stay in Chroma and are looked up by ID.
+    """
+
+    def __init__(self, path, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT, chunk_id TEXT, tf INTEGER, "
+            "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (chunk_id TEXT PRIMARY KEY, length INTEGER)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id)")
+        self._conn.commit()
+        self._corpus_stats = None
+
+    def _stats(self):
+        if self._corpus_stats is None:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            self._corpus_stats = (count, total / count if count else 0.0)
+        return self._corpus_stats
+
+    def count(self):
+        with self._lock:
+            return self._stats()[0]
+
+    def add(self, items):
+        """Index (chunk_id, text) pairs; IDs already in the index are skipped"""
+        with self._lock:
+            items = list(items)
+            known = set()
+            for start in range(0, len(items), _BATCH):
+                batch = [cid for cid, _ in items[start:start + _BATCH]]
+                placeholders = ",".join("?" * len(batch))
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM docs WHERE chunk_id IN ({placeholders})", batch))
+            postings = []
+            docs = []
+            for cid, text in items:
+                if cid in known:
+                    continue
+                known.add(cid)
+                terms = Counter(tokenize(text))
+                docs.append((cid, sum(terms.values())))
+                postings.extend((term, cid, tf) for term, tf in terms.items())
+            if docs:
+                self._conn.executemany("INSERT OR REPLACE INTO docs (chunk_id, length) VALUES (?, ?)", docs)
+                self._conn.executemany("INSERT OR REPLACE INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", postings)
+                self._conn.commit()
+                self._corpus_stats = None
+            return len(docs)
+
+    def remove(self, chunk_ids):
+        with self._lock:
+            chunk_ids = list(chunk_ids)
+            for start in range(0, len(chunk_ids), _BATCH):
+                batch = chunk_ids[start:start + _BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM docs WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.commit()
+            self._corpus_stats = None
+
+    def search(self, query, k=10):
+        """Top-k (chunk_id, score) pairs by BM25"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            n_docs, avg_length = self._stats()
+            if not n_docs:
+                return []
+            term_postings = {}
+            for term in terms:
+                term_postings[term] = self._conn.execute(
+                    "SELECT chunk_id, tf FROM postings WHERE term = ?", (term,)).fetchall()
+
+            candidates = list({cid for rows in term_postings.values() for cid, _ in rows})
+            lengths = {}
+            for start in range(0, len(candidates), _BATCH):
+                batch = candidates[start:start + _BATCH]
+                placeholders = ",".join("?" * len(batch))
+                lengths.update(self._conn.execute(
+                    f"SELECT chunk_id, length FROM docs WHERE chunk_id IN ({placeholders})", batch))
+
+        scores = Counter()
+        for rows in term_postings.values():
+            if not rows:
+                continue
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            for cid, tf in rows:
+                norm = self.k1 * (1 - self.b + self.b * lengths.get(cid, avg_length) / (avg_length or 1.0))
+                scores[cid] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores.most_common(k)
+
+    def sync_from_collection(self, collection, page_size=1000):
+        """Backfill the index from a Chroma collection (e.g. one built before the index existed)"""
+        added = 0
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            added += self.add(zip(page["ids"], page["documents"]))
+            offset += len(page["ids"])
+        return added
+
+
+def reciprocal_rank_scores(rankings, k=60):
+    """Merge several ranked ID lists; each item scores sum(1 / (k + rank)). Returns [(item, score)], best first"""
+    scores = Counter()
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] += 1.0 / (k + rank)
+    return scores.most_common()
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merged ranking of several ranked ID lists (see reciprocal_rank_scores)"""
+    return [item for item, _ in reciprocal_rank_scores(rankings, k)]
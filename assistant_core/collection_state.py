@@ -0,0 +1,45 @@
+import json
+import os
+import time
+import uuid
+
+STATE_FILE = "collection_state.json"
+DEFAULT_COLLECTION = "langchain"  # Chroma's default collection name in langchain
+
+
+def _state_path(persist_directory):
+    return os.path.join(persist_directory, STATE_FILE)
+
+
+def read_collection_state(persist_directory, collection_name=DEFAULT_COLLECTION):
+    """Return {"version": ..., "updated_at": ...} for a collection, or {} if it was never marked"""
+    try:
+        with open(_state_path(persist_directory)) as f:
+            return json.load(f).get(collection_name, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def collection_version(persist_directory, collection_name=DEFAULT_COLLECTION):
+    """Opaque token that changes whenever the collection contents change"""
+    return read_collection_state(persist_directory, collection_name).get("version", "initial")
+
+
+def mark_collection_changed(persist_directory, collection_name=DEFAULT_COLLECTION):
+    """Record that a collection was modified, so caches built on top of it are invalidated"""
+    os.makedirs(persist_directory, exist_ok=True)
+    path = _state_path(persist_directory)
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    state[collection_name] = {"version": uuid.uuid4().hex, "updated_at": time.time()}
+
+    # Write atomically so readers never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+    return state[collection_name]["version"]
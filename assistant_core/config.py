@@ -0,0 +1,59 @@
+import os
+
+# Repository root, so paths work no matter which directory a script is started from
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# How the embedding model runs on CPU: "torch", "onnx" or "onnx-int8" (see assistant_core.embeddings).
+# The EMBEDDING_BACKEND environment variable (or .env entry) overrides it
+EMBEDDING_BACKEND = "torch"
+
+# One Chroma store with a collection per domain, so one query embedding can search all of them
+STORE_DIRECTORY = os.path.join(REPO_ROOT, "knowledge_base", "chroma_db")
+
+# Dense retrieval backend: "chroma", or "flat" for a memory-mapped export of each collection
+# (see assistant_core.flat_index) stored as FLAT_INDEX_DTYPE ("int8" or "float16")
+VECTOR_BACKEND = "chroma"
+FLAT_INDEX_DTYPE = "int8"
+
+# Optional cross-encoder reranking of a wider candidate set (see assistant_core.rerank)
+USE_RERANKER = False
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Resilient LLM calls (see assistant_core.resilience): a deadline per attempt and one for the whole call,
+# retries with jittered backoff, a hedged duplicate request once an attempt is slower than the recent p95,
+# and a circuit breaker that answers from the top retrieved passages while the LLM keeps failing
+LLM_TIMEOUT_S = 30.0
+LLM_TOTAL_TIMEOUT_S = 45.0
+LLM_RETRIES = 2
+LLM_HEDGE = True
+LLM_BREAKER_FAILURES = 5
+LLM_BREAKER_RESET_S = 30.0
+
+# Query traces (JSON lines) and Prometheus text-format metrics
+METRICS_DIRECTORY = os.path.join(REPO_ROOT, "metrics")
+
+# Mode that embeds the question once and routes it to (or merges) the domain collections
+AUTO_MODE = "Auto"
+
+# Mode name -> where its engine, document processor and collection live.
+# ``sources`` is the manifest of what ingestion indexes (see assistant_core.ingestion) and
+# ``legacy_directory`` the per-domain store used before the shared one (see assistant_core.migrate).
+DOMAINS = {
+    "CFD": {
+        "package_dir": os.path.join(REPO_ROOT, "cfd_gpt"),
+        "sources": os.path.join(REPO_ROOT, "cfd_gpt", "sources.json"),
+        "rag_class": "CFDRAG",
+        "persist_directory": STORE_DIRECTORY,
+        "collection": "cfd",
+        "legacy_directory": os.path.join(REPO_ROOT, "cfd_gpt", "chroma_db"),
+    },
+    "OpenFOAM": {
+        "package_dir": os.path.join(REPO_ROOT, "openfoam_gpt"),
+        "sources": os.path.join(REPO_ROOT, "openfoam_gpt", "sources.json"),
+        "rag_class": "OpenFOAMRAG",
+        "persist_directory": STORE_DIRECTORY,
+        "collection": "openfoam",
+        "legacy_directory": os.path.join(REPO_ROOT, "openfoam_gpt", "chroma_db"),
+    },
+}
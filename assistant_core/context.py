@@ -0,0 +1,156 @@
+import re
+
+from langchain_core.documents import Document
+
+from assistant_core.tokens import count_tokens, truncate_to_tokens
+
+# Retrieval stores each chunk's relevance (higher is better) under this metadata key
+RELEVANCE_KEY = "relevance"
+# Set when that relevance is a reciprocal rank fusion score, which only orders the chunks
+RANK_FUSED_KEY = "rank_fused"
+# The dense similarity 1/(1+distance) of chunks the vector search found, kept next to a fused score
+DENSE_RELEVANCE_KEY = "dense_relevance"
+# Tells apart documents that share a source name (two uploads called report.pdf), so their chunks never merge
+DOCUMENT_HASH_KEY = "document_hash"
+DEFAULT_TOKEN_BUDGET = 1000
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    """Word n-grams of a text, for near-duplicate detection"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def containment(a, b):
+    """Share of the smaller shingle set that also appears in the other one"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def relevance(doc):
+    return doc.metadata.get(RELEVANCE_KEY, 0.0)
+
+
+class ContextPacker:
+    """Assembles retrieved chunks into the prompt context under a token budget.
+
+    In order:
+    1. keep only chunks scoring at least ``min_relative_score`` x the best score,
+       so k adapts to the score margins instead of always being ``retrieval_k``
+       (for rank-fused chunks the margin applies to their dense relevance, see ``_select``);
+    2. merge chunks from the same document and page whose ``start_index`` ranges
+       overlap or touch (text split with overlap would otherwise repeat);
+    3. drop passages that are mostly contained in a higher-ranked one;
+    4. add passages best first until ``token_budget`` is reached.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, min_relative_score=0.5, min_docs=1,
+                 duplicate_threshold=0.8):
+        self.token_budget = token_budget
+        self.min_relative_score = min_relative_score
+        self.min_docs = min_docs
+        self.duplicate_threshold = duplicate_threshold
+
+    def _select(self, docs):
+        if not docs:
+            return []
+        score = relevance
+        # RRF scores (k=60) are not comparable across chunks: a chunk only one retriever found scores at most
+        # 1/61 against ~2/61 for one both found, so a relative cutoff on them would drop every keyword-only hit.
+        # The margin applies to the dense relevance instead, and keyword-only hits (no dense score) are kept
+        if any(d.metadata.get(RANK_FUSED_KEY) for d in docs):
+            score = lambda d: d.metadata.get(DENSE_RELEVANCE_KEY)
+        scores = [score(d) for d in docs]
+        best = max((s for s in scores if s is not None), default=0.0)
+        if best <= 0:
+            return list(docs)
+        return [d for i, (d, s) in enumerate(zip(docs, scores))
+                if i < self.min_docs or s is None or s >= self.min_relative_score * best]
+
+    def _merge_adjacent(self, docs):
+        """Merge overlapping neighbours; merged passages keep the rank of their best member"""
+        groups = {}
+        passages = []
+        for rank, doc in enumerate(docs):
+            start = doc.metadata.get("start_index")
+            key = (doc.metadata.get("source"), doc.metadata.get("page"), doc.metadata.get(DOCUMENT_HASH_KEY))
+            if start is None or key[0] is None:
+                passages.append((rank, doc))
+                continue
+            groups.setdefault(key, []).append((start, rank, doc))
+
+        merged_count = 0
+        for members in groups.values():
+            members.sort(key=lambda m: m[0])
+            start, rank, doc = members[0]
+            text, end, best = doc.page_content, start + len(doc.page_content), relevance(doc)
+            metadata = dict(doc.metadata)
+            for next_start, next_rank, next_doc in members[1:]:
+                if next_start <= end:
+                    # Overlapping or touching: append only the part not already covered
+                    overlap = end - next_start
+                    text += next_doc.page_content[overlap:]
+                    end = max(end, next_start + len(next_doc.page_content))
+                    rank = min(rank, next_rank)
+                    best = max(best, relevance(next_doc))
+                    merged_count += 1
+                    continue
+                passages.append((rank, self._passage(text, metadata, best)))
+                start, rank, doc = next_start, next_rank, next_doc
+                text, end, best = doc.page_content, start + len(doc.page_content), relevance(doc)
+                metadata = dict(doc.metadata)
+            passages.append((rank, self._passage(text, metadata, best)))
+
+        passages.sort(key=lambda p: p[0])
+        return [doc for _, doc in passages], merged_count
+
+    @staticmethod
+    def _passage(text, metadata, score):
+        metadata[RELEVANCE_KEY] = score
+        return Document(page_content=text, metadata=metadata)
+
+    def _drop_duplicates(self, docs):
+        kept, kept_shingles = [], []
+        for doc in docs:
+            doc_shingles = shingles(doc.page_content)
+            if any(containment(doc_shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            kept.append(doc)
+            kept_shingles.append(doc_shingles)
+        return kept, len(docs) - len(kept)
+
+    def pack(self, docs):
+        """Returns (passages, stats) with the passages in relevance order"""
+        selected = self._select(docs)
+        merged, merged_count = self._merge_adjacent(selected)
+        unique, duplicates = self._drop_duplicates(merged)
+
+        packed, tokens, over_budget = [], 0, 0
+        for doc in unique:
+            doc_tokens = count_tokens(doc.page_content)
+            if tokens + doc_tokens > self.token_budget:
+                if packed:
+                    over_budget += 1
+                    continue
+                # Always keep something: cut the best passage down to the budget
+                doc = Document(page_content=truncate_to_tokens(doc.page_content, self.token_budget),
+                               metadata=doc.metadata)
+                doc_tokens = count_tokens(doc.page_content)
+            packed.append(doc)
+            tokens += doc_tokens
+
+        stats = {
+            "candidates": len(docs),
+            "below_margin": len(docs) - len(selected),
+            "merged": merged_count,
+            "duplicates": duplicates,
+            "over_budget": over_budget,
+            "passages": len(packed),
+            "context_tokens": tokens,
+        }
+        return packed, stats
@@ -0,0 +1,166 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Tuple
+from langchain_core.documents import Document
+
+from assistant_core.collection_state import DEFAULT_COLLECTION
+from assistant_core.context import DOCUMENT_HASH_KEY
+from assistant_core.embeddings import get_embedding_function
+from assistant_core.indexing import index_documents, sidecar_path
+from assistant_core.near_duplicates import DEFAULT_THRESHOLD
+from assistant_core.ocr import OCREngine, apply_ocr_to_pdf, pages_without_text
+from assistant_core.splitter import default_splitter
+from assistant_core.uploads import parse_upload
+
+class DocumentProcessor:
+    """Process and ingest uploaded documents into a domain's collection (the same for every domain)"""
+    
+    def __init__(self, persist_directory="./chroma_db", embedding_function=None, collection_name=DEFAULT_COLLECTION):
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function or get_embedding_function()
+        # Same chunking as ingest.py: token-sized, keeping dictionaries, code and equations whole
+        self.text_splitter = default_splitter()
+        self.last_index_stats = {}
+        # Uploading the same chapter twice (or a lightly edited copy) adds nothing; None keeps every chunk
+        self.near_duplicate_threshold = DEFAULT_THRESHOLD
+        # Parallel page-level OCR with results cached by image hash
+        self.ocr = OCREngine(sidecar_path(persist_directory, "ocr_cache.sqlite3"))
+    
+    def process_pdf(self, file_path: str) -> List[Document]:
+        """Process PDF files, OCR-ing pages that have no text layer"""
+        from langchain_community.document_loaders import PyPDFLoader
+
+        loader = PyPDFLoader(file_path)
+        docs = loader.load()
+        scanned = pages_without_text(docs)
+        if scanned:
+            with open(file_path, "rb") as f:
+                docs = apply_ocr_to_pdf(self.ocr, docs, f.read(), scanned)
+        return docs
+    
+    def process_docx(self, file_path: str) -> List[Document]:
+        """Process Word documents"""
+        from langchain_community.document_loaders import Docx2txtLoader
+
+        loader = Docx2txtLoader(file_path)
+        return loader.load()
+    
+    def process_image(self, file_path: str) -> List[Document]:
+        """Process images using OCR"""
+        try:
+            with open(file_path, "rb") as f:
+                text = self.ocr.ocr_image(f.read())
+            
+            # Create a Document object
+            doc = Document(
+                page_content=text,
+                metadata={"source": file_path, "type": "image_ocr"}
+            )
+            return [doc]
+        except Exception as e:
+            print(f"Error processing image {file_path}: {e}")
+            return []
+    
+    def process_file(self, file_path: str, file_type: str) -> List[Document]:
+        """Process a file based on its type"""
+        if file_type == "pdf":
+            return self.process_pdf(file_path)
+        elif file_type in ["docx", "doc"]:
+            return self.process_docx(file_path)
+        elif file_type in ["png", "jpg", "jpeg", "tiff", "bmp"]:
+            return self.process_image(file_path)
+        else:
+            return []
+    
+    def add_documents_to_db(self, documents: List[Document]):
+        """Add processed documents to the vector database; returns how many new chunks were stored"""
+        if not documents:
+            return 0
+        
+        # Split documents into chunks
+        splits = self.text_splitter.split_documents(documents)
+        
+        # Upsert with content-addressed IDs; unchanged chunks are neither re-embedded nor duplicated
+        self.last_index_stats = index_documents(splits, self.persist_directory, self.embedding_function,
+                                                collection_name=self.collection_name,
+                                                near_duplicate_threshold=self.near_duplicate_threshold,
+                                                # Recorded so manifest ingestion never deletes these chunks
+                                                uploaded=True)
+        
+        # Chunks already stored (or near-duplicates of stored ones) are not counted
+        return self.last_index_stats["added"]
+    
+    def process_and_ingest(self, file_path: str, file_type: str) -> int:
+        """Process a file and add it to the database"""
+        docs = self.process_file(file_path, file_type)
+        return self.add_documents_to_db(docs)
+
+    def process_uploads(self, files: List[Tuple[str, bytes]], max_workers: int = None) -> Iterator[dict]:
+        """Process a batch of uploads straight from memory and ingest them in one write.
+        
+        Files are parsed in a process pool; images and PDF pages without a text
+        layer then go through page-level parallel OCR. All chunks are embedded and
+        upserted together. Yields progress events for the UI:
+          {"event": "file", "name", "chunks", "error", "ocr_pages", "ocr_pages_per_s", "done", "total"} per file
+          {"event": "indexing", "chunks"} before the batched write
+          {"event": "indexed", "chunks", "added", "stats"} when finished ("added" excludes chunks already stored)
+        Two uploads may share a name, so files are told apart by their position, and
+        their chunks carry a hash of the file's content next to the name.
+        """
+        if not files:
+            return
+        
+        splits = []
+        done = 0
+        
+        def file_event(index, docs, error=None, ocr_stats=None):
+            nonlocal done
+            done += 1
+            name, data = files[index]
+            document_hash = hashlib.sha256(data).hexdigest()[:16]
+            for doc in docs:
+                doc.metadata[DOCUMENT_HASH_KEY] = document_hash
+            file_splits = self.text_splitter.split_documents(docs) if docs else []
+            splits.extend(file_splits)
+            return {"event": "file", "name": name, "chunks": len(file_splits), "error": error,
+                    "ocr_pages": (ocr_stats or {}).get("pages", 0),
+                    "ocr_pages_per_s": (ocr_stats or {}).get("pages_per_s", 0.0),
+                    "done": done, "total": len(files)}
+        
+        needs_ocr = []
+        workers = max_workers or min(len(files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(parse_upload, name, data): index for index, (name, data) in enumerate(files)}
+            for future in as_completed(futures):
+                parsed = future.result()
+                if parsed["ocr"] and not parsed["error"]:
+                    needs_ocr.append((futures[future], parsed))
+                    continue
+                docs = [d for d in parsed["docs"] if d.page_content.strip()]
+                yield file_event(futures[future], docs, parsed["error"])
+        
+        # OCR runs after parsing so its page-level pool has the CPUs to itself
+        for index, parsed in needs_ocr:
+            name, data = files[index]
+            try:
+                if parsed["ocr"] == "image":
+                    text = self.ocr.ocr_image(data)
+                    docs = [Document(page_content=text, metadata={"source": name, "type": "image_ocr"})]
+                else:
+                    docs = apply_ocr_to_pdf(self.ocr, parsed["docs"], data, parsed["ocr"])
+                yield file_event(index, [d for d in docs if d.page_content.strip()], ocr_stats=self.ocr.last_stats)
+            except Exception as e:
+                yield file_event(index, [], str(e))
+        
+        yield {"event": "indexing", "chunks": len(splits)}
+        self.last_index_stats = {}
+        if splits:
+            self.last_index_stats = index_documents(splits, self.persist_directory, self.embedding_function,
+                                                    collection_name=self.collection_name,
+                                                    near_duplicate_threshold=self.near_duplicate_threshold,
+                                                    # Recorded so manifest ingestion never deletes these chunks
+                                                    uploaded=True)
+        yield {"event": "indexed", "chunks": len(splits), "added": self.last_index_stats.get("added", 0),
+               "stats": self.last_index_stats}
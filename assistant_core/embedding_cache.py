@@ -0,0 +1,108 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from assistant_core.config import EMBEDDING_MODEL_NAME
+
+# SQLite limits the number of "?" parameters per statement
+_LOOKUP_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """Embedding model wrapper backed by a persistent content-hash -> vector cache.
+
+    Texts are keyed by sha256(namespace + text), where the namespace is the model
+    name, so vectors from different models never mix. Only cache misses are sent
+    to the wrapped model.
+    """
+
+    def __init__(self, embedding_function, path, namespace=EMBEDDING_MODEL_NAME):
+        self.embedding_function = embedding_function
+        self.path = path
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+
+    def content_hash(self, text):
+        return hashlib.sha256(f"{self.namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes):
+        found = {}
+        for start in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = hashes[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT hash, vector FROM vectors WHERE hash IN ({placeholders})", batch
+            ).fetchall()
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self.content_hash(text) for text in texts]
+        with self._lock:
+            found = self._lookup(list(set(hashes)))
+
+        missing = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in found and digest not in missing:
+                missing[digest] = text
+
+        if missing:
+            start = time.perf_counter()
+            vectors = self.embedding_function.embed_documents(list(missing.values()))
+            elapsed = time.perf_counter() - start
+            self.embed_seconds += elapsed
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (hash, vector) VALUES (?, ?)",
+                    [(digest, np.asarray(vector, dtype=np.float32).tobytes())
+                     for digest, vector in zip(missing, vectors)],
+                )
+                self._update_seconds_per_text(elapsed, len(missing))
+                self._conn.commit()
+            found.update(zip(missing, vectors))
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [list(found[digest]) for digest in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedding_function.embed_query(text)
+
+    def _update_seconds_per_text(self, elapsed, count):
+        # Running average of the cost of one embedding, used to estimate time saved
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'seconds_per_text'").fetchone()
+        current = elapsed / count
+        value = current if row is None else 0.8 * row[0] + 0.2 * current
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seconds_per_text', ?)", (value,))
+
+    def seconds_per_text(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'seconds_per_text'").fetchone()
+        return row[0] if row else 0.0
+
+    def report(self, extra_skipped=0):
+        """Hit rate and estimated time saved; ``extra_skipped`` counts texts that never needed an embedding at all"""
+        total = self.hits + self.misses
+        saved_texts = self.hits + extra_skipped
+        return {
+            "embedded": self.misses,
+            "cache_hits": self.hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "embed_seconds": self.embed_seconds,
+            "time_saved_s": saved_texts * self.seconds_per_text(),
+        }
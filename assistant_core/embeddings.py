@@ -0,0 +1,108 @@
+import os
+import platform
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from assistant_core.config import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+
+# "torch" and "onnx" compute the same float32 vectors; "onnx-int8" runs a dynamically
+# quantized graph whose vectors differ slightly (check with python -m benchmarks.embeddings)
+EMBEDDING_BACKENDS = ["torch", "onnx", "onnx-int8"]
+QUANTIZED_BACKENDS = {"onnx-int8"}
+
+_lock = threading.Lock()
+_embedding_function = None
+load_seconds = None
+loaded_backend = None
+
+
+def configured_backend():
+    """Backend from the environment (read late, after .env is loaded) or config.EMBEDDING_BACKEND"""
+    return os.environ.get("EMBEDDING_BACKEND", EMBEDDING_BACKEND)
+
+
+def _quantized_file():
+    # sentence-transformers ships per-architecture int8 exports of the MiniLM models
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def backend_kwargs(backend):
+    """SentenceTransformer constructor arguments for a backend"""
+    if backend == "torch":
+        return {}
+    if backend == "onnx":
+        return {"backend": "onnx"}
+    if backend == "onnx-int8":
+        return {"backend": "onnx", "model_kwargs": {"file_name": _quantized_file()}}
+    raise ValueError(f"Unknown embedding backend {backend!r} (expected one of {EMBEDDING_BACKENDS})")
+
+
+def embedding_namespace(backend=None, model_name=EMBEDDING_MODEL_NAME):
+    """Embedding cache namespace: float32 backends share vectors, quantized ones get their own"""
+    backend = backend or configured_backend()
+    return f"{model_name}:{backend}" if backend in QUANTIZED_BACKENDS else model_name
+
+
+def create_embeddings(backend=None, model_name=EMBEDDING_MODEL_NAME):
+    """Load the embedding model on a backend (ONNX ones need ``pip install "sentence-transformers[onnx]"``)"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    backend = backend or configured_backend()
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs=backend_kwargs(backend))
+
+
+def get_embedding_function():
+    """Return the process-wide embedding model, loading it on first use"""
+    global _embedding_function, load_seconds, loaded_backend
+    if _embedding_function is None:
+        with _lock:
+            if _embedding_function is None:
+                start = time.perf_counter()
+                backend = configured_backend()
+                _embedding_function = create_embeddings(backend)
+                loaded_backend = backend
+                load_seconds = time.perf_counter() - start
+    return _embedding_function
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, backend):
+    global _worker_model
+    _worker_model = create_embeddings(backend, model_name)
+
+
+def _embed_in_worker(texts):
+    return _worker_model.embed_documents(texts)
+
+
+class ProcessPoolEmbeddings(Embeddings):
+    """Spreads embed_documents batches over worker processes, each holding its own copy of the model"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, workers=2, backend=None):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(model_name, backend or configured_backend()))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        size = -(-len(texts) // self.workers)
+        slices = [texts[i:i + size] for i in range(0, len(texts), size)]
+        vectors = []
+        for part in self.pool.map(_embed_in_worker, slices):
+            vectors.extend(part)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self):
+        self.pool.shutdown()
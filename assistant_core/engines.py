@@ -0,0 +1,203 @@
+import importlib.util
+import os
+import threading
+import time
+
+from assistant_core.config import AUTO_MODE, DOMAINS, VECTOR_BACKEND
+from assistant_core.startup import get_startup_profile
+
+
+def _load_module(name, path):
+    """Import a module from a file path (the domain folders are not packages)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class EngineRegistry:
+    """Builds each RAG engine and document processor once per process and hands out the same instance afterwards.
+
+    Streamlit re-executes the script on every interaction, but imported modules stay
+    in ``sys.modules``, so a module-level registry survives reruns and mode switches.
+    """
+
+    def __init__(self, domains=None, llm=None, use_answer_cache=True):
+        self.domains = domains or DOMAINS
+        # None means the default Gemini client
+        self.llm = llm
+        self._engine_llm = None
+        self._engine_llm_lock = threading.Lock()
+        self.use_answer_cache = use_answer_cache
+        self._engines = {}
+        self._processors = {}
+        self._modules = {}
+        self._locks = {mode: threading.Lock() for mode in [*self.domains, AUTO_MODE]}
+        self._timings = {}
+        self._warm_ups = {}
+        self._warm_up_lock = threading.Lock()
+
+    def _module(self, mode, filename):
+        key = (mode, filename)
+        if key not in self._modules:
+            name = f"{os.path.basename(self.domains[mode]['package_dir'])}_{filename[:-3]}"
+            path = os.path.join(self.domains[mode]["package_dir"], filename)
+            self._modules[key] = _load_module(name, path)
+        return self._modules[key]
+
+    def _record(self, mode, cold_seconds=None, warm_seconds=None):
+        stats = self._timings.setdefault(mode, {"cold_start_s": None, "warm_start_s": None, "warm_hits": 0})
+        if cold_seconds is not None:
+            stats["cold_start_s"] = cold_seconds
+        if warm_seconds is not None:
+            stats["warm_start_s"] = warm_seconds
+            stats["warm_hits"] += 1
+
+    def _build_engine(self, mode):
+        from assistant_core import embeddings
+
+        if mode == AUTO_MODE:
+            from assistant_core.router import AutoRAG
+
+            # Routes over the domain engines, reusing their collections and caches
+            return AutoRAG({domain: self.get_engine(domain) for domain in self.domains},
+                           llm=self.shared_llm(), use_answer_cache=self.use_answer_cache)
+        domain = self.domains[mode]
+        rag_class = getattr(self._module(mode, "rag.py"), domain["rag_class"])
+        return rag_class(
+            persist_directory=domain["persist_directory"],
+            embedding_function=embeddings.get_embedding_function(),
+            collection_name=domain["collection"],
+            llm=self.shared_llm(),
+            use_answer_cache=self.use_answer_cache,
+        )
+
+    def shared_llm(self):
+        """The LLM handed to every engine, wrapped once so they share one circuit breaker and latency window"""
+        if self._engine_llm is None:
+            with self._engine_llm_lock:
+                if self._engine_llm is None:
+                    from assistant_core.rag_base import default_llm
+                    from assistant_core.resilience import with_resilience
+
+                    self._engine_llm = with_resilience(self.llm or default_llm())
+        return self._engine_llm
+
+    def llm_stats(self):
+        """Retry, hedging and circuit breaker counters of the shared LLM, once it exists"""
+        from assistant_core.resilience import resilient_llm
+
+        llm = resilient_llm(self._engine_llm)
+        return llm.stats() if llm is not None else None
+
+    def get_engine(self, mode):
+        """Return the RAG engine for a mode (a domain or AUTO_MODE), building it on first request"""
+        start = time.perf_counter()
+        engine = self._engines.get(mode)
+        if engine is not None:
+            self._record(mode, warm_seconds=time.perf_counter() - start)
+            return engine
+
+        with self._locks[mode]:
+            engine = self._engines.get(mode)
+            if engine is None:
+                with get_startup_profile().step(f"build {mode} engine"):
+                    engine = self._build_engine(mode)
+                self._engines[mode] = engine
+                self._record(mode, cold_seconds=time.perf_counter() - start)
+        return engine
+
+    def peek_engine(self, mode):
+        """The engine for a mode if it is already built, without building it or waiting for a warm-up"""
+        return self._engines.get(mode)
+
+    def warm_up(self, mode):
+        """Build a mode's engine (and load the embedding model) on a background thread, once; returns the thread
+
+        The app starts this before drawing anything, so the page appears while
+        the model loads, and the first question only waits for what is left.
+        """
+        with self._warm_up_lock:
+            thread = self._warm_ups.get(mode)
+            if thread is None:
+                thread = threading.Thread(target=self._warm_up, args=(mode,), name=f"warm-up-{mode}", daemon=True)
+                self._warm_ups[mode] = thread
+                thread.start()
+        return thread
+
+    def _warm_up(self, mode):
+        from assistant_core import embeddings
+
+        profile = get_startup_profile()
+        imports = ["langchain_huggingface"]
+        if VECTOR_BACKEND != "flat":
+            imports.append("langchain_chroma")
+        if self.llm is None:
+            imports.append("langchain_google_genai")
+        try:
+            for name in imports:
+                profile.import_module(name)
+            with profile.step("load embedding model"):
+                model = embeddings.get_embedding_function()
+            with profile.step("first embedding"):
+                model.embed_query("warm up")
+            self.get_engine(mode)
+        except Exception as e:
+            # The first question builds the engine again and shows the error
+            print(f"⚠️ Warm-up of the {mode} engine failed: {e}")
+        finally:
+            profile.write()
+
+    def warming(self):
+        """True while a warm-up thread is still running"""
+        return any(thread.is_alive() for thread in list(self._warm_ups.values()))
+
+    def wait_for_warm_up(self, timeout=None):
+        for thread in list(self._warm_ups.values()):
+            thread.join(timeout)
+
+    def get_document_processor(self, mode):
+        """Return the document processor for a mode, sharing the engines' embedding model"""
+        from assistant_core import embeddings
+        from assistant_core.document_processor import DocumentProcessor
+
+        processor = self._processors.get(mode)
+        if processor is None:
+            with self._locks[mode]:
+                processor = self._processors.get(mode)
+                if processor is None:
+                    processor = DocumentProcessor(
+                        persist_directory=self.domains[mode]["persist_directory"],
+                        embedding_function=embeddings.get_embedding_function(),
+                        collection_name=self.domains[mode]["collection"],
+                    )
+                    self._processors[mode] = processor
+        return processor
+
+    def refresh_engine(self, mode):
+        """Attach a cached engine to its vector store if the store was only created after startup (e.g. by an upload)"""
+        engine = self._engines.get(mode)
+        if engine is not None and not engine.is_ready():
+            engine._initialize_chain()
+
+    def timings(self):
+        """Cold/warm start timings per mode plus the one-off embedding model load time"""
+        from assistant_core import embeddings
+
+        report = {mode: dict(stats) for mode, stats in self._timings.items()}
+        report["embedding_load_s"] = embeddings.load_seconds
+        return report
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide engine registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EngineRegistry()
+    return _registry
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from assistant_core.bm25 import tokenize
+
+
+class FakeChatModel:
+    """Local stand-in for the Gemini chat model.
+
+    Returns a canned answer and can inject latency before the first token and
+    between tokens, so streaming vs. blocking behaviour can be measured offline.
+    """
+
+    def __init__(self, response=None, first_token_delay=0.0, token_delay=0.0):
+        self.response = response or (
+            "This is a stub answer from the local fake LLM. It is split into word tokens "
+            "so streaming behaves like a real model without calling Gemini."
+        )
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        tokens = self._tokens()
+        time.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        return AIMessage(content=self.response)
+
+    def stream(self, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.first_token_delay)
+        for token in self._tokens():
+            yield AIMessageChunk(content=token)
+            time.sleep(self.token_delay)
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        tokens = self._tokens()
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(tokens))
+        return AIMessage(content=self.response)
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.first_token_delay)
+        for token in self._tokens():
+            yield AIMessageChunk(content=token)
+            await asyncio.sleep(self.token_delay)
+
+
+class FakeLLMError(RuntimeError):
+    """A failure injected by FlakyChatModel"""
+
+
+class FlakyChatModel(FakeChatModel):
+    """FakeChatModel with a latency tail and failures, for measuring timeouts, retries and hedging.
+
+    A call takes ``latency`` seconds (±50% jitter) before its first token; with
+    probability ``slow_rate`` it takes ``slow_latency`` instead, and with
+    ``error_rate`` it raises after the usual latency. While ``down`` is set every
+    call fails at once, like an outage.
+    """
+
+    def __init__(self, latency=0.1, slow_rate=0.03, slow_latency=3.0, error_rate=0.02, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.down = False
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """(delay before the first token, whether the call fails)"""
+        with self._lock:
+            self.calls += 1
+            draw = self._random.random()
+            jitter = self._random.uniform(0.5, 1.5)
+        if self.down:
+            return 0.0, True
+        if draw < self.error_rate:
+            return self.latency * jitter, True
+        if draw < self.error_rate + self.slow_rate:
+            return self.slow_latency * jitter, False
+        return self.latency * jitter, False
+
+    def invoke(self, messages, **kwargs):
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeLLMError("injected stub LLM failure")
+        return AIMessage(content=self.response)
+
+    def stream(self, messages, **kwargs):
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeLLMError("injected stub LLM failure")
+        for token in self._tokens():
+            yield AIMessageChunk(content=token)
+            time.sleep(self.token_delay)
+
+    async def ainvoke(self, messages, **kwargs):
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeLLMError("injected stub LLM failure")
+        return AIMessage(content=self.response)
+
+    async def astream(self, messages, **kwargs):
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeLLMError("injected stub LLM failure")
+        for token in self._tokens():
+            yield AIMessageChunk(content=token)
+            await asyncio.sleep(self.token_delay)
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic, model-free embeddings for offline benchmarks and tests.
+
+    Each token is hashed into one of ``dimensions`` signed buckets and the vector
+    is L2-normalised, so texts sharing words are close in cosine/L2 distance and
+    the same text always maps to the same vector, in every process.
+    """
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeCrossEncoder:
+    """Deterministic stand-in for a sentence-transformers CrossEncoder.
+
+    Scores a (query, passage) pair by the share of query terms found in the
+    passage, after sleeping ``pair_delay`` seconds per pair.
+    """
+
+    def __init__(self, pair_delay=0.0):
+        self.pair_delay = pair_delay
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size=16, **kwargs):
+        time.sleep(self.pair_delay * len(pairs))
+        self.pairs_scored += len(pairs)
+        scores = []
+        for query, passage in pairs:
+            terms, words = set(tokenize(query)), set(tokenize(passage))
+            # Centered like cross-encoder logits: no overlap is negative
+            scores.append(8.0 * len(terms & words) / max(len(terms), 1) - 4.0)
+        return np.asarray(scores, dtype=np.float32)
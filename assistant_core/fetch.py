@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from urllib.parse import urlencode, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "CFDAssistantSuite/1.0 (knowledge-base ingestion)"
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+# WikipediaLoader's default doc_content_chars_max, kept so the corpus stays the same
+WIKIPEDIA_MAX_CHARS = 4000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchResult:
+    """Outcome of fetching one URL"""
+
+    def __init__(self, url, status=None, body=b"", headers=None, elapsed=0.0, from_cache=False,
+                 error=None, attempts=0):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None and self.status is not None and 200 <= self.status < 300
+
+    @property
+    def not_modified(self):
+        """The server confirmed (HTTP 304) that the page is unchanged since the validators sent"""
+        return self.status == 304
+
+    @property
+    def text(self):
+        return self.body.decode(_charset(self.headers), errors="replace")
+
+
+def header(headers, name):
+    """Case-insensitive lookup in a plain dict of response headers"""
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+def response_validators(result):
+    """{"etag", "last_modified"} of a response, to make the next fetch of the URL conditional"""
+    return {"etag": header(result.headers, "ETag"), "last_modified": header(result.headers, "Last-Modified")}
+
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _charset(headers):
+    content_type = header(headers, "Content-Type") or ""
+    for part in content_type.split(";"):
+        part = part.strip()
+        if part.lower().startswith("charset="):
+            return part.split("=", 1)[1].strip('"') or "utf-8"
+    return "utf-8"
+
+
+class ResponseCache:
+    """On-disk store of raw HTTP responses keyed by URL, so ingestion can be replayed offline"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return FetchResult(url, status=meta["status"], body=body, headers=meta["headers"], from_cache=True)
+
+    def put(self, result):
+        meta_path, body_path = self._paths(result.url)
+        with open(body_path, "wb") as f:
+            f.write(result.body)
+        with open(meta_path, "w") as f:
+            json.dump({"url": result.url, "status": result.status, "headers": result.headers,
+                       "fetched_at": time.time()}, f)
+
+
+class HostRateLimiter:
+    """Enforces a minimum interval between request starts to the same host"""
+
+    def __init__(self, default_interval=0.25, per_host=None):
+        self.default_interval = default_interval
+        self.per_host = per_host or {}
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        interval = self.per_host.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Fetcher:
+    """Concurrent HTTP fetcher for ingestion.
+
+    * one pooled ``requests.Session`` per worker thread (sessions are not thread-safe)
+    * per-host rate limiting
+    * retries with exponential backoff and jitter on connection errors and 429/5xx
+    * every successful response is recorded in a ResponseCache; with ``offline=True``
+      responses are replayed from that cache and the network is never touched
+    * conditional requests (ETag / Last-Modified) for pages fetched before
+    """
+
+    def __init__(self, cache_dir=None, offline=False, max_workers=8, timeout=20, retries=3,
+                 backoff=0.5, rate_limiter=None):
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.offline = offline
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The calling thread's session, created on first use"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append((threading.current_thread(), session))
+        return session
+
+    def _close_sessions(self, only_finished_threads=False):
+        with self._sessions_lock:
+            closing = [(t, s) for t, s in self._sessions if not (only_finished_threads and t.is_alive())]
+            self._sessions = [item for item in self._sessions if item not in closing]
+        for _, session in closing:
+            session.close()
+
+    def close(self):
+        """Close every thread's session and its pooled connections"""
+        self._close_sessions()
+        self._local = threading.local()
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            delay = max(delay, int(response.headers["Retry-After"]))
+        time.sleep(delay)
+
+    def fetch(self, url, validators=None):
+        """Fetch one URL; with ``validators`` from an earlier response an unchanged page comes back as a 304"""
+        start = time.perf_counter()
+        if self.offline:
+            cached = self.cache.get(url) if self.cache else None
+            if cached is None:
+                return FetchResult(url, error="not in offline cache", elapsed=time.perf_counter() - start)
+            cached.elapsed = time.perf_counter() - start
+            return cached
+
+        conditional = _conditional_headers(validators)
+        error = None
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait(url)
+            response = None
+            try:
+                response = self.session.get(url, timeout=self.timeout, headers=conditional or None)
+                if response.status_code == 304 and conditional:
+                    return FetchResult(url, status=304, headers=dict(response.headers), attempts=attempt + 1,
+                                       elapsed=time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    result = FetchResult(url, status=response.status_code, body=response.content,
+                                         headers=dict(response.headers), attempts=attempt + 1,
+                                         elapsed=time.perf_counter() - start)
+                    if not result.ok:
+                        result.error = f"HTTP {response.status_code}"
+                    elif self.cache:
+                        self.cache.put(result)
+                    return result
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt < self.retries:
+                self._sleep_before_retry(attempt, response)
+
+        # Network failed: fall back to the last recorded copy if there is one
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None:
+            cached.elapsed = time.perf_counter() - start
+            cached.attempts = self.retries + 1
+            return cached
+        return FetchResult(url, error=error, attempts=self.retries + 1, elapsed=time.perf_counter() - start)
+
+    def fetch_all(self, urls, validators=None):
+        """Fetch URLs concurrently, yielding FetchResults as they complete.
+
+        At most ``2 * max_workers`` requests are in flight, so a slow consumer
+        never has the whole corpus buffered in memory. ``validators`` maps URLs
+        to the validators of their previous fetch (see ``fetch``).
+        """
+        urls = iter(urls)
+        validators = validators or {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                pending = {pool.submit(self.fetch, url, validators.get(url))
+                           for url in islice(urls, 2 * self.max_workers)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for url in islice(urls, 1):
+                            pending.add(pool.submit(self.fetch, url, validators.get(url)))
+                        yield future.result()
+        finally:
+            # The pool's threads are gone: release their connections
+            self._close_sessions(only_finished_threads=True)
+
+
+def web_document(result):
+    """Turn a fetched HTML page into a Document, with the same metadata WebBaseLoader produces"""
+    soup = BeautifulSoup(result.text, "html.parser")
+    metadata = {"source": result.url}
+    if soup.find("title"):
+        metadata["title"] = soup.find("title").get_text()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description:
+        metadata["description"] = description.get("content", "No description found.")
+    html = soup.find("html")
+    if html:
+        metadata["language"] = html.get("lang", "No language found.")
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+def wikipedia_url(topic, api_url=WIKIPEDIA_API_URL):
+    """MediaWiki API request for the plain-text extract of the best search hit for a topic"""
+    params = {
+        "action": "query",
+        "format": "json",
+        "generator": "search",
+        "gsrsearch": topic,
+        "gsrlimit": 1,
+        "prop": "extracts|info",
+        "explaintext": 1,
+        "inprop": "url",
+        "redirects": 1,
+    }
+    return f"{api_url}?{urlencode(params)}"
+
+
+def wikipedia_documents(result):
+    """Turn a wikipedia_url() response into Documents shaped like WikipediaLoader's"""
+    pages = json.loads(result.text).get("query", {}).get("pages", {})
+    docs = []
+    for page in pages.values():
+        extract = page.get("extract") or ""
+        if not extract:
+            continue
+        docs.append(Document(
+            page_content=extract[:WIKIPEDIA_MAX_CHARS],
+            metadata={
+                "title": page.get("title", ""),
+                "summary": extract.split("\n\n", 1)[0],
+                "source": page.get("fullurl", ""),
+            },
+        ))
+    return docs
+
+
+def format_latency_report(results):
+    """Per-source fetch latency table, slowest first"""
+    lines = []
+    for result in sorted(results, key=lambda r: r.elapsed, reverse=True):
+        status = "cache" if result.from_cache else ("unchanged" if result.not_modified else (result.status or "error"))
+        lines.append(f"  {result.elapsed * 1000:8.0f} ms  [{status}]  {result.url}")
+    latencies = sorted(r.elapsed for r in results)
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        lines.append(f"  p50 {p50 * 1000:.0f} ms · max {latencies[-1] * 1000:.0f} ms · {len(latencies)} source(s)")
+    return "\n".join(lines)
@@ -0,0 +1,272 @@
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from assistant_core.collection_state import DEFAULT_COLLECTION, collection_version
+
+FLAT_INDEX_DTYPES = ["float16", "int8"]
+MANIFEST_FILE = "manifest.json"
+# Rows converted to float32 at a time during the full scan, to bound temporary memory
+BLOCK_ROWS = 65536
+
+
+def flat_index_root(persist_directory, collection_name=DEFAULT_COLLECTION):
+    return os.path.join(persist_directory, "flat_index", collection_name)
+
+
+def _export_name(version, dtype):
+    return f"{version}-{dtype}"
+
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, name), array)
+
+
+def export_collection(persist_directory, collection_name=DEFAULT_COLLECTION, dtype="int8", page_size=1000):
+    """Write a collection's vectors, texts and metadata as a memory-mappable flat index; returns its directory.
+
+    Each export lives in its own ``<version>-<dtype>`` directory and is moved into
+    place in one rename, so processes still mapping an older export keep working.
+    Afterwards, exports written before this one are removed, except the one for
+    the collection's current version.
+    """
+    import chromadb
+
+    if dtype not in FLAT_INDEX_DTYPES:
+        raise ValueError(f"Unknown flat index dtype {dtype!r} (expected one of {FLAT_INDEX_DTYPES})")
+    # Read the version first: if the collection changes while exporting, the export is simply stale
+    version = collection_version(persist_directory, collection_name)
+    root = flat_index_root(persist_directory, collection_name)
+    target = os.path.join(root, _export_name(version, dtype))
+    tmp = os.path.join(root, f".tmp-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp)
+
+    collection = chromadb.PersistentClient(path=persist_directory).get_or_create_collection(collection_name)
+    ids, vectors, offsets = [], [], [0]
+    with open(os.path.join(tmp, "chunks.jsonl"), "wb") as chunks:
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            for cid, embedding, text, metadata in zip(page["ids"], page["embeddings"], page["documents"],
+                                                      page["metadatas"]):
+                ids.append(cid)
+                vectors.append(np.asarray(embedding, dtype=np.float32))
+                chunks.write(json.dumps({"text": text, "metadata": metadata or {}}).encode("utf-8") + b"\n")
+                offsets.append(chunks.tell())
+            offset += len(page["ids"])
+
+    exact = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    _save(tmp, "exact.npy", exact)
+    _save(tmp, "norms.npy", (exact * exact).sum(axis=1).astype(np.float32))
+    _save(tmp, "offsets.npy", np.asarray(offsets, dtype=np.int64))
+    if dtype == "int8":
+        # Symmetric per-row quantization: row ≈ int8 values * scale
+        scales = np.abs(exact).max(axis=1) / 127.0 if len(exact) else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        _save(tmp, "vectors.npy", np.round(exact / scales[:, None]).astype(np.int8))
+        _save(tmp, "scales.npy", scales)
+    else:
+        _save(tmp, "vectors.npy", exact.astype(np.float16))
+    with open(os.path.join(tmp, "ids.json"), "w") as f:
+        json.dump(ids, f)
+    exported_at = time.time()
+    with open(os.path.join(tmp, MANIFEST_FILE), "w") as f:
+        json.dump({"version": version, "dtype": dtype, "count": len(ids), "dimensions": int(exact.shape[1]),
+                   "exported_at": exported_at}, f, indent=2)
+
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another process finished the same export first
+        shutil.rmtree(tmp, ignore_errors=True)
+    # The collection may have changed during the export, and another process may already have exported that
+    # newer version: keep it, and only drop exports written before this one (a process still mapping one keeps
+    # its open files)
+    current = collection_version(persist_directory, collection_name)
+    for name in os.listdir(root):
+        if name.startswith((".tmp-", f"{version}-", f"{current}-")):
+            continue
+        if _exported_at(os.path.join(root, name)) < exported_at:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return target
+
+
+def _exported_at(directory):
+    """When an export was written, or 0 for a directory that is not a complete export"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f).get("exported_at", 0.0)
+    except (OSError, ValueError):
+        return 0.0
+
+
+class FlatIndex:
+    """Exact nearest-neighbour search over a memory-mapped export of one collection.
+
+    The (float16 or int8) matrix is scanned with a NumPy matmul; the best
+    ``oversample`` x k candidates are then rescored against the float32 vectors,
+    so results and distances match Chroma's (squared L2). All arrays are opened
+    with ``mmap_mode="r"``: opening is nearly free, and processes serving the same
+    store share one page-cached copy. It offers the part of the Chroma
+    vector store / collection API that BaseRAG and BM25Index use.
+
+    Users hold the index with ``acquire``/``release``; once it is replaced by a
+    newer export, ``retire`` closes it as soon as the last holder releases it.
+    """
+
+    def __init__(self, directory, embedding_function=None, oversample=4):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.oversample = oversample
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.dtype = self.manifest["dtype"]
+        self.vectors = self._load("vectors.npy")
+        self.exact = self._load("exact.npy")
+        self.norms = self._load("norms.npy")
+        self.offsets = self._load("offsets.npy")
+        self.scales = self._load("scales.npy") if self.dtype == "int8" else None
+        with open(os.path.join(directory, "ids.json")) as f:
+            self.ids = json.load(f)
+        self._rows = {cid: row for row, cid in enumerate(self.ids)}
+        self._chunks_file = open(os.path.join(directory, "chunks.jsonl"), "rb")
+        self._chunks = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ) if self.ids else b""
+        self._leases = 0
+        self._retired = False
+        self.closed = False
+        self._lease_lock = threading.Lock()
+
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, name), mmap_mode="r")
+
+    def count(self):
+        return len(self.ids)
+
+    def _approximate_distances(self, query):
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return self.norms - 2 * scores
+
+    def search(self, embedding, k):
+        """[(row, squared L2 distance)] of the k nearest rows, closest first"""
+        if not self.ids or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        approximate = self._approximate_distances(query)
+        n_candidates = min(len(self.ids), k * self.oversample)
+        if n_candidates < len(self.ids):
+            candidates = np.sort(np.argpartition(approximate, n_candidates - 1)[:n_candidates])
+        else:
+            candidates = np.arange(len(self.ids))
+        # Exact rescoring touches only the candidate rows of the float32 file
+        exact = np.asarray(self.exact[candidates], dtype=np.float32) - query
+        distances = (exact * exact).sum(axis=1)
+        best = np.argsort(distances)[:k]
+        return [(int(candidates[i]), float(distances[i])) for i in best]
+
+    def _record(self, row):
+        return json.loads(self._chunks[self.offsets[row]:self.offsets[row + 1]])
+
+    def document(self, row):
+        record = self._record(row)
+        return Document(page_content=record["text"], metadata=record["metadata"], id=self.ids[row])
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4):
+        return [(self.document(row), distance) for row, distance in self.search(embedding, k)]
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in
+                self.similarity_search_by_vector_with_relevance_scores(self.embedding_function.embed_query(query), k)]
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=0):
+        """Chroma-style {"ids", "documents", "metadatas"} for the given ids, or a page of all rows"""
+        if ids is not None:
+            rows = [self._rows[cid] for cid in ids if cid in self._rows]
+        else:
+            rows = range(offset, len(self.ids) if limit is None else min(len(self.ids), offset + limit))
+        records = [self._record(row) for row in rows]
+        result = {"ids": [self.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [r["text"] for r in records]
+        if "metadatas" in include:
+            result["metadatas"] = [r["metadata"] for r in records]
+        return result
+
+    def acquire(self):
+        with self._lease_lock:
+            if self.closed:
+                raise ValueError(f"Flat index {self.directory} is closed")
+            self._leases += 1
+
+    def release(self):
+        with self._lease_lock:
+            self._leases -= 1
+            close = self._retired and not self._leases
+        if close:
+            self.close()
+
+    def retire(self):
+        """Close the index as soon as nobody holds it"""
+        with self._lease_lock:
+            self._retired = True
+            close = not self._leases
+        if close:
+            self.close()
+
+    def close(self):
+        with self._lease_lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.ids:
+            self._chunks.close()
+        self._chunks_file.close()
+        # The arrays' mappings are released with the last reference to them
+        self.vectors = self.exact = self.norms = self.offsets = self.scales = None
+
+
+def _current_export(persist_directory, collection_name, dtype):
+    """Directory of the export of the collection's current version, or None if it has not been written"""
+    directory = os.path.join(flat_index_root(persist_directory, collection_name),
+                             _export_name(collection_version(persist_directory, collection_name), dtype))
+    return directory if os.path.exists(os.path.join(directory, MANIFEST_FILE)) else None
+
+
+def load_flat_index(persist_directory, collection_name=DEFAULT_COLLECTION, dtype="int8", embedding_function=None):
+    """Open the flat index matching the collection's current version, exporting it first if needed"""
+    directory = _current_export(persist_directory, collection_name, dtype)
+    if directory is None:
+        print(f"Exporting collection '{collection_name}' to a flat index ({dtype})...")
+        directory = export_collection(persist_directory, collection_name, dtype)
+    return FlatIndex(directory, embedding_function=embedding_function)
+
+
+def open_current_flat_index(persist_directory, collection_name=DEFAULT_COLLECTION, dtype="int8",
+                            embedding_function=None):
+    """The flat index of the collection's current version if it is already exported, else None"""
+    directory = _current_export(persist_directory, collection_name, dtype)
+    return FlatIndex(directory, embedding_function=embedding_function) if directory else None
+
+
+def export_for_flat_backend(persist_directory, collection_name=DEFAULT_COLLECTION):
+    """After a write: export the new version if engines search flat indexes, so they never export on a query"""
+    from assistant_core.config import FLAT_INDEX_DTYPE, VECTOR_BACKEND
+
+    if VECTOR_BACKEND != "flat" or _current_export(persist_directory, collection_name, FLAT_INDEX_DTYPE):
+        return None
+    print(f"Exporting collection '{collection_name}' to a flat index ({FLAT_INDEX_DTYPE})...")
+    return export_collection(persist_directory, collection_name, FLAT_INDEX_DTYPE)
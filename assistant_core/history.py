@@ -0,0 +1,202 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from assistant_core.resilience import ResilientLLM
+from assistant_core.tokens import count_tokens, truncate_to_tokens
+
+NO_HISTORY = "No previous conversation"
+DEFAULT_HISTORY_BUDGET = 600
+
+SUMMARY_TEMPLATE = """You maintain a running summary of a conversation between a user and a CFD / OpenFOAM assistant.
+Update the summary with the new messages. Keep the user's goals, the case details (solver, mesh, boundary conditions, models, numbers) and any conclusions or decisions. Drop greetings, formatting and explanations the user does not need repeated.
+Write at most {max_words} words of plain text.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def _role(message):
+    return "User" if message["role"] == "user" else "Assistant"
+
+
+def _prefix_hashes(messages):
+    """hashes[i] identifies messages[:i], so a summary can be cached per conversation prefix"""
+    hashes = [""]
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message['role']}\x00{message['content']}\x01".encode("utf-8"))
+        hashes.append(digest.copy().hexdigest())
+    return hashes
+
+
+def summary_llm(llm):
+    """The summarizer's own resilient wrapper around the raw model.
+
+    Its latencies and failures stay out of the answering LLM's hedging window
+    and circuit breaker. No retries or hedging: a failed fold falls back to the
+    extractive summary.
+    """
+    if llm is None:
+        return None
+    if hasattr(llm, "around"):
+        # Outer limits (the service's LLM slots) stay shared with the answering calls
+        return llm.around(summary_llm(llm.llm))
+    if isinstance(llm, ResilientLLM):
+        llm = llm.llm
+    return ResilientLLM(llm, retries=0, hedge=False)
+
+
+def extractive_summary(summary, messages, max_tokens):
+    """Model-free fallback: user questions plus the first sentence of each answer, oldest lines dropped first"""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        text = " ".join(message["content"].split())
+        if message["role"] != "user":
+            text = _SENTENCE_RE.split(text, 1)[0]
+        lines.append(f"- {_role(message)}: {truncate_to_tokens(text, 60)}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), max_tokens)
+
+
+class HistoryManager:
+    """Builds the chat history part of the prompt within a token budget.
+
+    Recent messages are included verbatim (newest first, up to
+    ``budget - summary_tokens`` tokens); everything older is represented by a
+    rolling summary. Summaries are cached per conversation prefix and updated
+    incrementally: each new turn folds only the messages that just fell out of
+    the verbatim window into the previous summary. ``prefetch`` does that fold in
+    the background right after an answer, so the next question finds it ready.
+    Without an ``llm`` (or if the LLM call fails) an extractive summary is used.
+    """
+
+    def __init__(self, llm=None, budget=DEFAULT_HISTORY_BUDGET, summary_tokens=200, max_cached=256):
+        self.llm = summary_llm(llm)
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.max_cached = max_cached
+        self.prompt_template = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE)
+        self._summaries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self.summaries_computed = 0
+
+    def _split(self, messages):
+        """Index of the first message kept verbatim"""
+        verbatim_budget = self.budget - self.summary_tokens
+        used = 0
+        split = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            tokens = count_tokens(messages[i]["content"]) + 2
+            if used + tokens > verbatim_budget and split < len(messages):
+                break
+            used += tokens
+            split = i
+        # Don't start the verbatim window with an answer whose question was summarized
+        if 0 < split < len(messages) - 1 and messages[split]["role"] != "user":
+            split += 1
+        return split
+
+    def _fold(self, summary, messages):
+        if self.llm is not None:
+            from assistant_core.rag_base import extract_text
+
+            transcript = "\n".join(
+                f"{_role(m)}: {truncate_to_tokens(m['content'], 400)}" for m in messages)
+            prompt = self.prompt_template.format_messages(
+                summary=summary or "(empty)", messages=transcript, max_words=int(self.summary_tokens * 0.7))
+            try:
+                return truncate_to_tokens(extract_text(self.llm.invoke(prompt)).strip(), self.summary_tokens)
+            except Exception as e:
+                print(f"History summary failed, using extractive summary: {e}")
+        return extractive_summary(summary, messages, self.summary_tokens)
+
+    def _cache_put(self, key, summary):
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_cached:
+            self._summaries.popitem(last=False)
+
+    def _summary_for(self, messages, hashes, split, wait_for_prefetch=True):
+        """Summary of messages[:split], folding only the messages not covered by the longest cached prefix"""
+        if split == 0:
+            return ""
+        key = hashes[split]
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+            pending = self._pending.get(key) if wait_for_prefetch else None
+        if pending is not None:
+            return pending.result()
+
+        with self._lock:
+            start = next((i for i in range(split - 1, 0, -1) if hashes[i] in self._summaries), 0)
+            previous = self._summaries.get(hashes[start], "") if start else ""
+        summary = self._fold(previous, messages[start:split])
+        with self._lock:
+            self._cache_put(key, summary)
+            self.summaries_computed += 1
+        return summary
+
+    def format(self, messages):
+        """Prompt text for a chat history: rolling summary of older turns plus recent turns verbatim"""
+        if not messages:
+            return NO_HISTORY
+        split = self._split(messages)
+        summary = self._summary_for(messages, _prefix_hashes(messages), split)
+
+        per_message = max(self.budget - self.summary_tokens, 1)
+        lines = [f"Summary of earlier conversation: {summary}"] if summary else []
+        lines += [f"{_role(m)}: {truncate_to_tokens(m['content'], per_message)}" for m in messages[split:]]
+        return "\n".join(lines)
+
+    def cache_key(self, messages):
+        """Identifies the turns kept verbatim, for answer cache keys; unlike the LLM-written summary it is repeatable"""
+        return _prefix_hashes(messages[self._split(messages):])[-1]
+
+    def prefetch(self, messages):
+        """Compute, in the background, the summary the next question will need for this history"""
+        split = self._split(messages)
+        if split == 0:
+            return
+        hashes = _prefix_hashes(messages)
+        key = hashes[split]
+        with self._lock:
+            if key in self._summaries or key in self._pending:
+                return
+            future = self._executor.submit(self._summary_for, messages, hashes, split, False)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._forget_pending(key))
+
+    def _forget_pending(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_history_manager(llm=None):
+    """Return the process-wide history manager shared by all engines (``llm`` is used on first creation)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = HistoryManager(llm=llm)
+    return _manager
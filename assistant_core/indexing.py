@@ -0,0 +1,147 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import List
+
+from langchain_core.documents import Document
+
+from assistant_core.bm25 import BM25Index, bm25_index_path
+from assistant_core.collection_state import DEFAULT_COLLECTION, mark_collection_changed
+from assistant_core.flat_index import export_for_flat_backend
+from assistant_core.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, dedup_index_path
+
+# Keep each Chroma call well below its maximum batch size
+WRITE_BATCH_SIZE = 1000
+# Source key of uploaded chunks in a pipeline run
+UPLOAD_SOURCE = "upload"
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable chunk ID derived from the chunk's content.
+
+    Only the text is hashed, not the source or page, so the same passage is
+    stored (and embedded) once even if it comes from several sources, such as
+    a manifest PDF that a user also uploads, and re-ingesting an unchanged
+    source writes nothing new.
+    """
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def sidecar_path(persist_directory, filename):
+    """Path for a cache file kept next to (not inside) the vector store, so it survives a full rebuild"""
+    return os.path.join(os.path.dirname(os.path.abspath(persist_directory)), filename)
+
+
+def embedding_cache_path(persist_directory):
+    return sidecar_path(persist_directory, "embedding_cache.sqlite3")
+
+
+def existing_ids(vectorstore, ids):
+    found = set()
+    for start in range(0, len(ids), WRITE_BATCH_SIZE):
+        found.update(vectorstore.get(ids=ids[start:start + WRITE_BATCH_SIZE], include=[])["ids"])
+    return found
+
+
+def uploaded_chunks_path(persist_directory, collection_name):
+    return os.path.join(persist_directory, f"uploaded_chunks_{collection_name}.sqlite3")
+
+
+class UploadedChunks:
+    """Persistent set (SQLite) of the chunk IDs holding uploaded text in a collection.
+
+    Chunk IDs are content hashes, so an upload can share a chunk with a manifest
+    source, in either order. Manifest ingestion deletes a source's chunks when it
+    changes or is removed, except those in this set.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY)")
+        self._conn.commit()
+
+    def add(self, chunk_ids):
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO chunks (chunk_id) VALUES (?)", ((cid,) for cid in chunk_ids))
+            self._conn.commit()
+
+    def held(self, chunk_ids):
+        """The subset of ``chunk_ids`` that uploads hold"""
+        chunk_ids = list(chunk_ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), WRITE_BATCH_SIZE):
+                batch = chunk_ids[start:start + WRITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({placeholders})", batch))
+        return found
+
+
+def index_documents(splits: List[Document], persist_directory, embedding_function,
+                    collection_name=DEFAULT_COLLECTION, batch_size=64, near_duplicate_threshold=DEFAULT_THRESHOLD,
+                    uploaded=False):
+    """Upsert already-split chunks into the vector store, skipping chunks it already holds.
+
+    Chunks get content-addressed IDs, so re-running ingestion never duplicates
+    them, near-duplicates of stored chunks are dropped, and new chunks go through a
+    persistent embedding cache. With ``uploaded`` every chunk holding the text
+    (written, already stored or the near-duplicate kept instead) is recorded in
+    UploadedChunks. Returns a stats dict (chunks, added, already indexed,
+    near-duplicates, cache hit rate, time saved, per-stage rates).
+    """
+    from assistant_core.pipeline import IngestionPipeline
+
+    pipeline = IngestionPipeline(
+        persist_directory,
+        embedding_function,
+        collection_name=collection_name,
+        batch_size=batch_size,
+        near_duplicate_threshold=near_duplicate_threshold,
+        track_sources=uploaded,
+    )
+    stats = pipeline.run((UPLOAD_SOURCE, split) for split in splits) if uploaded else pipeline.run(splits)
+    if uploaded:
+        UploadedChunks(uploaded_chunks_path(persist_directory, collection_name)).add(
+            stats["source_chunks"].get(UPLOAD_SOURCE, []))
+    if stats["added"]:
+        export_for_flat_backend(persist_directory, collection_name)
+    return stats
+
+
+def delete_chunks(persist_directory, chunk_ids, collection_name=DEFAULT_COLLECTION):
+    """Remove chunks from a collection and its keyword and near-duplicate indexes; returns how many were stored"""
+    import chromadb
+
+    chunk_ids = list(chunk_ids)
+    if not chunk_ids:
+        return 0
+    collection = chromadb.PersistentClient(path=persist_directory).get_or_create_collection(collection_name)
+    deleted = 0
+    for start in range(0, len(chunk_ids), WRITE_BATCH_SIZE):
+        batch = chunk_ids[start:start + WRITE_BATCH_SIZE]
+        deleted += len(collection.get(ids=batch, include=[])["ids"])
+        collection.delete(ids=batch)
+    BM25Index(bm25_index_path(persist_directory, collection_name)).remove(chunk_ids)
+    NearDuplicateIndex(dedup_index_path(persist_directory, collection_name)).remove(chunk_ids)
+    if deleted:
+        mark_collection_changed(persist_directory, collection_name)
+    return deleted
+
+
+def format_index_report(stats):
+    report = (f"{stats['added']} new chunk(s), {stats['already_indexed']} already indexed, "
+              f"embedding cache hit rate {stats['hit_rate']:.0%}, ~{stats['time_saved_s']:.1f}s embedding time saved")
+    if stats.get("near_duplicates"):
+        report += f"; {format_near_duplicate_report(stats)}"
+    return report
+
+
+def format_near_duplicate_report(stats):
+    return (f"{stats['near_duplicates']} near-duplicate chunk(s) skipped, "
+            f"~{stats['near_duplicate_bytes_saved'] / 1024:.0f} KB and "
+            f"~{stats['near_duplicate_embed_s_saved']:.1f}s embedding time saved")
@@ -0,0 +1,364 @@
+"""Manifest-driven incremental ingestion, shared by the domains' ``ingest.py`` scripts.
+
+    python -m assistant_core.ingestion --domain CFD      # same as: cd cfd_gpt && python ingest.py
+
+Each domain lists its sources in a manifest (``sources.json`` next to its
+``ingest.py``): web pages, Wikipedia topics and PDF globs. Per-source state
+(ETag / Last-Modified, file mtime and size, content hash and the chunks the
+source produced) is kept next to the collection, so a re-run only fetches,
+splits and embeds the sources that changed, and deletes the chunks of sources
+that changed or were removed from the manifest.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+from assistant_core.config import DOMAINS
+from assistant_core.fetch import (Fetcher, format_latency_report, response_validators, web_document,
+                                  wikipedia_documents, wikipedia_url)
+from assistant_core.flat_index import export_for_flat_backend
+from assistant_core.indexing import UploadedChunks, delete_chunks, format_near_duplicate_report, uploaded_chunks_path
+from assistant_core.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, dedup_index_path
+from assistant_core.pipeline import IngestionPipeline, format_stage_report
+from assistant_core.splitter import default_splitter
+
+WEB = "web"
+WIKIPEDIA = "wikipedia"
+PDF = "pdf"
+SOURCE_KINDS = (WEB, WIKIPEDIA, PDF)
+
+# Outcome of a source in an incremental run
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+REMOVED = "removed"
+
+
+class Source:
+    """One manifest entry: a web page, a Wikipedia topic or a PDF file"""
+
+    def __init__(self, kind, location, path=None):
+        self.kind = kind
+        self.location = location
+        self.path = path
+
+    @property
+    def key(self):
+        return f"{self.kind}:{self.location}"
+
+    @property
+    def url(self):
+        return wikipedia_url(self.location) if self.kind == WIKIPEDIA else self.location
+
+
+def _entries(value):
+    """A manifest section is a list, or a {group name: list} dict kept for readability"""
+    if isinstance(value, dict):
+        return [entry for group in value.values() for entry in group]
+    return list(value)
+
+
+def load_manifest(path):
+    """Sources listed in a manifest; PDF globs are expanded relative to the manifest's folder"""
+    with open(path) as f:
+        manifest = json.load(f)
+    unknown = set(manifest) - set(SOURCE_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown source kind(s) {sorted(unknown)} in {path} (expected {list(SOURCE_KINDS)})")
+    base = os.path.dirname(os.path.abspath(path))
+    sources = [Source(WEB, url) for url in _entries(manifest.get(WEB, []))]
+    sources += [Source(WIKIPEDIA, topic) for topic in _entries(manifest.get(WIKIPEDIA, []))]
+    for pattern in _entries(manifest.get(PDF, [])):
+        for file in sorted(glob.glob(os.path.join(base, pattern))):
+            sources.append(Source(PDF, os.path.relpath(file, base), path=file))
+    unique = {}
+    for source in sources:
+        unique.setdefault(source.key, source)
+    return list(unique.values())
+
+
+def ingest_state_path(persist_directory, collection_name):
+    return os.path.join(persist_directory, f"ingest_state_{collection_name}.json")
+
+
+def read_ingest_state(path):
+    """{source key: state} recorded by the last run, or {} before the first one"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_ingest_state(path, state):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Write atomically so an interrupted run leaves the previous state intact
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IncrementalIngester:
+    """Brings a collection in line with a source manifest, touching only what changed.
+
+    A web page or Wikipedia topic is re-fetched with its previous ETag /
+    Last-Modified; a 304, or a body with the same content hash, counts as
+    unchanged. A PDF is unchanged if its mtime and size (or else its content
+    hash) match. New and changed sources stream through the IngestionPipeline,
+    which reports the chunks each one produced. Chunks that only belonged to
+    changed or removed sources are then deleted, from the vector store and its
+    keyword and near-duplicate indexes, unless an upload holds them too (see
+    indexing.UploadedChunks). A source that fails to load keeps its
+    previous chunks. ``full`` re-processes every source (chunks still in the
+    store are not re-embedded) and drops whatever became stale.
+    """
+
+    def __init__(self, sources, persist_directory, collection_name, embedding_function=None, fetcher=None,
+                 batch_size=64, embed_workers=0, near_duplicate_threshold=DEFAULT_THRESHOLD, full=False):
+        self.sources = sources
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self.fetcher = fetcher or Fetcher()
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.full = full
+        self.state_path = ingest_state_path(persist_directory, collection_name)
+
+    def _record(self, source, outcome, entry=None):
+        self.outcomes[source.key] = outcome
+        if entry is not None:
+            self.state[source.key] = entry
+        elif source.key in self.previous:
+            # Unchanged or failed: keep the previous state and chunks
+            self.state[source.key] = self.previous[source.key]
+
+    def _changed(self, source, entry, documents):
+        outcome = CHANGED if source.key in self.previous else NEW
+        self._record(source, outcome, entry)
+        if outcome == CHANGED and self._near_duplicates is not None:
+            # The new version must not be dropped as a near-duplicate of the old one it replaces
+            # (unless another source or an upload still holds that chunk)
+            sole = [cid for cid in self.previous[source.key].get("chunk_ids", []) if self._owners[cid] == 1]
+            self._near_duplicates.remove(set(sole) - self._uploaded.held(sole))
+        for doc in documents:
+            yield source.key, doc
+
+    def _remote_documents(self, remote):
+        if not remote:
+            return
+        by_url = {source.url: source for source in remote}
+        previous = {} if self.full else {url: self.previous.get(source.key) for url, source in by_url.items()}
+        print(f"\n🌐 Checking {len(by_url)} web page(s) and Wikipedia article(s) for changes...")
+        for i, result in enumerate(self.fetcher.fetch_all(by_url, previous), 1):
+            self.fetch_results.append(result)
+            source = by_url[result.url]
+            label = f"'{source.location}'" if source.kind == WIKIPEDIA else source.location
+            old = self.previous.get(source.key)
+            if result.not_modified:
+                self._record(source, UNCHANGED)
+                continue
+            if not result.ok:
+                print(f"  [{i}/{len(by_url)}] ✗ Failed to load {label}: {result.error}")
+                self._record(source, FAILED)
+                continue
+            entry = dict(response_validators(result), content_hash=hashlib.sha256(result.body).hexdigest(),
+                         chunk_ids=[])
+            if old and not self.full and old.get("content_hash") == entry["content_hash"]:
+                self._record(source, UNCHANGED, dict(entry, chunk_ids=old.get("chunk_ids", [])))
+                continue
+            try:
+                docs = wikipedia_documents(result) if source.kind == WIKIPEDIA else [web_document(result)]
+            except Exception as e:
+                print(f"  [{i}/{len(by_url)}] ✗ Failed to parse {label}: {e}")
+                self._record(source, FAILED)
+                continue
+            cached = ", cached" if result.from_cache else ""
+            print(f"  [{i}/{len(by_url)}] ✓ {label}: {len(docs)} doc(s) ({result.elapsed * 1000:.0f} ms{cached})")
+            yield from self._changed(source, entry, docs)
+
+    def _pdf_documents(self, pdfs):
+        if not pdfs:
+            print("\n📑 No PDF files found.")
+            return
+        from langchain_community.document_loaders import PyPDFLoader
+
+        print(f"\n📑 Checking {len(pdfs)} PDF file(s) for changes...")
+        for source in pdfs:
+            old = self.previous.get(source.key)
+            try:
+                stat = os.stat(source.path)
+                entry = {"mtime": stat.st_mtime, "size": stat.st_size, "chunk_ids": []}
+                if old and not self.full and (old.get("mtime"), old.get("size")) == (entry["mtime"], entry["size"]):
+                    self._record(source, UNCHANGED)
+                    continue
+                entry["content_hash"] = _file_hash(source.path)
+                if old and not self.full and old.get("content_hash") == entry["content_hash"]:
+                    self._record(source, UNCHANGED, dict(entry, chunk_ids=old.get("chunk_ids", [])))
+                    continue
+                # Load before yielding, so a broken file keeps its previous chunks
+                pages = list(PyPDFLoader(source.path).lazy_load())
+            except Exception as e:
+                print(f"  ✗ Failed to load {source.location}: {e}")
+                self._record(source, FAILED)
+                continue
+            print(f"  ✓ {source.location}: {len(pages)} page(s)")
+            yield from self._changed(source, entry, pages)
+
+    def _documents(self):
+        """Yield (source key, document) for every new or changed source"""
+        yield from self._remote_documents([s for s in self.sources if s.kind != PDF])
+        yield from self._pdf_documents([s for s in self.sources if s.kind == PDF])
+
+    def run(self, splitter=None):
+        """Ingest new and changed sources, delete stale chunks and save the state; returns stats"""
+        self.previous = read_ingest_state(self.state_path)
+        self.state = {}
+        self.outcomes = {}
+        self.fetch_results = []
+        self._owners = Counter(cid for entry in self.previous.values() for cid in entry.get("chunk_ids", []))
+        self._uploaded = UploadedChunks(uploaded_chunks_path(self.persist_directory, self.collection_name))
+        self._near_duplicates = None
+        if self.near_duplicate_threshold:
+            self._near_duplicates = NearDuplicateIndex(dedup_index_path(self.persist_directory, self.collection_name))
+        pipeline = IngestionPipeline(
+            self.persist_directory,
+            self.embedding_function,
+            splitter=splitter,
+            batch_size=self.batch_size,
+            embed_workers=self.embed_workers,
+            collection_name=self.collection_name,
+            near_duplicate_threshold=self.near_duplicate_threshold,
+            track_sources=True,
+        )
+        stats = pipeline.run(self._documents())
+
+        for key, outcome in self.outcomes.items():
+            if outcome in (NEW, CHANGED):
+                self.state[key]["chunk_ids"] = sorted(set(stats["source_chunks"].get(key, [])))
+        for key in self.previous:
+            if key not in self.outcomes:
+                self.outcomes[key] = REMOVED
+        # A chunk is stale once no source in the manifest still produces it and no upload holds it
+        # (IDs are content hashes, so an uploaded passage can be recorded under a manifest source too)
+        kept = {cid for entry in self.state.values() for cid in entry.get("chunk_ids", [])}
+        replaced = {cid for key, outcome in self.outcomes.items() if outcome in (CHANGED, REMOVED)
+                    for cid in self.previous[key].get("chunk_ids", [])}
+        stale = replaced - kept
+        stale -= self._uploaded.held(stale)
+        stats["deleted"] = delete_chunks(self.persist_directory, stale, self.collection_name)
+        write_ingest_state(self.state_path, self.state)
+
+        stats["sources"] = {outcome: sum(1 for o in self.outcomes.values() if o == outcome)
+                            for outcome in (NEW, CHANGED, UNCHANGED, FAILED, REMOVED)}
+        stats["fetch_results"] = self.fetch_results
+        return stats
+
+
+def format_source_report(stats):
+    counts = stats["sources"]
+    return (f"{counts[NEW]} new, {counts[CHANGED]} changed, {counts[UNCHANGED]} unchanged, "
+            f"{counts[REMOVED]} removed, {counts[FAILED]} failed; {stats['deleted']} stale chunk(s) deleted")
+
+
+def ingest_domain(mode, offline=False, batch_size=64, embed_workers=0, documents=None, persist_directory=None,
+                  embedding_function=None, near_duplicate_threshold=DEFAULT_THRESHOLD, full=False):
+    """Bring a domain's collection up to date with its source manifest.
+
+    ``documents``, ``persist_directory`` and ``embedding_function`` override the
+    manifest's sources, the shared store and the model (used by the benchmarks);
+    given ``documents`` are simply added, without per-source state.
+    Near-duplicate chunks are skipped unless ``near_duplicate_threshold`` is None.
+    """
+    from assistant_core.embeddings import get_embedding_function
+
+    domain = DOMAINS[mode]
+    print("=" * 60)
+    print(f"{mode} Knowledge Base Ingestion")
+    print("=" * 60)
+
+    text_splitter = default_splitter()
+    # With worker processes the model is loaded there, not in this process
+    embedding_model = embedding_function or (None if embed_workers else get_embedding_function())
+    # Written to this domain's collection in the shared store
+    persist_directory = persist_directory or domain["persist_directory"]
+    start = time.perf_counter()
+    if documents is None:
+        fetcher = Fetcher(cache_dir=os.path.join(domain["package_dir"], "http_cache"), offline=offline)
+        ingester = IncrementalIngester(
+            load_manifest(domain["sources"]),
+            persist_directory,
+            domain["collection"],
+            embedding_function=embedding_model,
+            fetcher=fetcher,
+            batch_size=batch_size,
+            embed_workers=embed_workers,
+            near_duplicate_threshold=near_duplicate_threshold,
+            full=full,
+        )
+        stats = ingester.run(text_splitter)
+        if stats["fetch_results"]:
+            print("\n⏱️  Fetch latency per source:")
+            print(format_latency_report(stats["fetch_results"]))
+    else:
+        pipeline = IngestionPipeline(
+            persist_directory,
+            embedding_model,
+            splitter=text_splitter,
+            batch_size=batch_size,
+            embed_workers=embed_workers,
+            collection_name=domain["collection"],
+            near_duplicate_threshold=near_duplicate_threshold,
+        )
+        stats = pipeline.run(documents)
+    export_for_flat_backend(persist_directory, domain["collection"])
+
+    print("=" * 60)
+    print(f"✅ Ingestion complete in {time.perf_counter() - start:.1f}s! Vector store saved to {persist_directory} "
+          f"(collection '{domain['collection']}')")
+    if "sources" in stats:
+        print(f"   Sources: {format_source_report(stats)}")
+    print(f"   Documents loaded: {stats['documents']}, chunks: {stats['chunks']}")
+    print(f"   Chunks added: {stats['added']} (already indexed: {stats['already_indexed']})")
+    print(f"   Embedding cache hit rate: {stats['hit_rate']:.0%}, ~{stats['time_saved_s']:.1f}s saved")
+    print(f"   Near-duplicates: {format_near_duplicate_report(stats)}")
+    print("\n⚙️  Stage throughput:")
+    print(format_stage_report(stats))
+    print("=" * 60)
+    return stats
+
+
+def main(argv=None, domain=None):
+    parser = argparse.ArgumentParser(description=f"Build the {domain or 'domain'} knowledge base from its source manifest")
+    if domain is None:
+        parser.add_argument("--domain", required=True, choices=list(DOMAINS))
+    parser.add_argument("--offline", action="store_true", help="replay web sources from the http_cache instead of the network")
+    parser.add_argument("--full", action="store_true", help="re-process every source, not just the changed ones")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding/upsert batch")
+    parser.add_argument("--embed-workers", type=int, default=0, help="embed in this many worker processes (0 = in-process)")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="skip chunks at least this similar (MinHash Jaccard) to an indexed one")
+    parser.add_argument("--keep-near-duplicates", action="store_true", help="index near-duplicate chunks too")
+    args = parser.parse_args(argv)
+    ingest_domain(domain or args.domain, offline=args.offline, batch_size=args.batch_size,
+                  embed_workers=args.embed_workers, full=args.full,
+                  near_duplicate_threshold=None if args.keep_near_duplicates else args.near_duplicate_threshold)
+
+
+if __name__ == "__main__":
+    main()
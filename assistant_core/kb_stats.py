@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import Counter
+
+from assistant_core.collection_state import read_collection_state
+from assistant_core.engines import get_registry
+
+# Types reported for chunks that don't carry a "type" metadata field
+WEB = "web"
+WIKIPEDIA = "wikipedia"
+PDF = "pdf"
+DOCUMENT = "document"
+
+
+def source_type(metadata):
+    """Kind of source a chunk came from: its "type" field (image_ocr, pdf_ocr) or a guess from its source"""
+    if metadata.get("type"):
+        return metadata["type"]
+    source = str(metadata.get("source", ""))
+    if "wikipedia.org" in source:
+        return WIKIPEDIA
+    if source.startswith(("http://", "https://")):
+        return WEB
+    if "page" in metadata or source.lower().endswith(".pdf"):
+        return PDF
+    return DOCUMENT
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def collection_stats(collection, page_size=1000):
+    """Chunk counts in total, per source and per source type, from one pass over a collection's metadata"""
+    by_source, by_type = Counter(), Counter()
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        for metadata in page["metadatas"]:
+            metadata = metadata or {}
+            by_source[metadata.get("source", "unknown")] += 1
+            by_type[source_type(metadata)] += 1
+        offset += len(page["ids"])
+    return {"chunks": sum(by_type.values()), "by_source": dict(by_source.most_common()),
+            "by_type": dict(by_type.most_common())}
+
+
+class KnowledgeBaseStats:
+    """Knowledge base numbers for the UI, computed once per collection version.
+
+    Reads go through the registry's engines (their already open collection), and
+    are only repeated after an ingestion or upload has marked the collection as
+    changed, so a Streamlit rerun costs one small JSON read per collection.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get(self, mode, wait=True):
+        """{"chunks", "by_source", "by_type", "disk_bytes", "last_ingest"} for a domain, or None without a store
+
+        With ``wait=False`` it also returns None instead of building the
+        domain's engine, while a warm-up thread is still loading it.
+        """
+        domain = self.registry.domains[mode]
+        state = read_collection_state(domain["persist_directory"], domain["collection"])
+        version = state.get("version", "initial")
+        cached = self._cache.get(mode)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if not wait and self.registry.peek_engine(mode) is None:
+            return None
+
+        with self._lock:
+            cached = self._cache.get(mode)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            engine = self.registry.get_engine(mode)
+            if not engine.is_ready():
+                return None
+            with engine.document_collection() as collection:
+                stats = collection_stats(collection)
+            # The store directory is shared by all collections
+            stats["disk_bytes"] = directory_size(domain["persist_directory"])
+            stats["last_ingest"] = state.get("updated_at")
+            self._cache[mode] = (version, stats)
+            return stats
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_kb_stats():
+    """Return the process-wide stats service over the engine registry"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = KnowledgeBaseStats(get_registry())
+    return _service
@@ -0,0 +1,50 @@
+"""Copy the old per-domain vector stores into the shared multi-collection store.
+
+Embeddings are copied as they are, so nothing is re-embedded:
+
+    python -m assistant_core.migrate
+"""
+import os
+
+import chromadb
+
+from assistant_core.collection_state import DEFAULT_COLLECTION, mark_collection_changed
+from assistant_core.config import DOMAINS, STORE_DIRECTORY
+
+
+def migrate_collection(source_directory, target_directory, collection_name, page_size=1000):
+    """Upsert every chunk of a legacy store's collection into ``collection_name`` of the target store"""
+    source = chromadb.PersistentClient(path=source_directory).get_collection(DEFAULT_COLLECTION)
+    target = chromadb.PersistentClient(path=target_directory).get_or_create_collection(collection_name)
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        target.upsert(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=[m or None for m in page["metadatas"]],
+        )
+        copied += len(page["ids"])
+        offset += len(page["ids"])
+    if copied:
+        mark_collection_changed(target_directory, collection_name)
+    return copied
+
+
+def main():
+    for mode, domain in DOMAINS.items():
+        legacy = domain["legacy_directory"]
+        if not os.path.exists(legacy):
+            print(f"⏭️  {mode}: no legacy store at {legacy}")
+            continue
+        copied = migrate_collection(legacy, STORE_DIRECTORY, domain["collection"])
+        print(f"✅ {mode}: copied {copied} chunks into collection '{domain['collection']}'")
+    print(f"Shared store: {STORE_DIRECTORY} (keyword indexes are rebuilt on first use)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+from assistant_core.context import shingles
+
+DEFAULT_THRESHOLD = 0.85
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard share a bucket with high probability
+BANDS = 16
+# Chunks with fewer shingles (headings, captions) are too short to judge
+MIN_SHINGLES = 8
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(42)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_BATCH = 500
+_NOT_PENDING = object()
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERM uint32 values) of a text's word 3-shingles, or None if it is too short"""
+    text_shingles = shingles(text)
+    if len(text_shingles) < MIN_SHINGLES:
+        return None
+    hashes = np.fromiter((zlib.crc32(" ".join(s).encode("utf-8")) for s in text_shingles),
+                         dtype=np.uint64, count=len(text_shingles))
+    permuted = (hashes[:, None] * _A + _B) % _PRIME
+    return (permuted.min(axis=0) & 0xFFFFFFFF).astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+def _band_keys(signature):
+    rows = NUM_PERM // BANDS
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8,
+                                 person=band.to_bytes(2, "little")).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def dedup_index_path(persist_directory, collection_name):
+    return os.path.join(persist_directory, f"minhash_{collection_name}.sqlite3")
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index (SQLite) of the chunks in a collection.
+
+    ``check`` looks a new chunk up among the indexed chunks and those checked
+    earlier in the same run, and returns the ID of a chunk whose estimated
+    Jaccard similarity reaches ``threshold``. Chunks passed by ``check`` are
+    only written by ``commit``, once they are actually stored.
+    """
+
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS signatures (chunk_id TEXT PRIMARY KEY, signature BLOB)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key INTEGER, chunk_id TEXT, PRIMARY KEY (key, chunk_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_chunk ON buckets (chunk_id)")
+        self._conn.commit()
+        self._pending = {}
+        self._pending_buckets = {}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def _stored_candidates(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"SELECT DISTINCT b.chunk_id, s.signature FROM buckets b JOIN signatures s ON s.chunk_id = b.chunk_id "
+            f"WHERE b.key IN ({placeholders})", keys).fetchall()
+        return [(cid, np.frombuffer(blob, dtype=np.uint32)) for cid, blob in rows]
+
+    def check(self, chunk_id, text):
+        """ID of an indexed (or pending) near-duplicate of this chunk, or None after reserving it as pending"""
+        signature = minhash(text)
+        keys = _band_keys(signature) if signature is not None else []
+        with self._lock:
+            if chunk_id in self._pending or self._conn.execute(
+                    "SELECT 1 FROM signatures WHERE chunk_id = ?", (chunk_id,)).fetchone():
+                # The same chunk again: not a near-duplicate, the store skips it as already indexed
+                return None
+            if signature is None:
+                # Too short to judge; still recorded so the index stays in step with the collection
+                self._pending[chunk_id] = None
+                return None
+            candidates = self._stored_candidates(keys)
+            pending_ids = {cid for key in keys for cid in self._pending_buckets.get(key, ())}
+            candidates += [(cid, self._pending[cid]) for cid in pending_ids]
+            best = max(candidates, key=lambda c: similarity(signature, c[1]), default=None)
+            if best is not None and similarity(signature, best[1]) >= self.threshold:
+                return best[0]
+            self._pending[chunk_id] = signature
+            for key in keys:
+                self._pending_buckets.setdefault(key, set()).add(chunk_id)
+            return None
+
+    def commit(self, chunk_ids):
+        """Persist the signatures of pending chunks that were written to the store"""
+        with self._lock:
+            rows, buckets = [], []
+            for cid in chunk_ids:
+                signature = self._pending.pop(cid, _NOT_PENDING)
+                if signature is _NOT_PENDING:
+                    continue
+                rows.append((cid, None if signature is None else signature.tobytes()))
+                if signature is None:
+                    continue
+                for key in _band_keys(signature):
+                    buckets.append((key, cid))
+                    self._pending_buckets.get(key, set()).discard(cid)
+            self._conn.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?)", rows)
+            self._conn.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?)", buckets)
+            self._conn.commit()
+
+    def add(self, items):
+        """Index (chunk_id, text) pairs directly, e.g. chunks stored before the index existed"""
+        items = [(cid, text) for cid, text in items]
+        with self._lock:
+            for cid, text in items:
+                self._pending[cid] = minhash(text)
+        self.commit([cid for cid, _ in items])
+
+    def remove(self, chunk_ids):
+        """Forget chunks that were deleted from the store"""
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            for start in range(0, len(chunk_ids), _BATCH):
+                batch = chunk_ids[start:start + _BATCH]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM buckets WHERE chunk_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM signatures WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.commit()
+
+    def sync_from_collection(self, collection, page_size=1000):
+        """Backfill signatures for a collection's chunks (e.g. a store built before the index existed)"""
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            self.add(zip(page["ids"], page["documents"]))
+            offset += len(page["ids"])
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+# Pages whose text layer yields fewer characters than this are treated as scanned
+MIN_TEXT_CHARS = 20
+
+
+def otsu_threshold(histogram):
+    """Grey level that best separates foreground from background (Otsu's method)"""
+    total = sum(histogram)
+    sum_all = sum(level * count for level, count in enumerate(histogram))
+    weight_bg = 0
+    sum_bg = 0
+    best_variance = 0
+    threshold = 127
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            threshold = level
+    return threshold
+
+
+def preprocess(image, max_side=2500):
+    """Downscale, convert to grayscale and binarize an image before OCR"""
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side))
+    image = image.convert("L")
+    threshold = otsu_threshold(image.histogram())
+    return image.point(lambda p: 255 if p > threshold else 0)
+
+
+def _ocr_worker(image, lang, max_side):
+    """Runs in a worker process; ``image`` is a PIL image or raw image file bytes"""
+    import pytesseract
+    from PIL import Image
+
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    return pytesseract.image_to_string(preprocess(image, max_side), lang=lang)
+
+
+def image_hash(image):
+    if isinstance(image, bytes):
+        return hashlib.sha256(image).hexdigest()
+    digest = hashlib.sha256(f"{image.mode}{image.size}".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def pages_without_text(docs, min_chars=MIN_TEXT_CHARS):
+    """Indices of PDF page documents that have no usable text layer"""
+    return [i for i, doc in enumerate(docs) if len(doc.page_content.strip()) < min_chars]
+
+
+class OCRCache:
+    """Persistent image-hash -> OCR text cache, so re-uploads skip Tesseract entirely"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ocr (hash TEXT PRIMARY KEY, text TEXT)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ocr (hash, text) VALUES (?, ?)", (key, text))
+            self._conn.commit()
+
+
+class OCREngine:
+    """Parallel, cached Tesseract OCR for images and scanned PDF pages.
+
+    Pages are rasterized one at a time as workers free up (never the whole PDF
+    at once), preprocessed and OCR'd in a process pool of at most one worker per
+    page, created once per document; single images are OCR'd in the calling
+    process. Results are cached by image hash. ``last_stats`` holds pages, cache hits and pages/sec of the last run.
+    """
+
+    def __init__(self, cache_path, workers=None, dpi=200, lang="eng", max_side=2500):
+        self.cache = OCRCache(cache_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.dpi = dpi
+        self.lang = lang
+        self.max_side = max_side
+        self.last_stats = {}
+
+    def _cache_key(self, image):
+        # OCR settings are part of the key so changing them never returns stale text
+        return f"{image_hash(image)}:{self.lang}:{self.max_side}"
+
+    def _run(self, items, workers=None):
+        """OCR an iterable of (key, image) pairs on up to ``workers`` processes; returns {key: text}"""
+        workers = min(workers or self.workers, self.workers)
+        start = time.perf_counter()
+        results = {}
+        cached = 0
+
+        def uncached():
+            nonlocal cached
+            for key, image in items:
+                cache_key = self._cache_key(image)
+                text = self.cache.get(cache_key)
+                if text is not None:
+                    results[key] = text
+                    cached += 1
+                    continue
+                yield key, cache_key, image
+
+        if workers <= 1:
+            # One image or page: starting worker processes would cost more than the OCR itself
+            for key, cache_key, image in uncached():
+                results[key] = _ocr_worker(image, self.lang, self.max_side)
+                self.cache.put(cache_key, results[key])
+        else:
+            todo = uncached()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = {}
+
+                def fill():
+                    # Keep the pool busy while only holding a few rasterized pages in memory
+                    while len(pending) < 2 * workers:
+                        item = next(todo, None)
+                        if item is None:
+                            return
+                        key, cache_key, image = item
+                        pending[pool.submit(_ocr_worker, image, self.lang, self.max_side)] = (key, cache_key)
+
+                fill()
+                while pending:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key, cache_key = pending.pop(future)
+                        results[key] = future.result()
+                        self.cache.put(cache_key, results[key])
+                    fill()
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "pages": len(results),
+            "cached": cached,
+            "seconds": elapsed,
+            "pages_per_s": len(results) / elapsed if elapsed else 0.0,
+        }
+        return results
+
+    def ocr_image(self, data: bytes) -> str:
+        """OCR one image given as raw file bytes, in this process"""
+        return self._run([(0, data)], workers=1).get(0, "")
+
+    def ocr_pdf_pages(self, data: bytes, page_numbers):
+        """OCR the given (0-based) pages of a PDF with one pool for the document; returns {page_number: text}"""
+        from pdf2image import convert_from_bytes
+
+        def rasterized():
+            for page in page_numbers:
+                images = convert_from_bytes(data, dpi=self.dpi, first_page=page + 1, last_page=page + 1)
+                if images:
+                    yield page, images[0]
+        return self._run(rasterized(), workers=len(page_numbers))
+
+
+def apply_ocr_to_pdf(engine, docs, data, pages):
+    """Replace the empty text of scanned PDF page documents with OCR output (in place)"""
+    for page, text in engine.ocr_pdf_pages(data, pages).items():
+        docs[page].page_content = text
+        docs[page].metadata["type"] = "pdf_ocr"
+    return [doc for doc in docs if doc.page_content.strip()]
@@ -0,0 +1,293 @@
+import queue
+import threading
+import time
+
+from langchain_chroma import Chroma
+
+from assistant_core.bm25 import BM25Index, bm25_index_path
+from assistant_core.collection_state import DEFAULT_COLLECTION, mark_collection_changed
+from assistant_core.config import EMBEDDING_MODEL_NAME
+from assistant_core.embedding_cache import CachedEmbeddings
+from assistant_core.embeddings import ProcessPoolEmbeddings, embedding_namespace
+from assistant_core.indexing import chunk_id, embedding_cache_path, existing_ids
+from assistant_core.near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, dedup_index_path
+
+_DONE = object()
+
+
+class StageStats:
+    """Items processed and busy time for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "busy_s": self.busy_seconds,
+            "items_per_s": self.items / self.busy_seconds if self.busy_seconds else 0.0,
+        }
+
+
+class IngestionPipeline:
+    """Streaming load -> split -> embed -> upsert pipeline with bounded memory.
+
+    Each stage runs in its own thread and hands work to the next through a bounded
+    queue, so loading, splitting, embedding and writing overlap while at most
+    ``queue_size`` batches of ``batch_size`` chunks are in flight, whatever the
+    corpus size. Chunks get content-addressed IDs (see indexing.chunk_id); those
+    already in the store are skipped and the rest are embedded through the
+    persistent embedding cache. Written chunks are also added to the BM25 keyword
+    index next to the collection. With ``embed_workers`` > 0 embedding runs in that
+    many worker processes. Chunks that are near-duplicates (MinHash estimate of
+    Jaccard similarity >= ``near_duplicate_threshold``) of an indexed chunk or of
+    one earlier in the run are dropped in the split stage; None disables this.
+    With ``track_sources`` the documents are (source, document) pairs, and the
+    stats map each source to the IDs of the stored chunks holding its text.
+    """
+
+    def __init__(self, persist_directory, embedding_function=None, splitter=None,
+                 collection_name=DEFAULT_COLLECTION, batch_size=64, queue_size=4, embed_workers=0,
+                 near_duplicate_threshold=DEFAULT_THRESHOLD, track_sources=False):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.splitter = splitter
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_workers = embed_workers
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.track_sources = track_sources
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_stage(self, target, *args):
+        try:
+            target(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _load(self, documents, out_q):
+        stats = self.stages["load"]
+        iterator = iter(documents)
+        while True:
+            start = time.perf_counter()
+            doc = next(iterator, _DONE)
+            stats.busy_seconds += time.perf_counter() - start
+            if doc is _DONE or not self._put(out_q, doc):
+                break
+            stats.items += 1
+        self._put(out_q, _DONE)
+
+    def _split(self, in_q, out_q):
+        stats = self.stages["split"]
+        seen = set()
+        batch = []
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+            source, doc = item if self.track_sources else (None, item)
+            start = time.perf_counter()
+            chunks = self.splitter.split_documents([doc]) if self.splitter else [doc]
+            for chunk in chunks:
+                cid = chunk_id(chunk)
+                if cid in seen:
+                    self.counts["duplicates_in_batch"] += 1
+                    self._attribute(source, cid)
+                    continue
+                seen.add(cid)
+                duplicate = self._near_duplicates.check(cid, chunk.page_content) \
+                    if self._near_duplicates is not None else None
+                if duplicate:
+                    self.counts["near_duplicates"] += 1
+                    self.counts["near_duplicate_bytes"] += len(chunk.page_content.encode("utf-8"))
+                    # The source's text now lives in the chunk it duplicates
+                    self._attribute(source, duplicate)
+                    continue
+                self._attribute(source, cid)
+                batch.append((cid, chunk))
+            stats.items += len(chunks)
+            stats.busy_seconds += time.perf_counter() - start
+            if len(batch) >= self.batch_size:
+                if not self._put(out_q, batch):
+                    return
+                batch = []
+        if batch:
+            self._put(out_q, batch)
+        self._put(out_q, _DONE)
+
+    def _attribute(self, source, cid):
+        if self.track_sources:
+            self._source_chunks.setdefault(source, []).append(cid)
+
+    def _embed(self, in_q, out_q):
+        stats = self.stages["embed"]
+        while True:
+            batch = self._get(in_q)
+            if batch is _DONE:
+                break
+            start = time.perf_counter()
+            already_indexed = existing_ids(self._vectorstore, [cid for cid, _ in batch])
+            self.counts["already_indexed"] += len(already_indexed)
+            if already_indexed and self._near_duplicates is not None:
+                # Stored chunks checked again (e.g. after being taken out of the index) stay indexed
+                self._near_duplicates.commit(already_indexed)
+            batch = [(cid, chunk) for cid, chunk in batch if cid not in already_indexed]
+            if batch:
+                vectors = self._embeddings.embed_documents([chunk.page_content for _, chunk in batch])
+                self._dimensions = len(vectors[0])
+                stats.items += len(batch)
+                stats.busy_seconds += time.perf_counter() - start
+                if not self._put(out_q, (batch, vectors)):
+                    return
+            else:
+                stats.busy_seconds += time.perf_counter() - start
+        self._put(out_q, _DONE)
+
+    def _upsert(self, in_q):
+        stats = self.stages["upsert"]
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+            batch, vectors = item
+            start = time.perf_counter()
+            self._collection.upsert(
+                ids=[cid for cid, _ in batch],
+                embeddings=vectors,
+                # Chroma rejects empty metadata dicts, but accepts None
+                metadatas=[chunk.metadata or None for _, chunk in batch],
+                documents=[chunk.page_content for _, chunk in batch],
+            )
+            # Keep the keyword and near-duplicate indexes in step with the vector store
+            self._keyword_index.add((cid, chunk.page_content) for cid, chunk in batch)
+            if self._near_duplicates is not None:
+                self._near_duplicates.commit([cid for cid, _ in batch])
+            stats.items += len(batch)
+            stats.busy_seconds += time.perf_counter() - start
+
+    def run(self, documents):
+        """Consume an iterable of documents (or chunks, without a splitter) and return ingestion stats"""
+        self._stop = threading.Event()
+        self._errors = []
+        self.stages = {name: StageStats(name) for name in ("load", "split", "embed", "upsert")}
+        self.counts = {"already_indexed": 0, "duplicates_in_batch": 0, "near_duplicates": 0,
+                       "near_duplicate_bytes": 0}
+        self._dimensions = 0
+        self._source_chunks = {}
+
+        pool_embeddings = None
+        base_embeddings = self.embedding_function
+        if self.embed_workers:
+            pool_embeddings = ProcessPoolEmbeddings(EMBEDDING_MODEL_NAME, self.embed_workers)
+            base_embeddings = pool_embeddings
+        self._embeddings = CachedEmbeddings(base_embeddings, embedding_cache_path(self.persist_directory),
+                                            namespace=embedding_namespace())
+
+        vectorstore = Chroma(
+            collection_name=self.collection_name,
+            persist_directory=self.persist_directory,
+            embedding_function=self._embeddings
+        )
+        self._vectorstore = vectorstore
+        self._collection = vectorstore._collection
+        self._keyword_index = BM25Index(bm25_index_path(self.persist_directory, self.collection_name))
+        self._near_duplicates = None
+        if self.near_duplicate_threshold:
+            self._near_duplicates = NearDuplicateIndex(
+                dedup_index_path(self.persist_directory, self.collection_name), self.near_duplicate_threshold)
+            if self._near_duplicates.count() < self._collection.count():
+                # Chunks indexed before the near-duplicate index existed
+                self._near_duplicates.sync_from_collection(self._collection)
+
+        docs_q = queue.Queue(maxsize=self.queue_size * 4)
+        batches_q = queue.Queue(maxsize=self.queue_size)
+        vectors_q = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._load, documents, docs_q), name="ingest-load"),
+            threading.Thread(target=self._run_stage, args=(self._split, docs_q, batches_q), name="ingest-split"),
+            threading.Thread(target=self._run_stage, args=(self._embed, batches_q, vectors_q), name="ingest-embed"),
+            threading.Thread(target=self._run_stage, args=(self._upsert, vectors_q), name="ingest-upsert"),
+        ]
+
+        start = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop.set()
+            if pool_embeddings is not None:
+                pool_embeddings.close()
+        wall_seconds = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+
+        if self._keyword_index.count() < self._collection.count():
+            # Chunks indexed before the keyword index existed
+            self._keyword_index.sync_from_collection(self._collection)
+
+        added = self.stages["upsert"].items
+        if added:
+            # Invalidate answers cached against the previous collection contents
+            mark_collection_changed(self.persist_directory, self.collection_name)
+
+        stats = {
+            "documents": self.stages["load"].items,
+            "chunks": self.stages["split"].items,
+            "added": added,
+            "already_indexed": self.counts["already_indexed"],
+            "duplicates_in_batch": self.counts["duplicates_in_batch"],
+            "wall_s": wall_seconds,
+            "chunks_per_s": self.stages["split"].items / wall_seconds if wall_seconds else 0.0,
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
+        stats.update(self._embeddings.report(extra_skipped=self.counts["already_indexed"]))
+        stats.update(self._near_duplicate_savings())
+        if self.track_sources:
+            stats["source_chunks"] = self._source_chunks
+        return stats
+
+    def _near_duplicate_savings(self):
+        """Near-duplicates dropped, with the embedding time and store space they would have cost"""
+        embed = self.stages["embed"]
+        skipped = self.counts["near_duplicates"]
+        seconds_per_chunk = embed.busy_seconds / embed.items if embed.items else 0.0
+        return {
+            "near_duplicates": skipped,
+            "near_duplicate_embed_s_saved": skipped * seconds_per_chunk,
+            # Text plus a float32 vector per chunk (Chroma's HNSW links and metadata come on top)
+            "near_duplicate_bytes_saved": self.counts["near_duplicate_bytes"] + skipped * 4 * self._dimensions,
+        }
+
+
+def format_stage_report(stats):
+    """One line per stage with its throughput"""
+    units = {"load": "docs", "split": "chunks", "embed": "chunks", "upsert": "chunks"}
+    lines = []
+    for name, stage in stats["stages"].items():
+        lines.append(f"  {name:<7} {stage['items']:>7} {units[name]:<6} "
+                     f"{stage['items_per_s']:>9.1f} {units[name]}/s  (busy {stage['busy_s']:.1f}s)")
+    lines.append(f"  overall {stats['chunks']} chunks in {stats['wall_s']:.1f}s ({stats['chunks_per_s']:.1f} chunks/s)")
+    return "\n".join(lines)
@@ -0,0 +1,506 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+
+from assistant_core.answer_cache import AnswerCache, exact_key, hash_text
+from assistant_core.bm25 import BM25Index, bm25_index_path, reciprocal_rank_scores
+from assistant_core.context import (DEFAULT_TOKEN_BUDGET, DENSE_RELEVANCE_KEY, RANK_FUSED_KEY, RELEVANCE_KEY,
+                                   ContextPacker)
+from assistant_core.collection_state import DEFAULT_COLLECTION, collection_version
+from assistant_core.config import FLAT_INDEX_DTYPE, USE_RERANKER, VECTOR_BACKEND
+from assistant_core.embeddings import get_embedding_function
+from assistant_core.flat_index import export_collection, load_flat_index, open_current_flat_index
+from assistant_core.history import NO_HISTORY, get_history_manager
+from assistant_core.indexing import chunk_id
+from assistant_core.rerank import get_reranker
+from assistant_core.resilience import LLMUnavailable, extractive_answer, with_resilience
+from assistant_core.tokens import count_tokens
+from assistant_core.tracing import Trace, get_tracer
+
+NOT_INITIALIZED_MESSAGE = "System not initialized. Please ensure the vector database exists."
+
+
+def extract_text(response):
+    """Extract clean text from an LLM message or message chunk"""
+    if not hasattr(response, 'content'):
+        return str(response)
+    content = response.content
+    if isinstance(content, list):
+        # Handle list of content blocks
+        return "".join([
+            block if isinstance(block, str) else block['text']
+            for block in content
+            if isinstance(block, str) or (isinstance(block, dict) and 'text' in block)
+        ])
+    return str(content)
+
+
+def default_llm():
+    """The Gemini chat model engines use unless given another one"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model="gemini-flash-latest", temperature=0)
+
+
+def doc_id(doc):
+    """Chroma ID of a retrieved document (content hash for chunks written by our ingestion)"""
+    return getattr(doc, "id", None) or chunk_id(doc)
+
+
+class GenerationTimer:
+    """Tracks time-to-first-token and total generation time for one LLM call"""
+
+    def __init__(self, streamed, cached=False):
+        self.streamed = streamed
+        self.cached = cached
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.chunks = 0
+        self.characters = 0
+
+    def tick(self, text):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+        self.characters += len(text)
+
+    def stats(self):
+        end = time.perf_counter()
+        first = self.first_token_at or end
+        return {
+            "streamed": self.streamed,
+            "cached": self.cached,
+            "ttft_s": first - self.start,
+            "total_s": end - self.start,
+            "chunks": self.chunks,
+            "characters": self.characters,
+        }
+
+
+class BaseRAG:
+    """Retrieval and generation pipeline shared by CFDRAG and OpenFOAMRAG.
+
+    Subclasses only provide the prompt ``template``.
+    """
+
+    template = None
+
+    def __init__(self, persist_directory="./chroma_db", embedding_function=None, llm=None,
+                 use_answer_cache=True, collection_name=DEFAULT_COLLECTION, retrieval_k=4,
+                 hybrid_search=True, tracer=None, context_token_budget=DEFAULT_TOKEN_BUDGET,
+                 history_manager=None, vector_backend=VECTOR_BACKEND, flat_index_dtype=FLAT_INDEX_DTYPE,
+                 use_reranker=USE_RERANKER, reranker=None, resilient=True):
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.use_answer_cache = use_answer_cache
+        # Dense + BM25 fusion finds exact identifiers (fvSchemes, simpleFoam) that
+        # embeddings rank poorly. retrieval_k is the most chunks considered; the
+        # context packer keeps fewer when scores drop off or the token budget is hit
+        self.retrieval_k = retrieval_k
+        self.hybrid_search = hybrid_search
+        # "flat" searches a memory-mapped export instead of Chroma (no client to open, shared page cache)
+        self.vector_backend = vector_backend
+        self.flat_index_dtype = flat_index_dtype
+        self._flat_index_lock = threading.Lock()
+        self._flat_export_thread = None
+        # With a reranker, search returns its wider candidate set and only its top_n reach the packer
+        self.reranker = (reranker or get_reranker()) if use_reranker else None
+        # None disables packing and joins the raw chunks
+        self.context_packer = ContextPacker(context_token_budget) if context_token_budget else None
+        # Share one embedding model across engines and processors instead of reloading it
+        self.embedding_function = embedding_function or get_embedding_function()
+        # Deadlines, retries, hedging and a circuit breaker around every LLM call (see assistant_core.resilience);
+        # engines handed the same ResilientLLM share its breaker and latency statistics
+        self.llm = with_resilience(llm or default_llm()) if resilient else llm or default_llm()
+        self.vectorstore = None
+        self.retriever = None
+        self.chain = None
+        self.prompt_template = None
+        self.answer_cache = None
+        self.keyword_index = None
+        self.tracer = tracer or get_tracer()
+        # Rolling summary + recent turns, shared by every engine in the process; it wraps the raw model on its own
+        self.history_manager = history_manager or get_history_manager(self.llm)
+
+        self._initialize_chain()
+
+    def _initialize_chain(self):
+        if os.path.exists(self.persist_directory):
+            if self.vector_backend == "flat":
+                self.vectorstore = load_flat_index(self.persist_directory, self.collection_name,
+                                                   self.flat_index_dtype, self.embedding_function)
+            else:
+                from langchain_chroma import Chroma
+
+                self.vectorstore = Chroma(
+                    collection_name=self.collection_name,
+                    persist_directory=self.persist_directory,
+                    embedding_function=self.embedding_function
+                )
+                self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": self.retrieval_k})
+
+            # Don't use a complex chain - keep it simple
+            self.prompt_template = ChatPromptTemplate.from_template(self.template)
+
+            if self.use_answer_cache:
+                self.answer_cache = AnswerCache(
+                    os.path.join(self.persist_directory, f"answer_cache_{self.collection_name}.sqlite3"))
+
+            if self.hybrid_search:
+                self.keyword_index = BM25Index(bm25_index_path(self.persist_directory, self.collection_name))
+                with self.document_collection() as collection:
+                    if self.keyword_index.count() < collection.count():
+                        # Store built before the keyword index existed: backfill once
+                        print("Building keyword index from the vector store...")
+                        self.keyword_index.sync_from_collection(collection)
+        else:
+            print("Vector store not found. Please run ingest.py first.")
+
+    def is_ready(self):
+        return self.vectorstore is not None
+
+    def _collection_version(self):
+        return collection_version(self.persist_directory, self.collection_name)
+
+    @contextmanager
+    def document_collection(self):
+        """The engine's open collection (Chroma's, or the flat index) for count() and paged get() calls"""
+        with self._vector_store() as store:
+            yield store if self.vector_backend == "flat" else store._collection
+
+    @contextmanager
+    def _vector_store(self):
+        """The vector store, held for one search or scan so a flat index refresh can close the one it replaces"""
+        if self.vector_backend != "flat":
+            yield self.vectorstore
+            return
+        self._refresh_flat_index()
+        with self._flat_index_lock:
+            store = self.vectorstore
+            store.acquire()
+        try:
+            yield store
+        finally:
+            store.release()
+
+    def _refresh_flat_index(self):
+        """Switch to a fresh export once an ingestion or upload has changed the collection.
+
+        Ingestion and uploads write the export (see flat_index.export_for_flat_backend). If it is
+        not there yet, searches keep using the current index while it is exported in the background.
+        """
+        version = self._collection_version()
+        if self.vector_backend != "flat" or self.vectorstore.version == version:
+            return
+        fresh = open_current_flat_index(self.persist_directory, self.collection_name, self.flat_index_dtype,
+                                        self.embedding_function)
+        with self._flat_index_lock:
+            if fresh is None:
+                if self._flat_export_thread is None or not self._flat_export_thread.is_alive():
+                    self._flat_export_thread = threading.Thread(
+                        target=export_collection, args=(self.persist_directory, self.collection_name,
+                                                        self.flat_index_dtype),
+                        name=f"flat-export-{self.collection_name}", daemon=True)
+                    self._flat_export_thread.start()
+                return
+            if self.vectorstore.version == fresh.version:
+                fresh.close()
+                return
+            previous, self.vectorstore = self.vectorstore, fresh
+        # Closed now, or when the last search still holding it finishes
+        previous.retire()
+
+    def _candidate_k(self):
+        """How many chunks search returns: the reranker's candidate set, or retrieval_k"""
+        return self.reranker.candidates if self.reranker is not None else self.retrieval_k
+
+    def _search(self, question, embedding):
+        """Retrieve documents for a question; returns (docs, embedding distance of the closest dense match).
+
+        Dense search is fused with BM25 keyword search via reciprocal rank fusion when enabled.
+        Each doc's relevance score (higher is better) is stored in its metadata for the context packer.
+        """
+        with self._vector_store() as store:
+            return self._search_store(store, question, embedding)
+
+    def _search_store(self, store, question, embedding):
+        k = self._candidate_k()
+        if self.keyword_index is None:
+            scored = store.similarity_search_by_vector_with_relevance_scores(embedding, k=k)
+            for doc, distance in scored:
+                doc.metadata[RELEVANCE_KEY] = doc.metadata[DENSE_RELEVANCE_KEY] = 1.0 / (1.0 + distance)
+            return [d for d, _ in scored], min((score for _, score in scored), default=float("inf"))
+
+        depth = max(2 * k, 10)
+        scored = store.similarity_search_by_vector_with_relevance_scores(embedding, k=depth)
+        for doc, distance in scored:
+            # The fused score only orders chunks; the packer's score margin uses this one
+            doc.metadata[DENSE_RELEVANCE_KEY] = 1.0 / (1.0 + distance)
+        by_id = {doc_id(d): d for d, _ in scored}
+        sparse_ids = [cid for cid, _ in self.keyword_index.search(question, k=depth)]
+        fused = reciprocal_rank_scores([list(by_id), sparse_ids])[:k]
+
+        # Keyword-only hits still need their text and metadata from Chroma
+        missing = [cid for cid, _ in fused if cid not in by_id]
+        if missing:
+            found = store.get(ids=missing, include=["documents", "metadatas"])
+            for cid, text, metadata in zip(found["ids"], found["documents"], found["metadatas"]):
+                by_id[cid] = Document(page_content=text, metadata=metadata or {}, id=cid)
+        docs = []
+        for cid, score in fused:
+            if cid in by_id:
+                by_id[cid].metadata[RELEVANCE_KEY] = score
+                by_id[cid].metadata[RANK_FUSED_KEY] = True
+                docs.append(by_id[cid])
+        return docs, min((score for _, score in scored), default=float("inf"))
+
+    def _rerank(self, question, docs, trace=None):
+        """Keep the reranker's best candidates; without a reranker (or over its latency budget) the first retrieval_k"""
+        if self.reranker is None or len(docs) <= 1:
+            return docs[:self.retrieval_k]
+        reranked, stats = self.reranker.rerank(question, docs)
+        if trace is not None:
+            trace.count("rerank_skipped", int(stats["skipped"]))
+        return reranked[:self.retrieval_k]
+
+    def _retrieve(self, question, embedding):
+        return self._rerank(question, self._search(question, embedding)[0])
+
+    def _assemble_context(self, docs):
+        """Prompt context from retrieved docs; returns (context, packing stats)"""
+        if self.context_packer is None:
+            return "\n\n".join([d.page_content for d in docs]), {"passages": len(docs)}
+        passages, stats = self.context_packer.pack(docs)
+        return "\n\n".join([d.page_content for d in passages]), stats
+
+    def _format_docs(self, docs):
+        return self._assemble_context(docs)[0]
+
+    def _format_chat_history(self, messages):
+        """Format chat history for the prompt: summary of older turns plus recent turns, within a token budget"""
+        return self.history_manager.format(messages)
+
+    def _after_turn(self, chat_history, question, answer):
+        # Fold the turn that will scroll out of the verbatim window before the next question arrives
+        self.history_manager.prefetch(list(chat_history or []) + [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ])
+
+    def _prepare(self, question: str, chat_history: list = None, embedding=None, docs=None, trace=None):
+        """Everything before the LLM call: cache lookups, retrieval and prompt formatting.
+
+        Returns a dict with either a cached ``answer`` or the prompt ``messages``
+        plus what is needed to store the generated answer afterwards. A router that
+        has already embedded the question and retrieved ``docs`` can pass them in.
+        Stage timings and counters are recorded on ``trace``.
+        """
+        trace = trace or Trace(self.collection_name, question)
+
+        # Step 1: Format chat history
+        with trace.span("history"):
+            formatted_history = self._format_chat_history(chat_history) if chat_history else NO_HISTORY
+        trace.count("history_tokens", count_tokens(formatted_history))
+
+        # Step 2: Retrieve relevant documents, consulting the answer cache on the way
+        if embedding is None:
+            with trace.span("embed"):
+                embedding = self.embedding_function.embed_query(question)
+        cache_entry = None
+        if self.answer_cache is not None:
+            version = self._collection_version()
+            # Keyed on the raw recent turns, not the prompt text: the summary of older turns is written by the LLM
+            # and rarely comes out the same twice
+            history_hash = self.history_manager.cache_key(chat_history) if chat_history else hash_text(NO_HISTORY)
+
+            with trace.span("cache"):
+                answer = self.answer_cache.find_similar(embedding, history_hash, version)
+            if answer is not None:
+                trace.cached = True
+                return {"answer": answer}
+
+            if docs is None:
+                with trace.span("search"):
+                    docs = self._search(question, embedding)[0]
+            key = exact_key(question, [doc_id(d) for d in docs], history_hash)
+            with trace.span("cache"):
+                answer = self.answer_cache.get(key, version)
+            if answer is not None:
+                trace.cached = True
+                return {"answer": answer}
+
+            cache_entry = {"key": key, "question": question, "history_hash": history_hash,
+                           "version": version, "embedding": embedding}
+        elif docs is None:
+            with trace.span("search"):
+                docs = self._search(question, embedding)[0]
+        trace.count("retrieved_chunks", len(docs))
+
+        with trace.span("rerank"):
+            docs = self._rerank(question, docs, trace)
+        with trace.span("format_docs"):
+            context, packing = self._assemble_context(docs)
+        trace.count("context_passages", packing["passages"])
+        trace.count("context_chars", len(context))
+
+        # Step 3: Create the prompt with all variables
+        with trace.span("prompt"):
+            messages = self.prompt_template.format_messages(
+                context=context,
+                chat_history=formatted_history,
+                question=question
+            )
+        trace.count("prompt_tokens", sum(count_tokens(m.content) for m in messages))
+        return {"answer": None, "messages": messages, "cache_entry": cache_entry, "docs": docs}
+
+    def _fallback(self, prepared, trace):
+        """Extractive answer from the retrieved passages when the LLM is unavailable (never cached)"""
+        trace.count("llm_fallback", 1)
+        return extractive_answer(prepared.get("docs") or [])
+
+    def _remember(self, prepared, answer):
+        entry = prepared.get("cache_entry")
+        if entry is not None and answer:
+            self.answer_cache.put(answer=answer, **entry)
+
+    def _finish(self, trace, timer):
+        # Timings go on the caller's trace only: engines are shared by every session and request
+        self.tracer.finish(trace, timer.stats())
+
+    def query(self, question: str, chat_history: list = None, embedding=None) -> str:
+        """
+        Query the assistant and return the whole answer
+
+        Args:
+            question: The user's question
+            chat_history: List of previous messages in format [{"role": "user/assistant", "content": "..."}]
+            embedding: The question's embedding, if the caller already computed it (e.g. in a batch)
+        """
+        return self.query_with_trace(question, chat_history, embedding)[0]
+
+    def query_with_trace(self, question: str, chat_history: list = None, embedding=None):
+        """Same as query, but returns (answer, trace) with the stage timings and route of this question"""
+        if not self.is_ready():
+            return NOT_INITIALIZED_MESSAGE, None
+
+        trace = Trace(self.collection_name, question)
+        prepared = self._prepare(question, chat_history, embedding=embedding, trace=trace)
+        if prepared["answer"] is not None:
+            timer = GenerationTimer(streamed=False, cached=True)
+            timer.tick(prepared["answer"])
+            self._finish(trace, timer)
+            self._after_turn(chat_history, question, prepared["answer"])
+            return prepared["answer"], trace
+
+        # Step 4: Generate response
+        timer = GenerationTimer(streamed=False)
+        try:
+            with trace.span("llm"):
+                response = self.llm.invoke(prepared["messages"])
+            with trace.span("parse"):
+                answer = extract_text(response)
+        except LLMUnavailable as e:
+            print(f"LLM unavailable, answering with the top passages: {e}")
+            answer = self._fallback(prepared, trace)
+        timer.tick(answer)
+        self._finish(trace, timer)
+        if not trace.counters.get("llm_fallback"):
+            self._remember(prepared, answer)
+        self._after_turn(chat_history, question, answer)
+        return answer, trace
+
+    def query_stream(self, question: str, chat_history: list = None):
+        """Same as query, but yields text chunks as the LLM produces them"""
+        return self.query_stream_with_trace(question, chat_history)[0]
+
+    def query_stream_with_trace(self, question: str, chat_history: list = None):
+        """Same as query_stream, but returns (chunks, trace).
+
+        The trace (time to first token, total time, route) is complete once
+        the chunks have been consumed.
+        """
+        trace = Trace(self.collection_name, question, streamed=True)
+        return self._stream(question, chat_history, trace), trace
+
+    def _stream(self, question, chat_history, trace):
+        if not self.is_ready():
+            yield NOT_INITIALIZED_MESSAGE
+            return
+
+        prepared = self._prepare(question, chat_history, trace=trace)
+        if prepared["answer"] is not None:
+            timer = GenerationTimer(streamed=True, cached=True)
+            timer.tick(prepared["answer"])
+            self._finish(trace, timer)
+            self._after_turn(chat_history, question, prepared["answer"])
+            yield prepared["answer"]
+            return
+
+        timer = GenerationTimer(streamed=True)
+        parts = []
+        llm_start = time.perf_counter()
+        try:
+            for chunk in self.llm.stream(prepared["messages"]):
+                with trace.span("parse"):
+                    text = extract_text(chunk)
+                if text:
+                    timer.tick(text)
+                    parts.append(text)
+                    yield text
+        except LLMUnavailable as e:
+            print(f"LLM unavailable, answering with the top passages: {e}")
+            # After a partial answer the passages follow it
+            text = ("\n\n" if parts else "") + self._fallback(prepared, trace)
+            timer.tick(text)
+            parts.append(text)
+            yield text
+        trace.add_time("llm", time.perf_counter() - llm_start - trace.spans.get("parse", 0.0))
+        self._finish(trace, timer)
+        if not trace.counters.get("llm_fallback"):
+            self._remember(prepared, "".join(parts))
+        self._after_turn(chat_history, question, "".join(parts))
+
+    async def aquery_stream(self, question: str, chat_history: list = None):
+        """Async version of query_stream"""
+        if not self.is_ready():
+            yield NOT_INITIALIZED_MESSAGE
+            return
+
+        # Retrieval is blocking (embedding + Chroma), keep it off the event loop
+        trace = Trace(self.collection_name, question, streamed=True)
+        prepared = await asyncio.to_thread(self._prepare, question, chat_history, trace=trace)
+        if prepared["answer"] is not None:
+            timer = GenerationTimer(streamed=True, cached=True)
+            timer.tick(prepared["answer"])
+            self._finish(trace, timer)
+            self._after_turn(chat_history, question, prepared["answer"])
+            yield prepared["answer"]
+            return
+
+        timer = GenerationTimer(streamed=True)
+        parts = []
+        llm_start = time.perf_counter()
+        try:
+            async for chunk in self.llm.astream(prepared["messages"]):
+                with trace.span("parse"):
+                    text = extract_text(chunk)
+                if text:
+                    timer.tick(text)
+                    parts.append(text)
+                    yield text
+        except LLMUnavailable as e:
+            print(f"LLM unavailable, answering with the top passages: {e}")
+            text = ("\n\n" if parts else "") + self._fallback(prepared, trace)
+            timer.tick(text)
+            parts.append(text)
+            yield text
+        trace.add_time("llm", time.perf_counter() - llm_start - trace.spans.get("parse", 0.0))
+        await asyncio.to_thread(self._finish, trace, timer)
+        if not trace.counters.get("llm_fallback"):
+            await asyncio.to_thread(self._remember, prepared, "".join(parts))
+        self._after_turn(chat_history, question, "".join(parts))
@@ -0,0 +1,123 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from assistant_core.config import RERANKER_MODEL_NAME
+from assistant_core.context import RANK_FUSED_KEY, RELEVANCE_KEY
+
+DEFAULT_CANDIDATES = 20
+DEFAULT_TOP_N = 3
+DEFAULT_LATENCY_BUDGET_S = 0.3
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + math.exp(-max(min(x, 50.0), -50.0)))
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved candidates with a small cross-encoder and keeps the best ``top_n``.
+
+    The engine retrieves ``candidates`` chunks instead of ``retrieval_k``; pairs
+    are scored in batches of ``batch_size``. Scores are cached per
+    (question, chunk) pair. The measured time per pair keeps scoring within
+    ``latency_budget_s``: the lowest-ranked uncached candidates are dropped to
+    fit, and if not even ``top_n`` fit, reranking is skipped and the retrieval
+    order is kept.
+    The model is loaded on first use; ``model`` can be any object with a
+    CrossEncoder-style ``predict(pairs, batch_size=...)``.
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL_NAME, model=None, candidates=DEFAULT_CANDIDATES,
+                 top_n=DEFAULT_TOP_N, batch_size=16, latency_budget_s=DEFAULT_LATENCY_BUDGET_S, max_cached=10000):
+        self.model_name = model_name
+        self.model = model
+        self.candidates = candidates
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.latency_budget_s = latency_budget_s
+        self.max_cached = max_cached
+        self.seconds_per_pair = None
+        self.load_seconds = None
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _get_model(self):
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    start = time.perf_counter()
+                    self.model = CrossEncoder(self.model_name)
+                    self.load_seconds = time.perf_counter() - start
+        return self.model
+
+    def _key(self, question_hash, doc):
+        from assistant_core.rag_base import doc_id
+
+        return question_hash, doc_id(doc)
+
+    def rerank(self, question, docs):
+        """Returns (docs, stats): the ``top_n`` best docs with cross-encoder relevance, or ``docs`` unchanged if skipped"""
+        question_hash = hashlib.sha256(question.encode("utf-8")).hexdigest()
+        keys = [self._key(question_hash, doc) for doc in docs]
+        with self._lock:
+            scores = {key: self._scores[key] for key in keys if key in self._scores}
+            for key in scores:
+                self._scores.move_to_end(key)
+        missing = [(key, doc) for key, doc in zip(keys, docs) if key not in scores]
+        stats = {"candidates": len(docs), "cache_hits": len(docs) - len(missing), "scored": 0, "trimmed": 0,
+                 "skipped": False}
+
+        if missing and self.seconds_per_pair and self.seconds_per_pair * len(missing) > self.latency_budget_s:
+            affordable = int(self.latency_budget_s / self.seconds_per_pair)
+            if affordable < min(self.top_n, len(missing)):
+                stats["skipped"] = True
+                return docs, stats
+            # Drop the lowest-ranked uncached candidates instead of reranking nothing
+            dropped = {key for key, _ in missing[affordable:]}
+            missing = missing[:affordable]
+            docs = [doc for key, doc in zip(keys, docs) if key not in dropped]
+            keys = [key for key in keys if key not in dropped]
+            stats["trimmed"] = len(dropped)
+        if missing:
+            model = self._get_model()
+            start = time.perf_counter()
+            predicted = model.predict([(question, doc.page_content) for _, doc in missing],
+                                      batch_size=self.batch_size)
+            elapsed = time.perf_counter() - start
+            per_pair = elapsed / len(missing)
+            self.seconds_per_pair = per_pair if self.seconds_per_pair is None else \
+                0.7 * self.seconds_per_pair + 0.3 * per_pair
+            stats["scored"] = len(missing)
+            with self._lock:
+                for (key, _), score in zip(missing, predicted):
+                    scores[key] = float(score)
+                    self._scores[key] = float(score)
+                    self._scores.move_to_end(key)
+                while len(self._scores) > self.max_cached:
+                    self._scores.popitem(last=False)
+
+        ranked = sorted(zip(keys, docs), key=lambda item: scores[item[0]], reverse=True)[:self.top_n]
+        for key, doc in ranked:
+            # Squash logits into (0, 1) so the context packer's relative score margin applies
+            doc.metadata[RELEVANCE_KEY] = _sigmoid(scores[key])
+            doc.metadata.pop(RANK_FUSED_KEY, None)
+        return [doc for _, doc in ranked], stats
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Return the process-wide reranker shared by all engines (the model itself loads on first use)"""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
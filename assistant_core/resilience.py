@@ -0,0 +1,360 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from assistant_core.config import (LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_S, LLM_HEDGE, LLM_RETRIES, LLM_TIMEOUT_S,
+                                   LLM_TOTAL_TIMEOUT_S)
+from assistant_core.tokens import truncate_to_tokens
+
+# Hedging uses the p95 of recent latencies (but never sooner than MIN_HEDGE_DELAY_S) once this many are
+# known, and half the attempt deadline before that
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95
+MIN_HEDGE_DELAY_S = 0.05
+LATENCY_WINDOW = 200
+# Full-jitter exponential backoff between attempts
+BACKOFF_BASE_S = 0.2
+BACKOFF_MAX_S = 5.0
+
+FALLBACK_PASSAGES = 3
+FALLBACK_PASSAGE_TOKENS = 150
+FALLBACK_NOTICE = ("⚠️ The language model is not answering right now, so here are the most relevant "
+                   "passages from the knowledge base instead of a written answer.")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Latency windows: whole blocking calls, and time to the first token of streams
+INVOKE = "invoke"
+STREAM = "stream"
+
+_CHUNK, _END, _ERROR = range(3)
+
+
+class LLMUnavailable(RuntimeError):
+    """Every attempt failed or timed out, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failed calls and then rejects calls for ``reset_s``.
+
+    After that it is half-open: a single probe call goes through (the others
+    are still rejected), its success closes the breaker and its failure opens
+    it for another ``reset_s``. A probe that never reports back is replaced
+    after ``reset_s``.
+    """
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, reset_s=LLM_BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_s:
+                    return False
+                self.state = HALF_OPEN
+            elif self.state == HALF_OPEN:
+                if self.probe_started is not None and now - self.probe_started < self.reset_s:
+                    return False
+            else:
+                return True
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.probe_started = None
+            if self.state != OPEN and (self.state == HALF_OPEN or self.consecutive_failures >= self.failures):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+
+
+class ResilientLLM:
+    """Wraps a chat model with per-attempt deadlines, jittered retries, hedging and a circuit breaker.
+
+    Each attempt gets ``timeout_s`` (for a stream: to its first token, and then
+    between tokens). A failed or timed-out attempt is retried up to ``retries``
+    times after a full-jitter backoff, as long as the call is within
+    ``total_timeout_s``; the last attempt only gets what is left of it. With
+    ``hedge``, an attempt still waiting
+    after the p95 of recent latencies (or ``hedge_after_s``) gets a duplicate
+    request, and whichever answers first wins. A call whose attempts all fail
+    counts against the breaker. Every failure surfaces as LLMUnavailable, which
+    the engines answer with the top retrieved passages.
+
+    A blocking client call cannot be interrupted: timed-out and losing requests
+    are abandoned and finish on a worker thread in the background.
+    """
+
+    def __init__(self, llm, timeout_s=LLM_TIMEOUT_S, retries=LLM_RETRIES, hedge=LLM_HEDGE, hedge_after_s=None,
+                 breaker=None, workers=32, total_timeout_s=LLM_TOTAL_TIMEOUT_S):
+        self.llm = llm
+        self.timeout_s = timeout_s
+        self.total_timeout_s = max(timeout_s, total_timeout_s)
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_after_s = hedge_after_s
+        self.breaker = breaker or CircuitBreaker()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._latencies = {INVOKE: deque(maxlen=LATENCY_WINDOW), STREAM: deque(maxlen=LATENCY_WINDOW)}
+        self.counts = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "errors": 0, "hedges": 0,
+                       "hedge_wins": 0, "rejected": 0, "failed": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _record_latency(self, kind, seconds):
+        with self._lock:
+            self._latencies[kind].append(seconds)
+
+    def _percentile(self, kind, percentile):
+        with self._lock:
+            samples = sorted(self._latencies[kind])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def hedge_delay(self, kind=INVOKE):
+        """Seconds an attempt waits before a duplicate request is sent, or None for no hedging"""
+        if not self.hedge:
+            return None
+        if self.hedge_after_s is not None:
+            return self.hedge_after_s
+        with self._lock:
+            if len(self._latencies[kind]) < HEDGE_MIN_SAMPLES:
+                return self.timeout_s / 2
+        return max(MIN_HEDGE_DELAY_S, self._percentile(kind, HEDGE_PERCENTILE))
+
+    def _call(self, attempt):
+        """Run ``attempt(timeout)`` under the breaker, retrying failures and timeouts until the call's deadline"""
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise LLMUnavailable("LLM circuit breaker is open")
+        deadline = time.monotonic() + self.total_timeout_s
+        error = None
+        for number in range(self.retries + 1):
+            if number:
+                # Another call may have opened the breaker in the meantime (and a half-open probe gets one attempt)
+                if not self.breaker.allow():
+                    break
+                backoff = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (number - 1)))
+                if time.monotonic() + backoff >= deadline:
+                    break
+                self._count("retries")
+                time.sleep(backoff)
+            self._count("attempts")
+            try:
+                result = attempt(min(self.timeout_s, deadline - time.monotonic()))
+            except Exception as e:
+                error = e
+                self._count("timeouts" if isinstance(e, TimeoutError) else "errors")
+                continue
+            self.breaker.record_success()
+            return result
+        self.breaker.record_failure()
+        self._count("failed")
+        raise LLMUnavailable(f"LLM call failed: {type(error).__name__}: {error}") from error
+
+    def _invoke_attempt(self, messages, kwargs, timeout):
+        start = time.monotonic()
+        deadline = start + timeout
+        hedge_delay = self.hedge_delay(INVOKE)
+        pending = {self._pool.submit(self.llm.invoke, messages, **kwargs)}
+        hedged = None
+        error = None
+        while pending:
+            wake = deadline if hedged is not None or hedge_delay is None else min(deadline, start + hedge_delay)
+            done, pending = wait(pending, timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._record_latency(INVOKE, time.monotonic() - start)
+                    if future is hedged:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                break
+            now = time.monotonic()
+            if now >= deadline:
+                raise TimeoutError(f"no answer within {timeout:.1f}s")
+            if hedged is None and hedge_delay is not None and now >= start + hedge_delay:
+                self._count("hedges")
+                hedged = self._pool.submit(self.llm.invoke, messages, **kwargs)
+                pending.add(hedged)
+        raise error
+
+    def invoke(self, messages, **kwargs):
+        return self._call(lambda timeout: self._invoke_attempt(messages, kwargs, timeout))
+
+    def _pump(self, messages, kwargs, events, index, stop):
+        """Run one streamed request on a worker thread, tagging its events with ``index``"""
+        chunks = None
+        try:
+            chunks = self.llm.stream(messages, **kwargs)
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                events.put((index, _CHUNK, chunk))
+            events.put((index, _END, None))
+        except Exception as e:
+            events.put((index, _ERROR, e))
+        finally:
+            # Releases whatever the stream holds (e.g. its HTTP connection) as soon as it is abandoned
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _stream_attempt(self, messages, kwargs, timeout):
+        """Start a stream (hedged while its first token is late); (events, index, stop, first event) of the winner"""
+        start = time.monotonic()
+        deadline = start + timeout
+        hedge_delay = self.hedge_delay(STREAM)
+        events = queue.Queue()
+        stops = []
+
+        def launch():
+            stops.append(threading.Event())
+            self._pool.submit(self._pump, messages, kwargs, events, len(stops) - 1, stops[-1])
+
+        launch()
+        failed = 0
+        try:
+            while True:
+                hedging = len(stops) == 1 and hedge_delay is not None
+                wake = min(deadline, start + hedge_delay) if hedging else deadline
+                try:
+                    index, kind, value = events.get(timeout=max(0.0, wake - time.monotonic()))
+                except queue.Empty:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"no first token within {timeout:.1f}s")
+                    if hedging:
+                        self._count("hedges")
+                        launch()
+                    continue
+                if kind == _ERROR:
+                    failed += 1
+                    if failed == len(stops):
+                        raise value
+                    continue
+                self._record_latency(STREAM, time.monotonic() - start)
+                if index:
+                    self._count("hedge_wins")
+                for i, stop in enumerate(stops):
+                    if i != index:
+                        stop.set()
+                return events, index, stops[index], (kind, value)
+        except BaseException:
+            for stop in stops:
+                stop.set()
+            raise
+
+    def stream(self, messages, **kwargs):
+        events, index, stop, (kind, value) = self._call(lambda timeout: self._stream_attempt(messages, kwargs, timeout))
+        try:
+            while kind != _END:
+                if kind == _ERROR:
+                    raise value
+                yield value
+                while True:
+                    try:
+                        source, kind, value = events.get(timeout=self.timeout_s)
+                    except queue.Empty:
+                        raise TimeoutError(f"stream stalled for {self.timeout_s:.1f}s")
+                    if source == index:
+                        break
+        except Exception as e:
+            # Tokens are already out, so no retry; it still counts against the breaker
+            self.breaker.record_failure()
+            self._count("failed")
+            raise LLMUnavailable(f"LLM stream failed: {type(e).__name__}: {e}") from e
+        finally:
+            stop.set()
+
+    async def ainvoke(self, messages, **kwargs):
+        return await asyncio.to_thread(self.invoke, messages, **kwargs)
+
+    async def astream(self, messages, **kwargs):
+        # One implementation of the policies: the blocking stream runs on a thread and feeds the event loop
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def pump():
+            generator = self.stream(messages, **kwargs)
+            try:
+                for chunk in generator:
+                    if stop.is_set():
+                        return
+                    loop.call_soon_threadsafe(chunks.put_nowait, (_CHUNK, chunk))
+                loop.call_soon_threadsafe(chunks.put_nowait, (_END, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, (_ERROR, e))
+            finally:
+                generator.close()
+
+        loop.run_in_executor(None, pump)
+        try:
+            while True:
+                kind, value = await chunks.get()
+                if kind == _END:
+                    return
+                if kind == _ERROR:
+                    raise value
+                yield value
+        finally:
+            stop.set()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        p95 = {kind: self._percentile(kind, 95) for kind in self._latencies}
+        p99 = {kind: self._percentile(kind, 99) for kind in self._latencies}
+        return dict(counts, breaker=self.breaker.state, breaker_opened=self.breaker.times_opened,
+                    hedge_delay_s=self.hedge_delay(INVOKE), p95_s=p95, p99_s=p99)
+
+
+def resilient_llm(llm):
+    """The ResilientLLM that ``llm`` is or wraps (through ``.llm``, like the service's LLMSlots), or None"""
+    while llm is not None and not isinstance(llm, ResilientLLM):
+        llm = getattr(llm, "llm", None)
+    return llm
+
+
+def with_resilience(llm, **kwargs):
+    """``llm`` wrapped in a ResilientLLM, unless it already is or wraps one"""
+    return llm if resilient_llm(llm) is not None else ResilientLLM(llm, **kwargs)
+
+
+def extractive_answer(docs, passages=FALLBACK_PASSAGES, passage_tokens=FALLBACK_PASSAGE_TOKENS):
+    """A "top passages" answer from the retrieved chunks, for when the LLM is unavailable"""
+    if not docs:
+        return f"{FALLBACK_NOTICE}\n\nNo relevant passages were found either; please try again in a moment."
+    parts = [FALLBACK_NOTICE]
+    for number, doc in enumerate(docs[:passages], 1):
+        text = truncate_to_tokens(" ".join(doc.page_content.split()), passage_tokens)
+        parts.append(f"**{number}.** {text}\n\n*Source: {doc.metadata.get('source', 'unknown')}*")
+    return "\n\n".join(parts)
@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from assistant_core.answer_cache import AnswerCache
+from assistant_core.bm25 import reciprocal_rank_scores
+from assistant_core.context import RANK_FUSED_KEY, RELEVANCE_KEY
+from assistant_core.rag_base import BaseRAG, doc_id
+from assistant_core.tracing import Trace
+
+# Answer cache of merged (multi-domain) answers, next to the domain collections
+AUTO_COLLECTION = "auto"
+
+
+class AutoRAG(BaseRAG):
+    """Answers from whichever domain collections match the question best.
+
+    The question is embedded once and every domain engine searches its own
+    collection with that embedding, in parallel. If one domain's closest match
+    beats all others by ``route_margin`` (embedding distance), the question is
+    handed to that engine with its own prompt and answer cache. Otherwise the
+    results are merged with reciprocal rank fusion and answered with a combined
+    prompt. The domains used for a question are recorded as its trace's ``route``.
+    """
+
+    template = """You are the CFD Assistant Suite, a senior computational fluid dynamics researcher and OpenFOAM expert consultant.
+
+The question touches both CFD theory and practical OpenFOAM setup. Use the context below, which comes from both knowledge bases:
+- Explain the underlying theory (equations, models, numerical methods) with scientific rigor
+- Connect it to the concrete OpenFOAM setup: solvers, dictionary files (controlDict, fvSchemes, fvSolution) and boundary conditions
+- Give complete dictionary examples and commands where relevant
+- Discuss trade-offs, limitations and best practices
+
+Use LaTeX for equations ($...$ inline, $$...$$ display) and code blocks for OpenFOAM dictionaries.
+
+Chat History:
+{chat_history}
+
+Retrieved Context:
+{context}
+
+Question: {question}
+
+Answer:"""
+
+    def __init__(self, engines, route_margin=0.1, llm=None, use_answer_cache=True, retrieval_k=4, tracer=None,
+                 resilient=True):
+        # Mode name -> domain engine; they share the embedding model and the store directory
+        self.engines = engines
+        self.route_margin = route_margin
+        first = next(iter(engines.values()))
+        self._pool = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="auto-search")
+        super().__init__(
+            persist_directory=first.persist_directory,
+            embedding_function=first.embedding_function,
+            llm=llm or first.llm,
+            use_answer_cache=use_answer_cache,
+            collection_name=AUTO_COLLECTION,
+            retrieval_k=retrieval_k,
+            hybrid_search=False,
+            tracer=tracer or first.tracer,
+            use_reranker=first.reranker is not None,
+            reranker=first.reranker,
+            resilient=resilient,
+        )
+
+    def _initialize_chain(self):
+        # No collection of its own: retrieval is delegated to the domain engines
+        self.prompt_template = ChatPromptTemplate.from_template(self.template)
+        if self.use_answer_cache:
+            self.answer_cache = AnswerCache(
+                os.path.join(self.persist_directory, f"answer_cache_{self.collection_name}.sqlite3"))
+
+    def is_ready(self):
+        return any(engine.is_ready() for engine in self.engines.values())
+
+    def _collection_version(self):
+        # Merged answers go stale when any domain collection changes
+        return "+".join(engine._collection_version() for engine in self.engines.values())
+
+    def route(self, question, embedding):
+        """Search every ready domain with one embedding; returns [(mode, docs, distance)], closest first"""
+        ready = [(mode, engine) for mode, engine in self.engines.items() if engine.is_ready()]
+        results = self._pool.map(lambda item: item[1]._search(question, embedding), ready)
+        ranked = [(mode, docs, distance) for (mode, _), (docs, distance) in zip(ready, results)]
+        return sorted(ranked, key=lambda r: r[2])
+
+    def select(self, question, embedding):
+        """Route or merge: returns (modes used, docs, engine to answer with or None for the combined prompt)"""
+        ranked = self.route(question, embedding)
+        best_mode, best_docs, best_distance = ranked[0]
+        if len(ranked) == 1 or ranked[1][2] - best_distance >= self.route_margin:
+            return [best_mode], best_docs, self.engines[best_mode]
+
+        # Close call: answer from both domains
+        by_id = {}
+        for _, mode_docs, _ in ranked:
+            for doc in mode_docs:
+                by_id.setdefault(doc_id(doc), doc)
+        fused = reciprocal_rank_scores([[doc_id(d) for d in mode_docs] for _, mode_docs, _ in ranked])
+        merged = []
+        for cid, score in fused[:self._candidate_k()]:
+            by_id[cid].metadata[RELEVANCE_KEY] = score
+            by_id[cid].metadata[RANK_FUSED_KEY] = True
+            merged.append(by_id[cid])
+        return [mode for mode, _, _ in ranked], merged, None
+
+    def _prepare(self, question, chat_history=None, embedding=None, docs=None, trace=None):
+        trace = trace or Trace(self.collection_name, question)
+        if embedding is None:
+            with trace.span("embed"):
+                embedding = self.embedding_function.embed_query(question)
+        with trace.span("search"):
+            route, docs, engine = self.select(question, embedding)
+        # On the trace, not the engine: concurrent sessions and batch queries share this engine
+        trace.route = route
+        if engine is None:
+            return super()._prepare(question, chat_history, embedding=embedding, docs=docs, trace=trace)
+        prepared = engine._prepare(question, chat_history, embedding=embedding, docs=docs, trace=trace)
+        prepared["engine"] = engine
+        return prepared
+
+    def _remember(self, prepared, answer):
+        engine = prepared.get("engine")
+        if engine is not None:
+            engine._remember(prepared, answer)
+        else:
+            super()._remember(prepared, answer)
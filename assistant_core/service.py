@@ -0,0 +1,424 @@
+"""HTTP query service over the shared engines.
+
+    python -m assistant_core.service --port 8080 --max-llm-calls 4
+    python -m assistant_core.service --fake-llm --fake-first-token-delay 0.5   # local stub LLM
+
+Endpoints:
+    POST /query         {"question", "mode"?, "chat_history"?} -> {"answer", "mode", "route", "cached", "coalesced", ...}
+    POST /query/stream  same body; the answer as a chunked text/plain stream
+    POST /ingest        {"domain", "offline"?, "full"?} -> ingestion summary (one ingestion at a time)
+    GET  /stats         knowledge base stats per domain, engine timings, request and LLM slot counters
+    GET  /metrics       Prometheus text of the query traces
+
+Every frontend or script talking to one service shares its engines, embedding
+model and caches. At most ``--max-llm-calls`` LLM calls run at once, and a
+question asked again (same mode and chat history) while it is still being
+answered waits for that answer instead of starting another one.
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+
+from aiohttp import web
+
+from assistant_core.config import AUTO_MODE, DOMAINS
+from assistant_core.engines import EngineRegistry
+from assistant_core.kb_stats import KnowledgeBaseStats
+from assistant_core.resilience import with_resilience
+
+MODES = [AUTO_MODE, *DOMAINS]
+DEFAULT_MAX_LLM_CALLS = 4
+
+
+class LLMSlots:
+    """Wraps the (resilient) chat model so that at most ``limit`` calls (blocking, streamed or async) run at once.
+
+    Calls over the limit wait for a slot. The slots sit outside the ResilientLLM,
+    so time spent waiting for one does not count toward its deadlines, retries
+    or hedging; a call keeps its slot through its retries and hedged requests.
+    Shared by every engine and the history summarizer, since they all hit the
+    same LLM quota.
+    """
+
+    def __init__(self, llm, limit=DEFAULT_MAX_LLM_CALLS):
+        self.llm = llm
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._counts = {"active": 0, "waiting": 0, "calls": 0, "wait_s": 0.0}
+
+    def around(self, llm):
+        """The same slots and counters in front of another model (the summarizer's own resilient wrapper)"""
+        view = copy.copy(self)
+        view.llm = llm
+        return view
+
+    def _acquire(self):
+        start = time.perf_counter()
+        with self._lock:
+            self._counts["waiting"] += 1
+        self._slots.acquire()
+        with self._lock:
+            self._counts["waiting"] -= 1
+            self._counts["active"] += 1
+            self._counts["calls"] += 1
+            self._counts["wait_s"] += time.perf_counter() - start
+
+    def _release(self):
+        with self._lock:
+            self._counts["active"] -= 1
+        self._slots.release()
+
+    async def _aacquire(self):
+        # Waiting for a slot blocks, so do it off the event loop
+        waiting = asyncio.ensure_future(asyncio.to_thread(self._acquire))
+        try:
+            await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # The thread still gets the slot eventually: hand it back then
+            waiting.add_done_callback(lambda f: f.cancelled() or f.exception() or self._release())
+            raise
+
+    def invoke(self, messages, **kwargs):
+        self._acquire()
+        try:
+            return self.llm.invoke(messages, **kwargs)
+        finally:
+            self._release()
+
+    def stream(self, messages, **kwargs):
+        self._acquire()
+        try:
+            yield from self.llm.stream(messages, **kwargs)
+        finally:
+            self._release()
+
+    async def ainvoke(self, messages, **kwargs):
+        await self._aacquire()
+        try:
+            return await self.llm.ainvoke(messages, **kwargs)
+        finally:
+            self._release()
+
+    async def astream(self, messages, **kwargs):
+        await self._aacquire()
+        try:
+            async for chunk in self.llm.astream(messages, **kwargs):
+                yield chunk
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        calls = counts["calls"]
+        return {"limit": self.limit, "active": counts["active"], "waiting": counts["waiting"], "calls": calls,
+                "mean_wait_ms": counts["wait_s"] / calls * 1000 if calls else 0.0}
+
+
+class _Broadcast:
+    """Chunks of one streamed answer, replayed from the start to every request that asked for it"""
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, part):
+        async with self._changed:
+            self.parts.append(part)
+            self._changed.notify_all()
+
+    async def close(self, error=None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def subscribe(self):
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.parts) > sent or self.done)
+                new = self.parts[sent:]
+                finished = self.done and sent + len(new) == len(self.parts)
+            for part in new:
+                yield part
+            sent += len(new)
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class Coalescer:
+    """Runs one computation per key at a time; identical requests arriving meanwhile share its result.
+
+    The computation runs as its own task, so a client that disconnects does not
+    cancel it for the others waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        # The event loop only keeps weak references to tasks
+        self._producers = set()
+        self.coalesced = 0
+
+    def _forget(self, key, value):
+        if self._inflight.get(key) is value:
+            del self._inflight[key]
+
+    async def run(self, key, factory):
+        """(result of ``await factory()``, whether it was shared with an earlier request)"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task), False
+
+    def stream(self, key, factory):
+        """(a _Broadcast of the async generator ``factory()``, whether it was shared with an earlier request)"""
+        broadcast = self._inflight.get(key)
+        if broadcast is not None:
+            self.coalesced += 1
+            return broadcast, True
+        broadcast = _Broadcast()
+        self._inflight[key] = broadcast
+
+        async def produce():
+            error = None
+            try:
+                async for part in factory():
+                    await broadcast.publish(part)
+            except Exception as e:
+                error = e
+            finally:
+                self._forget(key, broadcast)
+                await broadcast.close(error)
+
+        task = asyncio.ensure_future(produce())
+        self._producers.add(task)
+        task.add_done_callback(self._producers.discard)
+        return broadcast, False
+
+    def in_flight(self):
+        return len(self._inflight)
+
+
+def coalescing_key(mode, question, chat_history):
+    history = json.dumps(chat_history or [], sort_keys=True, ensure_ascii=False)
+    return (mode, question, hashlib.sha256(history.encode("utf-8")).hexdigest())
+
+
+class QueryService:
+    """Request handlers over one engine registry"""
+
+    def __init__(self, registry, llm_slots=None):
+        self.registry = registry
+        self.llm_slots = llm_slots
+        self.kb_stats = KnowledgeBaseStats(registry)
+        self.queries = Coalescer()
+        self.streams = Coalescer()
+        self._ingest_lock = asyncio.Lock()
+        self.last_ingest = None
+        self.counts = {"query": 0, "stream": 0, "ingest": 0, "errors": 0}
+
+    async def _request(self, request):
+        """(mode, question, chat_history) from a query body, or raise 400"""
+        body = await _json_body(request)
+        question = str(body.get("question") or "").strip()
+        mode = body.get("mode") or AUTO_MODE
+        chat_history = body.get("chat_history") or []
+        if not question:
+            raise _bad_request("No question")
+        if mode not in MODES:
+            raise _bad_request(f"Unknown mode {mode!r} (expected one of {MODES})")
+        if not isinstance(chat_history, list):
+            raise _bad_request('chat_history must be a list of {"role", "content"} messages')
+        return mode, question, chat_history
+
+    async def _engine(self, mode):
+        # Building an engine loads models and opens the store: keep it off the event loop
+        engine = await asyncio.to_thread(self.registry.get_engine, mode)
+        if not engine.is_ready():
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": f"No knowledge base for {mode}. Run the ingest scripts first."}),
+                content_type="application/json")
+        return engine
+
+    async def query(self, request):
+        mode, question, chat_history = await self._request(request)
+        self.counts["query"] += 1
+        engine = await self._engine(mode)
+        start = time.perf_counter()
+
+        async def answer():
+            return await asyncio.to_thread(engine.query_with_trace, question, chat_history)
+
+        try:
+            (text, trace), coalesced = await self.queries.run(coalescing_key(mode, question, chat_history), answer)
+        except Exception as e:
+            self.counts["errors"] += 1
+            return web.json_response({"error": f"{type(e).__name__}: {e}"}, status=500)
+        response = {"answer": text, "mode": mode, "coalesced": coalesced, "seconds": time.perf_counter() - start}
+        if trace is not None:
+            response.update(route=trace.route, cached=trace.cached, spans=trace.spans, counters=trace.counters)
+        return web.json_response(response)
+
+    async def query_stream(self, request):
+        mode, question, chat_history = await self._request(request)
+        self.counts["stream"] += 1
+        engine = await self._engine(mode)
+        broadcast, coalesced = self.streams.stream(coalescing_key(mode, question, chat_history),
+                                                   lambda: engine.aquery_stream(question, chat_history))
+        response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8",
+                                               "X-Coalesced": "true" if coalesced else "false"})
+        await response.prepare(request)
+        error = None
+        try:
+            async for part in broadcast.subscribe():
+                await response.write(part.encode("utf-8"))
+        except ConnectionResetError:
+            # The client went away (aiohttp's ClientConnectionResetError is one too): not an engine error,
+            # and the answer keeps streaming to the other requests sharing it
+            return response
+        except Exception as e:
+            self.counts["errors"] += 1
+            error = e
+        try:
+            if error is not None:
+                # Headers are already sent: report the failure at the end of the text
+                await response.write(f"\n\n[error: {type(error).__name__}: {error}]".encode("utf-8"))
+            await response.write_eof()
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def ingest(self, request):
+        from assistant_core.ingestion import format_source_report, ingest_domain
+
+        body = await _json_body(request)
+        domain = body.get("domain")
+        if domain not in DOMAINS:
+            raise _bad_request(f"Unknown domain {domain!r} (expected one of {list(DOMAINS)})")
+        if self._ingest_lock.locked():
+            return web.json_response({"error": "An ingestion is already running"}, status=409)
+
+        async with self._ingest_lock:
+            self.counts["ingest"] += 1
+            start = time.perf_counter()
+            try:
+                stats = await asyncio.to_thread(ingest_domain, domain, offline=bool(body.get("offline")),
+                                                full=bool(body.get("full")))
+            except Exception as e:
+                self.counts["errors"] += 1
+                return web.json_response({"error": f"{type(e).__name__}: {e}"}, status=500)
+            # Answer caches and stats follow the collection version; only a store created just now needs attaching
+            self.registry.refresh_engine(domain)
+            self.last_ingest = {key: value for key, value in stats.items()
+                                if isinstance(value, (str, int, float, bool)) or value is None}
+            if "sources" in stats:
+                self.last_ingest["sources"] = format_source_report(stats)
+            self.last_ingest.update(domain=domain, seconds=time.perf_counter() - start)
+        return web.json_response(self.last_ingest)
+
+    async def stats(self, request):
+        knowledge_base = {}
+        for domain in DOMAINS:
+            knowledge_base[domain] = await asyncio.to_thread(self.kb_stats.get, domain)
+        return web.json_response({
+            "knowledge_base": knowledge_base,
+            "engines": self.registry.timings(),
+            "requests": dict(self.counts, coalesced=self.queries.coalesced + self.streams.coalesced,
+                             in_flight=self.queries.in_flight() + self.streams.in_flight()),
+            "llm": self.llm_slots.stats() if self.llm_slots is not None else None,
+            "llm_resilience": self.registry.llm_stats(),
+            "last_ingest": self.last_ingest,
+            "ingesting": self._ingest_lock.locked(),
+        })
+
+    async def metrics(self, request):
+        from assistant_core.tracing import get_tracer
+
+        return web.Response(text=get_tracer().prometheus_text(), content_type="text/plain")
+
+
+SERVICE_KEY = web.AppKey("service", QueryService)
+
+
+def _bad_request(message):
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise _bad_request("Body must be JSON")
+    if not isinstance(body, dict):
+        raise _bad_request("Body must be a JSON object")
+    return body
+
+
+def create_app(llm=None, max_llm_calls=DEFAULT_MAX_LLM_CALLS, use_answer_cache=True, registry=None):
+    """The aiohttp application; ``llm`` defaults to the Gemini model, shared by all engines behind one slot limit"""
+    if registry is None:
+        if llm is None:
+            from assistant_core.rag_base import default_llm
+            llm = default_llm()
+        # Slots outside the resilience layer: queueing for one is not an LLM timeout
+        llm_slots = LLMSlots(with_resilience(llm), max_llm_calls)
+        registry = EngineRegistry(llm=llm_slots, use_answer_cache=use_answer_cache)
+    else:
+        llm_slots = registry.llm if isinstance(registry.llm, LLMSlots) else None
+    service = QueryService(registry, llm_slots)
+
+    async def warm_up(app):
+        # Auto builds both domain engines; requests arriving meanwhile wait for it in get_engine
+        registry.warm_up(AUTO_MODE)
+
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.on_startup.append(warm_up)
+    app.add_routes([
+        web.post("/query", service.query),
+        web.post("/query/stream", service.query_stream),
+        web.post("/ingest", service.ingest),
+        web.get("/stats", service.stats),
+        web.get("/metrics", service.metrics),
+    ])
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the assistant over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-llm-calls", type=int, default=DEFAULT_MAX_LLM_CALLS, help="LLM calls running at once")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always call the LLM instead of reusing cached answers")
+    parser.add_argument("--fake-llm", action="store_true", help="use the local stub LLM instead of Gemini")
+    parser.add_argument("--fake-first-token-delay", type=float, default=0.0, help="stub LLM latency before the first token (s)")
+    parser.add_argument("--fake-token-delay", type=float, default=0.0, help="stub LLM latency per token (s)")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    llm = None
+    if args.fake_llm:
+        from assistant_core.fakes import FakeChatModel
+        llm = FakeChatModel(first_token_delay=args.fake_first_token_delay, token_delay=args.fake_token_delay)
+    app = create_app(llm, max(1, args.max_llm_calls), use_answer_cache=not args.no_answer_cache)
+    print(f"🚀 Serving on http://{args.host}:{args.port} (at most {args.max_llm_calls} LLM calls at once)")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import re
+
+from langchain_core.documents import Document
+
+from assistant_core.tokens import count_tokens
+
+# ~1000 characters of prose, the size chunks had with the character splitter
+DEFAULT_CHUNK_TOKENS = 256
+DEFAULT_OVERLAP_TOKENS = 0
+# A block larger than this many chunks is not worth keeping whole
+MAX_BLOCK_CHUNKS = 2
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_BEGIN_RE = re.compile(r"\\begin\{([A-Za-z]+\*?)\}")
+_DISPLAY_MATH_RE = re.compile(r"^\s*(\$\$|\\\[)")
+_HEADING_RE = re.compile(r"^\s*(#{1,6}\s|\d+(\.\d+)*\.?\s+[A-Z])")
+_SENTENCE_END_RE = re.compile(r"[.!?]+[\"')\]]*\s+")
+_OPEN_LIST = {"(", "["}
+_CLOSE_LIST = {")", ");", "]", "];"}
+
+
+class _Unit:
+    """A span of the text that is never split (a block, a paragraph or a sentence)"""
+
+    __slots__ = ("start", "end", "tokens", "heading")
+
+    def __init__(self, start, end, tokens, heading=False):
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.heading = heading
+
+
+def _blocks(text):
+    """(start, end, structured) spans of paragraphs and structural blocks, in one pass over the lines.
+
+    Blank lines end a paragraph, except inside a code fence, a LaTeX
+    environment or display math, or while OpenFOAM dictionary braces / list
+    parentheses are open, so those blocks stay in one span together with the
+    line naming them (``solvers`` above its ``{``).
+    """
+    blocks = []
+    start = None
+    structured = False
+    depth = 0
+    fence = None
+    environment = None
+    display = None
+    position = 0
+    for line in text.splitlines(keepends=True):
+        line_start, position = position, position + len(line)
+        stripped = line.strip()
+        inside = depth > 0 or fence or environment or display
+        if not stripped and not inside:
+            if start is not None:
+                blocks.append((start, line_start, structured))
+                start, structured = None, False
+            continue
+        if start is None:
+            start = line_start
+
+        if fence:
+            if stripped.startswith(fence):
+                fence = None
+            continue
+        if environment:
+            if f"\\end{{{environment}}}" in line:
+                environment = None
+            continue
+        if display:
+            if stripped.endswith(display):
+                display = None
+            continue
+        match = _FENCE_RE.match(line)
+        if match:
+            fence, structured = match.group(1), True
+            continue
+        match = _BEGIN_RE.search(line)
+        if match and f"\\end{{{match.group(1)}}}" not in line:
+            environment, structured = match.group(1), True
+            continue
+        match = _DISPLAY_MATH_RE.match(line)
+        if match:
+            closing = "$$" if match.group(1) == "$$" else "\\]"
+            structured = True
+            if not stripped[2:].endswith(closing):
+                display = closing
+            continue
+
+        # Braces of OpenFOAM dictionaries and C++; a lone "(" or ")" line opens or closes a dictionary list
+        opened = line.count("{") + (stripped in _OPEN_LIST)
+        closed = line.count("}") + (stripped in _CLOSE_LIST)
+        if opened or closed:
+            depth = max(0, depth + opened - closed)
+            # Balanced braces on one line (inline LaTeX, "{}") don't make a block
+            structured = structured or depth > 0
+    if start is not None:
+        blocks.append((start, len(text), structured))
+    return blocks
+
+
+class StructureAwareSplitter:
+    """Token-sized splitter that keeps OpenFOAM dictionaries, code and equations whole.
+
+    The text is cut into paragraphs and structural blocks (brace blocks, code
+    fences, LaTeX environments, display math) in a single pass over its lines,
+    and these are packed greedily into chunks of at most ``chunk_tokens``
+    tokens. Only a unit larger than a chunk is split further: prose at sentence
+    boundaries, blocks at line boundaries (and only once they exceed
+    ``MAX_BLOCK_CHUNKS`` chunks; smaller ones get a chunk of their own). A
+    heading is moved to the chunk that holds its section. ``overlap_tokens``
+    repeats whole trailing units of a chunk at the start of the next one.
+    Chunks are verbatim slices of the text with their ``start_index``, like
+    ``RecursiveCharacterTextSplitter(add_start_index=True)``, whose
+    ``split_documents`` interface it offers.
+    """
+
+    def __init__(self, chunk_tokens=DEFAULT_CHUNK_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+                 length_function=count_tokens):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.length_function = length_function
+
+    def _line_units(self, text, start, end):
+        units = []
+        position = start
+        for line in text[start:end].splitlines(keepends=True):
+            if line.strip():
+                units.append(_Unit(position, position + len(line.rstrip()), self.length_function(line)))
+            position += len(line)
+        return units
+
+    def _sentences(self, text, start, end):
+        position = start
+        for match in _SENTENCE_END_RE.finditer(text, start, end):
+            yield position, match.start() + len(match.group().rstrip())
+            position = match.end()
+        if position < end:
+            yield position, end
+
+    def _sentence_units(self, text, start, end):
+        units = []
+        for sentence_start, sentence_end in self._sentences(text, start, end):
+            sentence = text[sentence_start:sentence_end]
+            tokens = self.length_function(sentence)
+            if tokens <= self.chunk_tokens:
+                units.append(_Unit(sentence_start, sentence_end, tokens))
+                continue
+            # A "sentence" longer than a chunk (a table, a page without punctuation): cut between words
+            step = max(1, len(sentence) * self.chunk_tokens // tokens)
+            position = sentence_start
+            while position < sentence_end:
+                cut = min(sentence_end, position + step)
+                if cut < sentence_end:
+                    space = text.rfind(" ", position, cut)
+                    cut = space if space > position else cut
+                piece = text[position:cut]
+                if piece.strip():
+                    units.append(_Unit(position, cut, self.length_function(piece)))
+                position = cut
+                while position < sentence_end and text[position].isspace():
+                    position += 1
+        return units
+
+    def _units(self, text):
+        units = []
+        for start, end, structured in _blocks(text):
+            end = start + len(text[start:end].rstrip())
+            block = text[start:end]
+            tokens = self.length_function(block)
+            if tokens <= self.chunk_tokens or (structured and tokens <= self.chunk_tokens * MAX_BLOCK_CHUNKS):
+                heading = "\n" not in block and bool(_HEADING_RE.match(block) or len(block) < 80
+                                                     and not block.rstrip().endswith((".", ":", ";", "}", ")")))
+                units.append(_Unit(start, end, tokens, heading))
+            elif structured:
+                units.extend(self._line_units(text, start, end))
+            else:
+                units.extend(self._sentence_units(text, start, end))
+        return units
+
+    def _pack(self, units):
+        chunks = []
+        current, tokens = [], 0
+        for unit in units:
+            # A lone heading may push its section's first chunk a little over the limit
+            fits = tokens + unit.tokens <= self.chunk_tokens * (1.25 if len(current) == 1 and current[0].heading else 1)
+            if current and not fits:
+                carried = []
+                # Don't end a chunk on a heading: it belongs to the next section
+                while len(current) > 1 and current[-1].heading:
+                    carried.insert(0, current.pop())
+                chunks.append(current)
+                overlap, overlap_tokens = [], 0
+                for previous in reversed(current):
+                    if overlap_tokens + previous.tokens > self.overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_tokens += previous.tokens
+                current = overlap + carried
+                tokens = sum(u.tokens for u in current)
+            current.append(unit)
+            tokens += unit.tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def split_spans(self, text):
+        """(start, end) of each chunk of a text"""
+        return [(chunk[0].start, chunk[-1].end) for chunk in self._pack(self._units(text))]
+
+    def split_text(self, text):
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_documents(self, documents):
+        chunks = []
+        for doc in documents:
+            for start, end in self.split_spans(doc.page_content):
+                metadata = dict(doc.metadata)
+                metadata["start_index"] = start
+                chunks.append(Document(page_content=doc.page_content[start:end], metadata=metadata))
+        return chunks
+
+
+def default_splitter():
+    """The splitter shared by ingestion and uploads"""
+    return StructureAwareSplitter()
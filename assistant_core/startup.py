@@ -0,0 +1,154 @@
+"""Where the app's startup time goes, step by step.
+
+    python -m assistant_core.startup --mode Auto --fake-llm
+
+The app records its imports, its first paint and the background warm-up of
+the engines (embedding model, vector store, LLM client) in the process-wide
+profile and writes it to ``metrics/startup_profile.json``. This command repeats
+the same steps in a fresh process and prints the breakdown, followed by the
+import time of the upload libraries the app only loads when they are needed.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from assistant_core.config import AUTO_MODE, DOMAINS, METRICS_DIRECTORY
+
+IMPORT = "import"
+INIT = "init"
+MILESTONE = "milestone"
+
+# What the app script imports before it draws anything
+APP_IMPORTS = ["streamlit", "dotenv", "assistant_core.engines", "assistant_core.kb_stats", "assistant_core.tracing"]
+# Loaded on first use by an upload or an ingestion, never during startup
+DEFERRED_IMPORTS = ["langchain_community.document_loaders", "pypdf", "docx", "PIL", "pytesseract", "pdf2image"]
+
+
+class StartupProfile:
+    """Timed import and initialization steps of one process, each recorded once.
+
+    Streamlit re-executes the app script on every interaction, but a step that
+    is already recorded (an import that is now a ``sys.modules`` lookup) is not
+    recorded again, so the profile describes the first run. Steps can come
+    from several threads; ``at_s`` is their start relative to the profile's
+    creation, which is the first import of this module.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(METRICS_DIRECTORY, "startup_profile.json")
+        self.started = time.perf_counter()
+        self.steps = []
+        self._names = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name, kind=INIT):
+        if name in self._names:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, kind, start, time.perf_counter() - start)
+
+    def import_module(self, name):
+        with self.step(f"import {name}", IMPORT):
+            return importlib.import_module(name)
+
+    def mark(self, name):
+        """Record a milestone (e.g. first paint); False if it was already recorded"""
+        return self._add(name, MILESTONE, time.perf_counter(), 0.0)
+
+    def _add(self, name, kind, start, seconds):
+        with self._lock:
+            if name in self._names:
+                return False
+            self._names.add(name)
+            self.steps.append({"name": name, "kind": kind, "at_s": start - self.started, "seconds": seconds,
+                               "thread": threading.current_thread().name})
+            return True
+
+    def report(self):
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s["at_s"])
+        milestones = {s["name"]: s["at_s"] for s in steps if s["kind"] == MILESTONE}
+        return {"steps": steps, "milestones": milestones,
+                "total_s": max((s["at_s"] + s["seconds"] for s in steps), default=0.0)}
+
+    def write(self):
+        """Save the report next to the query metrics (best effort)"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, indent=2)
+        except OSError as e:
+            print(f"⚠️ Could not write the startup profile: {e}")
+
+
+def format_profile(report):
+    lines = [f"{'at':>8}  {'took':>9}  step"]
+    for step in report["steps"]:
+        took = "" if step["kind"] == MILESTONE else f"{step['seconds'] * 1000:7.0f} ms"
+        thread = "" if step["thread"] == "MainThread" else f"  [{step['thread']}]"
+        lines.append(f"{step['at_s']:7.3f}s  {took:>9}  {step['kind']:<9} {step['name']}{thread}")
+    return "\n".join(lines)
+
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def get_startup_profile():
+    """Return the process-wide startup profile"""
+    global _profile
+    if _profile is None:
+        with _profile_lock:
+            if _profile is None:
+                _profile = StartupProfile()
+    return _profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the app's startup in a fresh process")
+    parser.add_argument("--mode", default=AUTO_MODE, choices=[AUTO_MODE, *DOMAINS], help="engine to warm up")
+    parser.add_argument("--fake-llm", action="store_true", help="use the local stub LLM (no Gemini client or API key)")
+    args = parser.parse_args(argv)
+
+    profile = get_startup_profile()
+    for name in APP_IMPORTS:
+        try:
+            profile.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ {e}")
+    profile.mark("first paint")
+
+    from assistant_core.engines import EngineRegistry
+    llm = None
+    if args.fake_llm:
+        from assistant_core.fakes import FakeChatModel
+        llm = FakeChatModel()
+    registry = EngineRegistry(llm=llm)
+    registry.warm_up(args.mode).join()
+    profile.mark("ready to answer")
+    for name in DEFERRED_IMPORTS:
+        try:
+            with profile.step(f"import {name} (deferred)", IMPORT):
+                importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ {e}")
+
+    report = profile.report()
+    print(format_profile(report))
+    print(f"\n🚀 First paint after {report['milestones']['first paint']:.2f}s, "
+          f"ready to answer after {report['milestones'].get('ready to answer', float('nan')):.2f}s")
+    return 0 if registry.peek_engine(args.mode) is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
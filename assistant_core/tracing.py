@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from assistant_core.config import METRICS_DIRECTORY
+
+# Query stages in pipeline order
+STAGES = ["history", "embed", "cache", "search", "rerank", "format_docs", "prompt", "llm", "parse"]
+COUNTERS = ["retrieved_chunks", "context_passages", "context_chars", "history_tokens", "prompt_tokens",
+            "rerank_skipped", "llm_fallback"]
+# Histogram bucket upper bounds (seconds) for the Prometheus export
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+QUESTION_PREVIEW_CHARS = 120
+
+
+class Trace:
+    """Timing spans and counters for one query"""
+
+    def __init__(self, engine, question="", streamed=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.engine = engine
+        self.question = question[:QUESTION_PREVIEW_CHARS]
+        self.streamed = streamed
+        self.cached = False
+        self.route = None
+        self.timestamp = datetime.now().isoformat(timespec="seconds")
+        self.spans = {}
+        self.counters = {}
+        self.ttft_s = None
+        self.total_s = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        # Accumulates, so a stage that runs per streamed chunk (parse) sums up
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "engine": self.engine,
+            "question": self.question,
+            "streamed": self.streamed,
+            "cached": self.cached,
+            "route": self.route,
+            "spans": self.spans,
+            "counters": self.counters,
+            "ttft_s": self.ttft_s,
+            "total_s": self.total_s,
+        }
+
+
+class Tracer:
+    """Collects finished query traces.
+
+    Each trace is appended to a JSON-lines file and folded into per-engine
+    aggregates that are rewritten as a Prometheus text-format file, so a
+    node_exporter textfile collector (or a plain ``cat``) can read them. The
+    last ``history`` traces are kept in memory for the UI.
+    """
+
+    def __init__(self, directory=METRICS_DIRECTORY, history=50, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.jsonl_path = os.path.join(directory, "query_traces.jsonl")
+        self.prometheus_path = os.path.join(directory, "query_metrics.prom")
+        self._recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def finish(self, trace, generation_stats=None):
+        if generation_stats:
+            trace.cached = generation_stats.get("cached", trace.cached)
+            trace.ttft_s = generation_stats.get("ttft_s")
+            trace.total_s = generation_stats.get("total_s")
+        record = trace.as_dict()
+        with self._lock:
+            self._recent.append(record)
+            self._aggregate(trace)
+            if self.enabled:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+                tmp_path = f"{self.prometheus_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(self._prometheus_text())
+                os.replace(tmp_path, self.prometheus_path)
+
+    def _aggregate(self, trace):
+        key = (trace.engine, "true" if trace.cached else "false")
+        self._requests[key] = self._requests.get(key, 0) + 1
+        for name, value in trace.counters.items():
+            counter_key = (trace.engine, name)
+            self._counters[counter_key] = self._counters.get(counter_key, 0) + value
+        stages = dict(trace.spans)
+        if trace.total_s is not None:
+            stages["total"] = trace.total_s
+        if trace.ttft_s is not None and trace.streamed:
+            stages["ttft"] = trace.ttft_s
+        for stage, seconds in stages.items():
+            histogram = self._histograms.setdefault(
+                (trace.engine, stage), {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def _prometheus_text(self):
+        lines = [
+            "# HELP rag_requests_total Queries answered, by engine and answer-cache hit",
+            "# TYPE rag_requests_total counter",
+        ]
+        for (engine, cached), value in sorted(self._requests.items()):
+            lines.append(f'rag_requests_total{{engine="{engine}",cached="{cached}"}} {value}')
+        for name in COUNTERS:
+            lines.append(f"# HELP rag_{name}_total Sum of {name.replace('_', ' ')} over all queries")
+            lines.append(f"# TYPE rag_{name}_total counter")
+            for (engine, counter), value in sorted(self._counters.items()):
+                if counter == name:
+                    lines.append(f'rag_{name}_total{{engine="{engine}"}} {value}')
+        lines.append("# HELP rag_stage_seconds Time spent per query stage")
+        lines.append("# TYPE rag_stage_seconds histogram")
+        for (engine, stage), histogram in sorted(self._histograms.items()):
+            labels = f'engine="{engine}",stage="{stage}"'
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                lines.append(f'rag_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'rag_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f"rag_stage_seconds_sum{{{labels}}} {histogram['sum']:.6f}")
+            lines.append(f"rag_stage_seconds_count{{{labels}}} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def prometheus_text(self):
+        with self._lock:
+            return self._prometheus_text()
+
+    def recent(self, n=10):
+        """The last ``n`` traces as dicts, newest first"""
+        with self._lock:
+            return list(self._recent)[-n:][::-1]
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Return the process-wide tracer shared by all engines"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
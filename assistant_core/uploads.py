@@ -0,0 +1,57 @@
+import io
+from typing import List
+
+from langchain_core.documents import Document
+
+from assistant_core.ocr import pages_without_text
+
+PDF_TYPES = ["pdf"]
+DOCX_TYPES = ["docx", "doc"]
+IMAGE_TYPES = ["png", "jpg", "jpeg", "tiff", "bmp"]
+
+
+def file_type_of(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def parse_pdf_bytes(name: str, data: bytes) -> List[Document]:
+    """Extract text page by page, with the same metadata PyPDFLoader produces"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return [
+        Document(page_content=page.extract_text() or "", metadata={"source": name, "page": i})
+        for i, page in enumerate(reader.pages)
+    ]
+
+
+def parse_docx_bytes(name: str, data: bytes) -> List[Document]:
+    import docx
+
+    document = docx.Document(io.BytesIO(data))
+    text = "\n".join(paragraph.text for paragraph in document.paragraphs)
+    return [Document(page_content=text, metadata={"source": name})]
+
+
+def parse_upload(name: str, data: bytes) -> dict:
+    """Parse one uploaded file from memory; runs in a worker process.
+
+    Returns {"name", "docs", "error", "ocr"} so one bad file never fails the whole
+    batch. ``ocr`` says what still needs OCR: "image" for images, a list of page
+    numbers for PDF pages without a text layer, or None.
+    """
+    result = {"name": name, "docs": [], "error": None, "ocr": None}
+    file_type = file_type_of(name)
+    try:
+        if file_type in PDF_TYPES:
+            result["docs"] = parse_pdf_bytes(name, data)
+            result["ocr"] = pages_without_text(result["docs"]) or None
+        elif file_type in DOCX_TYPES:
+            result["docs"] = parse_docx_bytes(name, data)
+        elif file_type in IMAGE_TYPES:
+            result["ocr"] = "image"
+        else:
+            result["error"] = f"Unsupported file type: .{file_type}"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
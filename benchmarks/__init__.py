@@ -0,0 +1,5 @@
+"""Offline retrieval, latency and ingestion benchmarks on a fixed golden set.
+
+Run ``python -m benchmarks.run`` to write a JSON report and
+``python -m benchmarks.compare old.json new.json`` to compare two reports.
+"""
@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+
+# Metric name fragments where a larger value is better; everything else timed is better smaller
+HIGHER_IS_BETTER = ("recall", "accuracy", "per_s")
+LOWER_IS_BETTER = ("_ms", "wall_s", "build_store_s", "tokens")
+
+
+def flatten(report, prefix=""):
+    """Numeric leaves of a report as {"dotted.path": value}"""
+    flat = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def direction(metric):
+    """+1 if higher is better, -1 if lower is better, 0 if the metric is informational"""
+    if any(part in metric for part in HIGHER_IS_BETTER):
+        return 1
+    if any(part in metric for part in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(old, new, threshold=0.1):
+    """Per-metric old/new/relative change; a regression is a change in the bad direction beyond ``threshold``"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    rows = []
+    for metric in sorted(old_flat.keys() & new_flat.keys()):
+        sign = direction(metric)
+        if not sign:
+            continue
+        before, after = old_flat[metric], new_flat[metric]
+        change = (after - before) / abs(before) if before else (0.0 if after == before else float("inf"))
+        rows.append({"metric": metric, "old": before, "new": after, "change": change,
+                     "regression": sign * change < -threshold, "improvement": sign * change > threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old.get("embedder") != new.get("embedder"):
+        print(f"⚠️  Different embedders ({old.get('embedder')} vs {new.get('embedder')}), results are not comparable")
+
+    rows = compare(old, new, args.threshold)
+    for row in rows:
+        mark = "🔴" if row["regression"] else "🟢" if row["improvement"] else "  "
+        print(f"{mark} {row['metric']:<45} {row['old']:12.4f} → {row['new']:12.4f}  {row['change']:+7.1%}")
+    regressions = [row for row in rows if row["regression"]]
+    print(f"\n{len(regressions)} regression(s), {sum(row['improvement'] for row in rows)} improvement(s) "
+          f"beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Embedding backend parity and throughput.
+
+    python -m benchmarks.embeddings --backends torch onnx onnx-int8
+
+Each backend embeds the golden passages and questions. Its vectors are compared
+with the reference backend's (cosine similarity per text, agreement of the top-5
+passages per question), and its batch and single-query speed is measured.
+Exits non-zero if a backend's vectors drift beyond ``--min-cosine``.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from assistant_core.config import EMBEDDING_MODEL_NAME
+from assistant_core.embeddings import EMBEDDING_BACKENDS, create_embeddings
+from benchmarks.run import RESULTS_DIR, git_commit
+from benchmarks.suite import load_golden_set, percentiles
+
+TOP_K = 5
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def measure_backend(backend, texts, queries, batch_copies):
+    """Load time, batch throughput and single-query latency; returns (stats, passage vectors, query vectors)"""
+    start = time.perf_counter()
+    model = create_embeddings(backend)
+    load_s = time.perf_counter() - start
+    model.embed_query("warm up")
+
+    passage_vectors = model.embed_documents(texts)
+    batch = [f"{text} ({copy})" for copy in range(batch_copies) for text in texts]
+    start = time.perf_counter()
+    model.embed_documents(batch)
+    batch_s = time.perf_counter() - start
+
+    query_vectors, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(model.embed_query(query))
+        latencies.append(time.perf_counter() - start)
+
+    stats = {
+        "load_s": load_s,
+        "batch_texts": len(batch),
+        "batch_wall_s": batch_s,
+        "texts_per_s": len(batch) / batch_s if batch_s else 0.0,
+        "query": percentiles(latencies),
+    }
+    return stats, _normalize(passage_vectors), _normalize(query_vectors)
+
+
+def top_k(query_vectors, passage_vectors, k=TOP_K):
+    return np.argsort(-(query_vectors @ passage_vectors.T), axis=1)[:, :k]
+
+
+def recall(ranked, golden):
+    ids = [p["id"] for p in golden["passages"]]
+    hits = [bool(set(q["relevant"]) & {ids[i] for i in row}) for row, q in zip(ranked, golden["questions"])]
+    return sum(hits) / len(hits)
+
+
+def parity(reference, candidate):
+    """Per-text cosine similarity between two backends' vectors and top-k agreement of the rankings"""
+    (ref_passages, ref_queries), (passages, queries) = reference, candidate
+    cosines = np.concatenate([(ref_passages * passages).sum(axis=1), (ref_queries * queries).sum(axis=1)])
+    ref_top, top = top_k(ref_queries, ref_passages), top_k(queries, passages)
+    agreement = np.mean([len(set(a) & set(b)) / TOP_K for a, b in zip(ref_top, top)])
+    return {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "max_abs_diff": float(np.abs(np.concatenate([ref_passages - passages, ref_queries - queries])).max()),
+        f"top{TOP_K}_agreement": float(agreement),
+    }
+
+
+def run(backends, reference="torch", batch_copies=20):
+    golden = load_golden_set()
+    texts = [p["text"] for p in golden["passages"]]
+    queries = [q["question"] for q in golden["questions"]]
+    order = [reference] + [b for b in backends if b != reference]
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "model": EMBEDDING_MODEL_NAME,
+        "reference": reference,
+        "backends": {},
+    }
+    vectors = {}
+    for backend in order:
+        print(f"🧮 {backend}...")
+        stats, passage_vectors, query_vectors = measure_backend(backend, texts, queries, batch_copies)
+        vectors[backend] = (passage_vectors, query_vectors)
+        stats[f"recall@{TOP_K}"] = recall(top_k(query_vectors, passage_vectors), golden)
+        if backend != reference:
+            stats["parity"] = parity(vectors[reference], vectors[backend])
+            stats["speedup"] = stats["texts_per_s"] / report["backends"][reference]["texts_per_s"]
+        report["backends"][backend] = stats
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare embedding backends for speed and parity")
+    parser.add_argument("--backends", nargs="+", default=EMBEDDING_BACKENDS, choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--reference", default="torch", choices=EMBEDDING_BACKENDS, help="backend the others must match")
+    parser.add_argument("--batch-copies", type=int, default=20, help="copies of the golden passages in the throughput batch")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="lowest acceptable cosine similarity to the reference")
+    parser.add_argument("--output", help="report path (default benchmarks/results/embeddings_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(args.backends, args.reference, args.batch_copies)
+    output = args.output or os.path.join(RESULTS_DIR, f"embeddings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    failed = []
+    for backend, stats in report["backends"].items():
+        line = (f"  {backend:<10} {stats['texts_per_s']:8.1f} texts/s · query p50 {stats['query']['p50_ms']:6.2f} ms"
+                f" · recall@{TOP_K} {stats[f'recall@{TOP_K}']:.2f}")
+        if "parity" in stats:
+            check = stats["parity"]
+            ok = check["min_cosine"] >= args.min_cosine
+            failed += [] if ok else [backend]
+            line += (f" · {stats['speedup']:.2f}x · min cosine {check['min_cosine']:.4f} "
+                     f"· top{TOP_K} agreement {check[f'top{TOP_K}_agreement']:.2f} {'✅' if ok else '❌'}")
+        print(line)
+    print(f"✅ Report written to {output}")
+    if failed:
+        print(f"❌ {', '.join(failed)} drifted below cosine {args.min_cosine} from {args.reference}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
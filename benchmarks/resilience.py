@@ -0,0 +1,131 @@
+"""Tail latency of answers with and without the resilient LLM layer.
+
+    python -m benchmarks.resilience --fake-embeddings
+
+The golden questions are answered concurrently by engines whose LLM is a stub
+with a latency tail (a few calls are ~30x slower than the rest) and occasional
+errors. The same question stream runs against the bare stub ("before") and
+through ResilientLLM ("after"): once as is ("tail"), and once with the stub
+down for the middle third of the questions ("outage"). The report gives
+p50/p95/p99 of the ``query`` calls, failed answers, passage fallbacks and the
+number of LLM calls made.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from assistant_core.fakes import FlakyChatModel
+from assistant_core.resilience import CircuitBreaker, ResilientLLM
+from benchmarks.run import RESULTS_DIR, git_commit
+from benchmarks.suite import build_store, load_engines, load_golden_set, percentiles, quiet
+
+SCENARIOS = ["tail", "outage"]
+
+
+def answer(engine, question):
+    start = time.perf_counter()
+    try:
+        _, trace = engine.query_with_trace(question)
+        outcome = "fallback" if trace is not None and trace.counters.get("llm_fallback") else "answered"
+    except Exception:
+        outcome = "failed"
+    return time.perf_counter() - start, outcome
+
+
+def run_scenario(engines, auto, questions, stub, outage, concurrency):
+    """Latency and outcome of every question; with ``outage`` the stub is down for the middle third"""
+    third = len(questions) // 3
+    phases = [(questions[:third], False), (questions[third:2 * third], outage), (questions[2 * third:], False)]
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for phase, down in phases:
+            stub.down = down
+            results += pool.map(lambda q: answer(engines.get(q["domain"], auto), q["question"]), phase)
+    stub.down = False
+    latencies = [seconds for seconds, _ in results]
+    outcomes = [outcome for _, outcome in results]
+    return dict(percentiles(latencies), **{name: outcomes.count(name) for name in ("answered", "fallback", "failed")},
+                llm_calls=stub.calls)
+
+
+def run(embedding_function, embedder, repeats=20, concurrency=8, latency=0.1, slow_rate=0.03, slow_latency=3.0,
+        error_rate=0.02, timeout_s=1.0, retries=2):
+    golden = load_golden_set()
+    questions = [q for _ in range(repeats) for q in golden["questions"]]
+    random.Random(0).shuffle(questions)
+    stub_settings = {"latency": latency, "slow_rate": slow_rate, "slow_latency": slow_latency, "error_rate": error_rate}
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "embedder": embedder,
+        "questions": len(questions),
+        "concurrency": concurrency,
+        "stub_llm": stub_settings,
+        "resilience": {"timeout_s": timeout_s, "retries": retries, "hedge": "p95"},
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="cfd_resilience_") as directory:
+        store = os.path.join(directory, "store", "chroma_db")
+        build_store(store, golden, embedding_function)
+        for scenario in SCENARIOS:
+            for variant in ("before", "after"):
+                print(f"⏱️  {scenario} · {variant}...")
+                stub = FlakyChatModel(seed=1, **stub_settings)
+                if variant == "after":
+                    # A short reset so the breaker closes again once the outage is over
+                    llm = ResilientLLM(stub, timeout_s=timeout_s, retries=retries, breaker=CircuitBreaker(reset_s=0.25))
+                else:
+                    llm = stub
+                # Also silences the fallback messages; redirecting stdout is process-wide, so not per thread
+                with quiet():
+                    engines, auto = load_engines(store, embedding_function, llm, resilient=variant == "after")
+                    stats = run_scenario(engines, auto, questions, stub, scenario == "outage", concurrency)
+                if variant == "after":
+                    stats["resilience"] = llm.stats()
+                report["scenarios"].setdefault(scenario, {})[variant] = stats
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="p99 answer latency with and without timeouts, retries and hedging")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use the deterministic hashing embedder instead of the real model")
+    parser.add_argument("--repeats", type=int, default=20, help="passes over the golden questions")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions in flight at once")
+    parser.add_argument("--latency", type=float, default=0.1, help="typical stub LLM latency (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="share of stub calls that are slow")
+    parser.add_argument("--slow-latency", type=float, default=3.0, help="latency of a slow stub call (s)")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of stub calls that fail")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-attempt deadline of the resilient layer (s)")
+    parser.add_argument("--retries", type=int, default=2, help="retries of the resilient layer")
+    parser.add_argument("--output", help="report path (default benchmarks/results/resilience_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if args.fake_embeddings:
+        from assistant_core.fakes import FakeEmbeddings
+        embedding_function, embedder = FakeEmbeddings(), "fake"
+    else:
+        from assistant_core.embeddings import embedding_namespace, get_embedding_function
+        embedding_function, embedder = get_embedding_function(), embedding_namespace()
+    report = run(embedding_function, embedder, repeats=args.repeats, concurrency=args.concurrency,
+                 latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                 error_rate=args.error_rate, timeout_s=args.timeout, retries=args.retries)
+    output = args.output or os.path.join(RESULTS_DIR, f"resilience_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"  {'scenario':<8} {'llm':<7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  answered  fallback  failed  llm calls")
+    for scenario, variants in report["scenarios"].items():
+        for variant, stats in variants.items():
+            print(f"  {scenario:<8} {variant:<7} {stats['p50_ms']:>8.0f} {stats['p95_ms']:>8.0f} {stats['p99_ms']:>8.0f}"
+                  f"  {stats['answered']:>8}  {stats['fallback']:>8}  {stats['failed']:>6}  {stats['llm_calls']:>9}")
+    print(f"✅ Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
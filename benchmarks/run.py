@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from assistant_core.config import REPO_ROOT
+from assistant_core.fakes import FakeChatModel, FakeCrossEncoder, FakeEmbeddings
+from benchmarks.suite import (build_store, ingestion_benchmark, latency_benchmark, load_engines,
+                              load_golden_set, retrieval_benchmark)
+
+REPORT_VERSION = 1
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(fake_embeddings=False, repeats=3, ingest_copies=10, first_token_delay=0.0, token_delay=0.0,
+        skip_ingestion=False, vector_backend="chroma", rerank=False):
+    """Run the whole suite in a temporary store and return the report dict"""
+    golden = load_golden_set()
+    if fake_embeddings:
+        embedding_function, embedder = FakeEmbeddings(), "fake"
+    else:
+        from assistant_core.embeddings import embedding_namespace, get_embedding_function
+        embedding_function, embedder = get_embedding_function(), embedding_namespace()
+    llm = FakeChatModel(first_token_delay=first_token_delay, token_delay=token_delay)
+    reranker = None
+    if rerank:
+        from assistant_core.rerank import CrossEncoderReranker
+        # The fake cross-encoder scores term overlap; the real one is downloaded on first use
+        reranker = CrossEncoderReranker(model=FakeCrossEncoder() if fake_embeddings else None, latency_budget_s=float("inf"))
+
+    report = {
+        "report_version": REPORT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "embedder": embedder,
+        "vector_backend": vector_backend,
+        "reranker": None if reranker is None else ("fake" if fake_embeddings else reranker.model_name),
+        "llm": {"first_token_delay_s": first_token_delay, "token_delay_s": token_delay},
+        "golden_set": {"version": golden["version"], "passages": len(golden["passages"]),
+                       "questions": len(golden["questions"])},
+    }
+    with tempfile.TemporaryDirectory(prefix="cfd_bench_") as directory:
+        store = os.path.join(directory, "store", "chroma_db")
+        start = time.perf_counter()
+        build_store(store, golden, embedding_function)
+        report["build_store_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        engines, auto = load_engines(store, embedding_function, llm, vector_backend, reranker)
+        report["engine_start_s"] = time.perf_counter() - start
+        print("🎯 Retrieval quality...")
+        report["retrieval"] = retrieval_benchmark(engines, auto, golden)
+        print("⏱️  Query stage latency...")
+        report["latency"] = latency_benchmark(engines, auto, golden, repeats=repeats)
+        if not skip_ingestion:
+            print("📥 Ingestion throughput...")
+            report["ingestion"] = ingestion_benchmark(directory, golden, embedding_function, copies=ingest_copies)
+    return report
+
+
+def format_summary(report):
+    lines = []
+    for mode, stats in report["retrieval"].items():
+        if "dense" in stats:
+            recall = " · ".join(f"{k} {stats['dense'][k]:.2f}/{stats['hybrid'][k]:.2f}" for k in stats["dense"])
+            lines.append(f"  {mode:<9} dense/hybrid {recall}")
+        else:
+            metrics = " · ".join(f"{k} {v:.2f}" for k, v in stats.items() if k != "questions")
+            lines.append(f"  {mode:<9} {metrics}")
+    for stage, stats in report["latency"].items():
+        if stage == "prompt_tokens":
+            lines.append(f"  prompt tokens mean {stats['mean']:.0f} · max {stats['max']}")
+            continue
+        lines.append(f"  {stage:<9} p50 {stats['p50_ms']:8.2f} ms · p95 {stats['p95_ms']:8.2f} ms · "
+                     f"p99 {stats['p99_ms']:8.2f} ms")
+    for name, stats in report.get("ingestion", {}).items():
+        lines.append(f"  {name:<18} {stats['chunks']} chunks in {stats['wall_s']:.2f}s "
+                     f"({stats['chunks_per_s']:.1f} chunks/s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline retrieval, latency and ingestion benchmarks")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use the deterministic hashing embedder instead of the real model")
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the golden questions for latency percentiles")
+    parser.add_argument("--ingest-copies", type=int, default=10, help="copies of the golden corpus to ingest for throughput")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="fake LLM latency before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake LLM latency per token (s)")
+    parser.add_argument("--skip-ingestion", action="store_true", help="only measure retrieval and query latency")
+    parser.add_argument("--vector-backend", default="chroma", choices=["chroma", "flat"], help="dense retrieval backend")
+    parser.add_argument("--rerank", action="store_true", help="add the cross-encoder rerank stage (a fake one with --fake-embeddings)")
+    parser.add_argument("--output", help="report path (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    report = run(fake_embeddings=args.fake_embeddings, repeats=args.repeats, ingest_copies=args.ingest_copies,
+                 first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                 skip_ingestion=args.skip_ingestion, vector_backend=args.vector_backend, rerank=args.rerank)
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(format_summary(report))
+    print(f"✅ Report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
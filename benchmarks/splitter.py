@@ -0,0 +1,251 @@
+"""Chunking comparison: the old character splitter against the structure-aware one.
+
+    python -m benchmarks.splitter --fake-embeddings
+
+The golden passages of each domain are assembled into one long document with
+OpenFOAM dictionaries, code and equations between them. Each splitter's chunks
+are measured for count, size (tokens indexed), structural blocks cut in two and
+split throughput, then embedded to measure recall@k of the golden questions and
+how many chunks (and tokens) retrieval needs to reach the relevant passage.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from assistant_core.config import DOMAINS
+from assistant_core.splitter import default_splitter
+from assistant_core.tokens import count_tokens
+from benchmarks.run import RESULTS_DIR, git_commit
+from benchmarks.suite import RECALL_KS, load_golden_set
+
+# Share of a passage a chunk must contain to count as retrieving it
+COVERAGE = 0.5
+
+# Example files placed between the golden passages, each a list of its top-level entries
+STRUCTURED_FILES = {
+    "CFD": [
+        ["The incompressible momentum equation in conservative form:\n"
+        "\\begin{equation}\n"
+        "\\frac{\\partial \\mathbf{u}}{\\partial t} + \\nabla \\cdot (\\mathbf{u} \\otimes \\mathbf{u})\n"
+        "  = -\\frac{1}{\\rho} \\nabla p + \\nu \\nabla^2 \\mathbf{u}\n"
+        "\\end{equation}"],
+        ["Transport equations of the standard k-epsilon model:\n"
+        "\\begin{align}\n"
+        "\\frac{\\partial k}{\\partial t} + \\nabla \\cdot (\\mathbf{u} k) &= \\nabla \\cdot \\left[\\left(\\nu + "
+        "\\frac{\\nu_t}{\\sigma_k}\\right) \\nabla k\\right] + P_k - \\varepsilon \\\\\n"
+        "\\frac{\\partial \\varepsilon}{\\partial t} + \\nabla \\cdot (\\mathbf{u} \\varepsilon) &= \\nabla \\cdot "
+        "\\left[\\left(\\nu + \\frac{\\nu_t}{\\sigma_\\varepsilon}\\right) \\nabla \\varepsilon\\right]\n"
+        "  + C_{1\\varepsilon} \\frac{\\varepsilon}{k} P_k - C_{2\\varepsilon} \\frac{\\varepsilon^2}{k}\n"
+        "\\end{align}"],
+        ["Computing the maximum Courant number of a uniform 1D grid:\n"
+        "```cpp\n"
+        "double maxCourant(const std::vector<double>& u, double dt, double dx)\n"
+        "{\n"
+        "    double co = 0.0;\n"
+        "    for (double ui : u)\n"
+        "    {\n"
+        "        co = std::max(co, std::abs(ui) * dt / dx);\n"
+        "    }\n"
+        "\n"
+        "    return co;\n"
+        "}\n"
+        "```"],
+    ],
+    "OpenFOAM": [
+        ["system/fvSolution for a steady incompressible case:\n"
+        "solvers\n{\n"
+        "    p\n    {\n        solver          GAMG;\n        tolerance       1e-06;\n"
+        "        relTol          0.1;\n        smoother        GaussSeidel;\n    }\n\n"
+        "    \"(U|k|epsilon)\"\n    {\n        solver          smoothSolver;\n        smoother        symGaussSeidel;\n"
+        "        tolerance       1e-05;\n        relTol          0.1;\n    }\n}",
+        "SIMPLE\n{\n    nNonOrthogonalCorrectors 0;\n    consistent      yes;\n\n"
+        "    residualControl\n    {\n        p               1e-2;\n        U               1e-3;\n    }\n}"],
+        ["system/controlDict of a transient run:\n"
+        "application     pimpleFoam;\nstartFrom       latestTime;\nstartTime       0;\nstopAt          endTime;\n"
+        "endTime         10;\ndeltaT          0.001;\nwriteControl    adjustable;\nwriteInterval   0.1;\n"
+        "adjustTimeStep  yes;\nmaxCo           0.9;",
+        "functions\n{\n    forces\n    {\n        type            forces;\n        libs            (forces);\n"
+        "        patches         (wing);\n        rho             rhoInf;\n        rhoInf          1.225;\n"
+        "        CofR            (0 0 0);\n    }\n}"],
+        ["system/fvSchemes with second-order bounded convection:\n"
+        "ddtSchemes\n{\n    default         Euler;\n}",
+        "gradSchemes\n{\n    default         Gauss linear;\n    grad(U)         cellLimited Gauss linear 1;\n}",
+        "divSchemes\n{\n    default         none;\n    div(phi,U)      bounded Gauss linearUpwind grad(U);\n"
+        "    div(phi,k)      bounded Gauss upwind;\n    div((nuEff*dev2(T(grad(U))))) Gauss linear;\n}",
+        "laplacianSchemes\n{\n    default         Gauss linear corrected;\n}"],
+        ["The vertices of a unit cube in system/blockMeshDict:\n"
+        "vertices\n(\n    (0 0 0)\n    (1 0 0)\n    (1 1 0)\n    (0 1 0)\n\n"
+        "    (0 0 1)\n    (1 0 1)\n    (1 1 1)\n    (0 1 1)\n);",
+        "blocks\n(\n    hex (0 1 2 3 4 5 6 7) (20 20 20) simpleGrading (1 1 1)\n);"],
+    ],
+}
+
+
+def hard_wrap(text, width=90):
+    """Text as PyPDFLoader returns a page: lines broken at ``width`` (spaces become newlines, offsets are kept)"""
+    chars = list(text)
+    line_start = 0
+    for i, char in enumerate(chars):
+        if char == " " and i - line_start >= width:
+            chars[i] = "\n"
+            line_start = i + 1
+    return "".join(chars)
+
+
+def build_corpus(golden):
+    """Per domain, a web-like document with the example files between paragraphs and a PDF-like page dump.
+
+    Returns (documents, {passage id: [(doc index, start, end)]}, [(doc index, start, end) of file entries]).
+    """
+    documents, passages, blocks = [], {}, []
+    for mode in DOMAINS:
+        domain_passages = [p for p in golden["passages"] if p["domain"] == mode]
+        position = 0
+        texts = []
+        for passage in domain_passages:
+            passages.setdefault(passage["id"], []).append((len(documents), position, position + len(passage["text"])))
+            texts.append(hard_wrap(passage["text"]))
+            position += len(passage["text"]) + 1
+        documents.append(Document(page_content="\n".join(texts), metadata={"source": f"golden://{mode}.pdf"}))
+
+        parts, spans = [], []
+        position = 0
+        domain_passages = [p for p in golden["passages"] if p["domain"] == mode]
+        domain_files = STRUCTURED_FILES.get(mode, [])
+        for i, passage in enumerate(domain_passages):
+            parts.append(passage["text"])
+            spans.append(("passage", passage["id"], position, position + len(passage["text"])))
+            position += len(passage["text"]) + 2
+            if i % 2 == 1 and domain_files:
+                for entry in domain_files[(i // 2) % len(domain_files)]:
+                    parts.append(entry)
+                    spans.append(("block", None, position, position + len(entry)))
+                    position += len(entry) + 2
+        doc_index = len(documents)
+        documents.append(Document(page_content="\n\n".join(parts), metadata={"source": f"golden://{mode}"}))
+        for kind, passage_id, start, end in spans:
+            if kind == "passage":
+                passages.setdefault(passage_id, []).append((doc_index, start, end))
+            else:
+                blocks.append((doc_index, start, end))
+    return documents, passages, blocks
+
+
+def splitters():
+    return {
+        "recursive": RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True),
+        "structure": default_splitter(),
+    }
+
+
+def chunk_spans(chunks, documents):
+    sources = {doc.metadata["source"]: i for i, doc in enumerate(documents)}
+    return [(sources[c.metadata["source"]], c.metadata["start_index"], c.metadata["start_index"] + len(c.page_content))
+            for c in chunks]
+
+
+def covers(span, target):
+    doc, start, end = span
+    target_doc, target_start, target_end = target
+    if doc != target_doc:
+        return 0.0
+    return max(0, min(end, target_end) - max(start, target_start)) / (target_end - target_start)
+
+
+def measure_splitter(splitter, documents, passages, blocks, golden, embedding_function, copies):
+    start = time.perf_counter()
+    for _ in range(copies):
+        splitter.split_documents(documents)
+    split_s = time.perf_counter() - start
+
+    chunks = splitter.split_documents(documents)
+    spans = chunk_spans(chunks, documents)
+    tokens = [count_tokens(c.page_content) for c in chunks]
+    corpus_chars = sum(len(d.page_content) for d in documents)
+    stats = {
+        "chunks": len(chunks),
+        "tokens_indexed": sum(tokens),
+        "mean_chunk_tokens": float(np.mean(tokens)),
+        "max_chunk_tokens": max(tokens),
+        "text_ratio": sum(len(c.page_content) for c in chunks) / corpus_chars,
+        "blocks": len(blocks),
+        "blocks_cut": sum(1 for block in blocks if not any(covers(span, block) == 1.0 for span in spans)),
+        "split_chars_per_s": corpus_chars * copies / split_s if split_s else 0.0,
+        "split_chunks_per_s": len(chunks) * copies / split_s if split_s else 0.0,
+    }
+
+    vectors = np.asarray(embedding_function.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    hits = {k: 0 for k in RECALL_KS}
+    ranks, context_tokens = [], []
+    for question in golden["questions"]:
+        query = np.asarray(embedding_function.embed_query(question["question"]), dtype=np.float32)
+        order = np.argsort(-(vectors @ query))
+        relevant = [target for pid in question["relevant"] for target in passages.get(pid, [])]
+        found = [rank for rank, i in enumerate(order)
+                 if any(covers(spans[i], target) >= COVERAGE for target in relevant)]
+        first = found[0] if found else len(order)
+        for k in RECALL_KS:
+            hits[k] += first < k
+        ranks.append(first + 1)
+        context_tokens.append(sum(tokens[i] for i in order[:first + 1]))
+    for k in RECALL_KS:
+        stats[f"recall@{k}"] = hits[k] / len(golden["questions"])
+    stats["chunks_to_answer"] = float(np.mean(ranks))
+    stats["tokens_to_answer"] = float(np.mean(context_tokens))
+    return stats
+
+
+def run(embedding_function, embedder, copies=50):
+    golden = load_golden_set()
+    documents, passages, blocks = build_corpus(golden)
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": git_commit(),
+        "embedder": embedder,
+        "splitters": {},
+    }
+    for name, splitter in splitters().items():
+        print(f"✂️  {name}...")
+        report["splitters"][name] = measure_splitter(splitter, documents, passages, blocks, golden,
+                                                     embedding_function, copies)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the character splitter with the structure-aware splitter")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use the deterministic hashing embedder instead of the real model")
+    parser.add_argument("--copies", type=int, default=50, help="passes over the corpus for split throughput")
+    parser.add_argument("--output", help="report path (default benchmarks/results/splitter_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if args.fake_embeddings:
+        from assistant_core.fakes import FakeEmbeddings
+        embedding_function, embedder = FakeEmbeddings(), "fake"
+    else:
+        from assistant_core.embeddings import embedding_namespace, get_embedding_function
+        embedding_function, embedder = get_embedding_function(), embedding_namespace()
+    report = run(embedding_function, embedder, args.copies)
+    output = args.output or os.path.join(RESULTS_DIR, f"splitter_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    recall = "  ".join(f"r@{k}" for k in RECALL_KS)
+    print(f"  {'splitter':<10} {'chunks':>6} {'tokens':>7} {'cut':>5} {'chars/s':>10}  {recall}  chunks/tokens to answer")
+    for name, stats in report["splitters"].items():
+        recalls = "  ".join(f"{stats[f'recall@{k}']:.2f}" for k in RECALL_KS)
+        print(f"  {name:<10} {stats['chunks']:>6} {stats['tokens_indexed']:>7} "
+              f"{stats['blocks_cut']:>2}/{stats['blocks']:<2} {stats['split_chars_per_s']:>10.0f}  {recalls}  "
+              f"{stats['chunks_to_answer']:.2f} / {stats['tokens_to_answer']:.0f}")
+    print(f"✅ Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import contextlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from assistant_core.config import DOMAINS
+from assistant_core.engines import _load_module
+from assistant_core.indexing import index_documents
+from assistant_core.router import AutoRAG
+from assistant_core.tokens import count_tokens
+from assistant_core.tracing import Tracer
+
+GOLDEN_SET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_set.json")
+RECALL_KS = (1, 3, 5)
+NO_HISTORY = "No previous conversation"
+
+
+def load_golden_set(path=GOLDEN_SET_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def golden_documents(golden, domain, copy=None):
+    """Golden passages of one domain as Documents; ``copy`` makes the text unique for throughput runs"""
+    docs = []
+    for passage in golden["passages"]:
+        if passage["domain"] != domain:
+            continue
+        text = passage["text"] if copy is None else f"{passage['text']} (copy {copy})"
+        docs.append(Document(page_content=text, metadata={"source": f"golden://{passage['id']}",
+                                                          "golden_id": passage["id"]}))
+    return docs
+
+
+def percentiles(samples):
+    """p50/p95/p99 and mean of a list of durations in seconds, reported in milliseconds"""
+    values = np.asarray(samples, dtype=float) * 1000
+    if not len(values):
+        return {"n": 0}
+    return {
+        "n": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress output of ingestion code being measured"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def build_store(directory, golden, embedding_function):
+    """Index every golden passage, one chunk each, into its domain's collection"""
+    with quiet():
+        for mode, domain in DOMAINS.items():
+            index_documents(golden_documents(golden, mode), directory, embedding_function,
+                            collection_name=domain["collection"])
+
+
+def load_engines(directory, embedding_function, llm, vector_backend="chroma", reranker=None, resilient=True):
+    """Domain engines plus an Auto router over the benchmark store, with answer caching off"""
+    # Keep benchmark traces in memory instead of the app's metrics files
+    tracer = Tracer(enabled=False)
+    engines = {}
+    for mode, domain in DOMAINS.items():
+        module = _load_module(f"benchmark_{mode.lower()}_rag", os.path.join(domain["package_dir"], "rag.py"))
+        rag_class = getattr(module, domain["rag_class"])
+        with quiet():
+            engines[mode] = rag_class(persist_directory=directory, embedding_function=embedding_function,
+                                      llm=llm, use_answer_cache=False, collection_name=domain["collection"],
+                                      tracer=tracer, vector_backend=vector_backend,
+                                      use_reranker=reranker is not None, reranker=reranker, resilient=resilient)
+    auto = AutoRAG(engines, llm=llm, use_answer_cache=False, resilient=resilient)
+    return engines, auto
+
+
+def _golden_ids(docs):
+    return [d.metadata.get("golden_id") for d in docs]
+
+
+def _recall(retrieved, relevant):
+    return len(set(retrieved) & set(relevant)) / len(relevant)
+
+
+def retrieval_benchmark(engines, auto, golden, ks=RECALL_KS):
+    """recall@k of dense similarity_search and of hybrid retrieval per domain, plus Auto routing.
+
+    Single-domain questions are scored against their domain's engine; every
+    question (including mixed ones) is also scored through the Auto router.
+    """
+    report = {}
+    for mode, engine in engines.items():
+        questions = [q for q in golden["questions"] if q["domain"] == mode]
+        dense = {k: [] for k in ks}
+        hybrid = {k: [] for k in ks}
+        packed = {"recall": [], "passages": [], "context_tokens": []}
+        default_k = engine.retrieval_k
+        for q in questions:
+            embedding = engine.embedding_function.embed_query(q["question"])
+            # What actually reaches the prompt after the context packer
+            if engine.context_packer is not None:
+                passages, stats = engine.context_packer.pack(engine._retrieve(q["question"], embedding))
+                packed["recall"].append(_recall(_golden_ids(passages), q["relevant"]))
+                packed["passages"].append(stats["passages"])
+                packed["context_tokens"].append(stats["context_tokens"])
+            for k in ks:
+                docs = engine.vectorstore.similarity_search(q["question"], k=k)
+                dense[k].append(_recall(_golden_ids(docs), q["relevant"]))
+                engine.retrieval_k = k
+                hybrid[k].append(_recall(_golden_ids(engine._retrieve(q["question"], embedding)), q["relevant"]))
+            engine.retrieval_k = default_k
+        report[mode] = {
+            "questions": len(questions),
+            "dense": {f"recall@{k}": float(np.mean(v)) for k, v in dense.items()},
+            "hybrid": {f"recall@{k}": float(np.mean(v)) for k, v in hybrid.items()},
+        }
+        if packed["recall"]:
+            report[mode]["packed"] = {f"mean_{name}": float(np.mean(v)) for name, v in packed.items()}
+
+    routed = []
+    auto_recall = []
+    for q in golden["questions"]:
+        embedding = auto.embedding_function.embed_query(q["question"])
+        modes, docs, routed_engine = auto.select(q["question"], embedding)
+        docs = (routed_engine or auto)._rerank(q["question"], docs)
+        auto_recall.append(_recall(_golden_ids(docs), q["relevant"]))
+        expected = sorted(DOMAINS) if q["domain"] == "both" else [q["domain"]]
+        routed.append(sorted(modes) == expected)
+    report["Auto"] = {
+        "questions": len(golden["questions"]),
+        f"recall@{auto.retrieval_k}": float(np.mean(auto_recall)),
+        "route_accuracy": float(np.mean(routed)),
+    }
+    return report
+
+
+def latency_benchmark(engines, auto, golden, repeats=3):
+    """p50/p95/p99 of each query stage (embed, search, format, llm) and of the whole ``query`` call.
+
+    Single-domain questions go to their domain engine, mixed ones to the Auto router.
+    """
+    samples = {stage: [] for stage in ("embed", "search", "format", "llm", "query")}
+    prompt_tokens = []
+    for _ in range(repeats):
+        for q in golden["questions"]:
+            question = q["question"]
+            engine = engines.get(q["domain"], auto)
+
+            start = time.perf_counter()
+            embedding = engine.embedding_function.embed_query(question)
+            samples["embed"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            if engine is auto:
+                _, docs, routed_engine = auto.select(question, embedding)
+                prompt_engine = routed_engine or auto
+                docs = prompt_engine._rerank(question, docs)
+            else:
+                docs = engine._retrieve(question, embedding)
+                prompt_engine = engine
+            samples["search"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            messages = prompt_engine.prompt_template.format_messages(
+                context=prompt_engine._format_docs(docs), chat_history=NO_HISTORY, question=question)
+            samples["format"].append(time.perf_counter() - start)
+            prompt_tokens.append(sum(count_tokens(m.content) for m in messages))
+
+            start = time.perf_counter()
+            engine.llm.invoke(messages)
+            samples["llm"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            engine.query(question)
+            samples["query"].append(time.perf_counter() - start)
+    report = {stage: percentiles(values) for stage, values in samples.items()}
+    report["prompt_tokens"] = {"mean": float(np.mean(prompt_tokens)), "max": int(np.max(prompt_tokens))}
+    return report
+
+
+def write_text_pdf(path, pages, width=90):
+    """Write a minimal text-only PDF (one string per page) that pypdf can extract"""
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def wrap(text):
+        lines, line = [], ""
+        for word in text.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        return lines + ([line] if line else [])
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in pages:
+        body = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(f"({escape(line)}) '" for line in wrap(text)) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def ingestion_benchmark(directory, golden, embedding_function, copies=10):
+    """Throughput of ``ingest_docs`` and ``DocumentProcessor.process_and_ingest`` on copies of the golden corpus.
+
+    Every copy has unique text, so nothing is served from the chunk or embedding caches, and the
+    near-duplicate filter is off. ``ingest_docs_dedup`` runs the same copies with it on.
+    """
+    domain = DOMAINS["CFD"]
+    ingest = _load_module("benchmark_cfd_ingest", os.path.join(domain["package_dir"], "ingest.py"))
+    documents = [doc for copy in range(copies) for doc in golden_documents(golden, "CFD", copy)]
+    start = time.perf_counter()
+    with quiet():
+        stats = ingest.ingest_docs(documents=documents, persist_directory=os.path.join(directory, "ingest", "chroma_db"),
+                                   embedding_function=embedding_function, near_duplicate_threshold=None)
+    wall = time.perf_counter() - start
+    report = {"ingest_docs": {"documents": stats["documents"], "chunks": stats["chunks"], "wall_s": wall,
+                              "chunks_per_s": stats["chunks"] / wall if wall else 0.0}}
+
+    start = time.perf_counter()
+    with quiet():
+        stats = ingest.ingest_docs(documents=documents, persist_directory=os.path.join(directory, "dedup", "chroma_db"),
+                                   embedding_function=embedding_function)
+    wall = time.perf_counter() - start
+    report["ingest_docs_dedup"] = {"documents": stats["documents"], "chunks": stats["chunks"],
+                                   "added": stats["added"], "near_duplicates": stats["near_duplicates"],
+                                   "wall_s": wall, "chunks_per_s": stats["chunks"] / wall if wall else 0.0}
+
+    from assistant_core.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor(
+        persist_directory=os.path.join(directory, "uploads", "chroma_db"),
+        embedding_function=embedding_function,
+        collection_name=domain["collection"],
+    )
+    processor.near_duplicate_threshold = None
+    pdf_dir = os.path.join(directory, "pdfs")
+    os.makedirs(pdf_dir, exist_ok=True)
+    paths = []
+    pages = chunks = 0
+    for copy in range(copies):
+        texts = [doc.page_content for doc in golden_documents(golden, "OpenFOAM", copy)]
+        paths.append(os.path.join(pdf_dir, f"golden_{copy}.pdf"))
+        write_text_pdf(paths[-1], texts)
+        pages += len(texts)
+
+    start = time.perf_counter()
+    for path in paths:
+        with quiet():
+            chunks += processor.process_and_ingest(path, "pdf")
+    wall = time.perf_counter() - start
+    report["process_and_ingest"] = {"files": copies, "pages": pages, "chunks": chunks, "wall_s": wall,
+                                    "pages_per_s": pages / wall if wall else 0.0,
+                                    "chunks_per_s": chunks / wall if wall else 0.0}
+    return report
@@ -0,0 +1,55 @@
+import json
+
+from assistant_core.batch import completed_ids, run_batch
+from assistant_core.fakes import FakeEmbeddings
+from assistant_core.tracing import Trace
+
+
+class StandInEngine:
+    """Answers every question, or only with passages while ``llm_down`` is set"""
+
+    def __init__(self):
+        self.embedding_function = FakeEmbeddings()
+        self.llm_down = False
+        self.asked = []
+
+    def is_ready(self):
+        return True
+
+    def query_with_trace(self, question, embedding=None):
+        self.asked.append(question)
+        trace = Trace("CFD", question)
+        if self.llm_down:
+            trace.count("llm_fallback", 1)
+            return "top passages", trace
+        return f"answer to {question}", trace
+
+
+class StandInRegistry:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get_engine(self, mode):
+        return self.engine
+
+
+def test_fallback_answers_are_counted_apart_and_retried(tmp_path):
+    engine = StandInEngine()
+    registry = StandInRegistry(engine)
+    items = [{"id": str(i), "question": f"question {i}", "mode": "CFD"} for i in range(3)]
+    output = str(tmp_path / "answers.jsonl")
+
+    engine.llm_down = True
+    stats = run_batch(items[:2], output, registry)
+    assert (stats["answered"], stats["fallback"], stats["failed"]) == (0, 2, 0)
+    assert completed_ids(output) == set()
+
+    engine.llm_down = False
+    stats = run_batch(items, output, registry)
+    assert (stats["skipped"], stats["answered"], stats["fallback"]) == (0, 3, 0)
+    assert completed_ids(output) == {"0", "1", "2"}
+    assert run_batch(items, output, registry)["skipped"] == 3
+
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["fallback"] for record in records] == [True, True, False, False, False]
@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+
+from assistant_core.context import DENSE_RELEVANCE_KEY, DOCUMENT_HASH_KEY, RANK_FUSED_KEY, RELEVANCE_KEY, ContextPacker
+
+
+def chunk(name, relevance, dense=None, fused=False):
+    metadata = {"source": name, RELEVANCE_KEY: relevance}
+    if dense is not None:
+        metadata[DENSE_RELEVANCE_KEY] = dense
+    if fused:
+        metadata[RANK_FUSED_KEY] = True
+    return Document(page_content=f"{name} text", metadata=metadata)
+
+
+def sources(docs):
+    return [doc.metadata["source"] for doc in docs]
+
+
+def test_margin_drops_weak_dense_matches():
+    packer = ContextPacker(min_relative_score=0.5)
+    docs = [chunk("a", 0.8), chunk("b", 0.5), chunk("c", 0.3)]
+    packed, stats = packer.pack(docs)
+    assert sources(packed) == ["a", "b"] and stats["below_margin"] == 1
+
+
+def test_margin_on_fused_chunks_uses_dense_relevance_and_keeps_keyword_hits():
+    packer = ContextPacker(min_relative_score=0.5)
+    # Fused scores: ~2/61 for chunks both retrievers found, at most 1/61 for the rest
+    docs = [chunk("both", 2 / 61, dense=0.8, fused=True),
+            chunk("keyword only", 1 / 61, fused=True),
+            chunk("dense close", 1 / 62, dense=0.6, fused=True),
+            chunk("dense far", 1 / 63, dense=0.3, fused=True)]
+    packed, stats = packer.pack(docs)
+    assert sources(packed) == ["both", "keyword only", "dense close"]
+    assert stats["below_margin"] == 1
+
+
+def test_chunks_of_same_named_documents_do_not_merge():
+    packer = ContextPacker(min_relative_score=0)
+    docs = [Document(page_content="first upload text", metadata={"source": "notes.pdf", "page": 0, "start_index": 0,
+                                                                   DOCUMENT_HASH_KEY: "aaaa", RELEVANCE_KEY: 0.9}),
+            Document(page_content="second upload text", metadata={"source": "notes.pdf", "page": 0, "start_index": 0,
+                                                                    DOCUMENT_HASH_KEY: "bbbb", RELEVANCE_KEY: 0.8})]
+    packed, stats = packer.pack(docs)
+    assert [doc.page_content for doc in packed] == ["first upload text", "second upload text"]
+    assert stats["merged"] == 0
@@ -0,0 +1,28 @@
+from assistant_core.context import DOCUMENT_HASH_KEY
+from assistant_core.document_processor import DocumentProcessor
+from assistant_core.fakes import FakeEmbeddings
+from benchmarks.suite import write_text_pdf
+
+
+def test_same_named_uploads_stay_apart(tmp_path):
+    files = []
+    for number, text in enumerate(["The PISO algorithm corrects pressure twice per time step.",
+                                   "The SIMPLE algorithm under-relaxes pressure for steady flows."]):
+        path = tmp_path / f"{number}.pdf"
+        write_text_pdf(str(path), [text])
+        files.append(("notes.pdf", path.read_bytes()))
+
+    processor = DocumentProcessor(persist_directory=str(tmp_path / "store" / "chroma_db"),
+                                  embedding_function=FakeEmbeddings())
+    events = list(processor.process_uploads(files, max_workers=1))
+    assert [event["chunks"] for event in events if event["event"] == "file"] == [1, 1]
+    assert events[-1]["added"] == 2
+    # Same name, different files: the packer must not merge their chunks
+    assert len({metadata[DOCUMENT_HASH_KEY] for metadata in _stored_metadata(processor)}) == 2
+
+
+def _stored_metadata(processor):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=processor.persist_directory)
+    return client.get_collection(processor.collection_name).get(include=["metadatas"])["metadatas"]
@@ -0,0 +1,113 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from assistant_core.fetch import Fetcher, FetchResult, HostRateLimiter, response_validators, web_document
+
+PAGE = b"<html lang='en'><head><title>PISO</title></head><body>Pressure-implicit splitting</body></html>"
+ETAG = '"piso-v1"'
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the ingestion sources: a page with an ETag, a flaky page and a missing page"""
+
+    hits = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            hits = self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == "/missing":
+            return self._send(404, b"not found")
+        if self.path.startswith("/flaky") and hits == 1:
+            return self._send(503, b"try again")
+        if self.headers.get("If-None-Match") == ETAG:
+            return self._send(304, b"")
+        self._send(200, PAGE, {"ETag": ETAG, "Content-Type": "text/html; charset=utf-8"})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandIn.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetcher(tmp_path, **kwargs):
+    return Fetcher(cache_dir=str(tmp_path / "http_cache"), backoff=0, timeout=5,
+                   rate_limiter=HostRateLimiter(default_interval=0), **kwargs)
+
+
+def test_fetch_records_and_replays_offline(server, tmp_path):
+    result = fetcher(tmp_path).fetch(f"{server}/page")
+    assert result.ok and not result.from_cache and result.attempts == 1
+    assert web_document(result).metadata["title"] == "PISO"
+
+    replayed = fetcher(tmp_path, offline=True).fetch(f"{server}/page")
+    assert replayed.from_cache and replayed.body == PAGE
+    assert StandIn.hits["/page"] == 1
+    assert fetcher(tmp_path, offline=True).fetch(f"{server}/other").error == "not in offline cache"
+
+
+def test_fetch_retries_server_errors(server, tmp_path):
+    result = fetcher(tmp_path).fetch(f"{server}/flaky")
+    assert result.ok and result.attempts == 2
+    assert StandIn.hits["/flaky"] == 2
+
+
+def test_fetch_does_not_retry_client_errors(server, tmp_path):
+    result = fetcher(tmp_path).fetch(f"{server}/missing")
+    assert not result.ok and result.error == "HTTP 404" and result.attempts == 1
+
+
+def test_conditional_fetch_of_an_unchanged_page(server, tmp_path):
+    client = fetcher(tmp_path)
+    first = client.fetch(f"{server}/page")
+    again = client.fetch(f"{server}/page", validators=response_validators(first))
+    assert again.not_modified and not again.body
+
+
+def test_network_failure_falls_back_to_the_recorded_copy(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        unreachable = f"http://127.0.0.1:{s.getsockname()[1]}/page"
+    client = fetcher(tmp_path, retries=1)
+    client.cache.put(FetchResult(unreachable, status=200, body=PAGE))
+    result = client.fetch(unreachable)
+    assert result.from_cache and result.body == PAGE and result.attempts == 2
+
+
+def test_fetch_all_uses_one_session_per_thread(server, tmp_path):
+    client = fetcher(tmp_path, max_workers=4)
+    sessions = set()
+    fetch = client.fetch
+
+    def recording_fetch(url, validators=None):
+        sessions.add((threading.get_ident(), id(client.session)))
+        return fetch(url, validators)
+
+    client.fetch = recording_fetch
+    urls = [f"{server}/page?n={n}" for n in range(20)]
+    results = list(client.fetch_all(urls))
+    assert sorted(r.url for r in results) == sorted(urls) and all(r.ok for r in results)
+    threads = {thread for thread, _ in sessions}
+    assert len(sessions) == len(threads) > 1
+    # The pool's sessions are closed once it is done
+    assert client._sessions == []
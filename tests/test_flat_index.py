@@ -0,0 +1,30 @@
+import os
+
+from assistant_core import flat_index
+from assistant_core.collection_state import collection_version, mark_collection_changed
+from assistant_core.fakes import FakeEmbeddings
+from assistant_core.flat_index import export_collection, flat_index_root, open_current_flat_index
+from benchmarks.suite import build_store, load_golden_set, quiet
+
+
+def test_stale_export_keeps_the_newer_one(tmp_path, monkeypatch):
+    store = str(tmp_path / "chroma_db")
+    with quiet():
+        build_store(store, load_golden_set(), FakeEmbeddings())
+    old_version = collection_version(store, "cfd")
+    export_collection(store, "cfd")
+    mark_collection_changed(store, "cfd")
+    newer = export_collection(store, "cfd")
+
+    # An export that read the old version before the collection changed, and finishes last
+    versions = iter([old_version])
+    real_version = flat_index.collection_version
+    monkeypatch.setattr(flat_index, "collection_version",
+                        lambda *args: next(versions, None) or real_version(*args))
+    stale = export_collection(store, "cfd")
+
+    assert sorted(os.listdir(flat_index_root(store, "cfd"))) == sorted([os.path.basename(newer),
+                                                                        os.path.basename(stale)])
+    index = open_current_flat_index(store, "cfd")
+    assert index is not None and index.directory == newer
+    index.close()
@@ -0,0 +1,29 @@
+import pytest
+
+from assistant_core import ocr
+from assistant_core.ocr import OCREngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ocr(image, lang, max_side):
+        calls.append(image)
+        return f"text of {image!r}"
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a single image must not start worker processes")
+
+    monkeypatch.setattr(ocr, "_ocr_worker", fake_ocr)
+    monkeypatch.setattr(ocr, "ProcessPoolExecutor", no_pool)
+    engine = OCREngine(str(tmp_path / "ocr_cache.sqlite3"), workers=8)
+    engine.calls = calls
+    return engine
+
+
+def test_single_image_is_ocred_in_process_and_cached(engine):
+    assert engine.ocr_image(b"scan") == "text of b'scan'"
+    assert engine.ocr_image(b"scan") == "text of b'scan'"
+    assert engine.calls == [b"scan"]
+    assert engine.last_stats["cached"] == 1
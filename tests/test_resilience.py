@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from assistant_core import resilience
+from assistant_core.fakes import FlakyChatModel
+from assistant_core.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMUnavailable, ResilientLLM
+
+# With this seed and a 50% rate, the stub's first call fails (or is slow) and its second one doesn't
+FIRST_CALL_BAD_SEED = 1
+
+
+@pytest.fixture(autouse=True)
+def short_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE_S", 0.01)
+
+
+def test_failed_attempt_is_retried():
+    stub = FlakyChatModel(latency=0.01, slow_rate=0, error_rate=0.5, seed=FIRST_CALL_BAD_SEED)
+    llm = ResilientLLM(stub, timeout_s=1, retries=2, hedge=False)
+    assert llm.invoke([]).content == stub.response
+    stats = llm.stats()
+    assert (stats["attempts"], stats["retries"], stats["errors"], stats["failed"]) == (2, 1, 1, 0)
+
+
+def test_gives_up_after_the_last_retry():
+    stub = FlakyChatModel(latency=0.01, slow_rate=0, error_rate=1.0)
+    llm = ResilientLLM(stub, timeout_s=1, retries=2, hedge=False)
+    with pytest.raises(LLMUnavailable):
+        llm.invoke([])
+    assert stub.calls == 3 and llm.stats()["failed"] == 1
+    assert llm.breaker.consecutive_failures == 1 and llm.breaker.state == CLOSED
+
+
+def test_total_deadline_bounds_retries():
+    stub = FlakyChatModel(latency=0.01, slow_rate=1.0, slow_latency=2.0, error_rate=0)
+    llm = ResilientLLM(stub, timeout_s=0.3, total_timeout_s=0.5, retries=5, hedge=False)
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        llm.invoke([])
+    assert time.monotonic() - start < 0.8
+    assert llm.stats()["attempts"] == 2 and llm.stats()["timeouts"] == 2
+
+
+def test_slow_attempt_is_hedged():
+    stub = FlakyChatModel(latency=0.05, slow_rate=0.5, slow_latency=3.0, error_rate=0, seed=FIRST_CALL_BAD_SEED)
+    llm = ResilientLLM(stub, timeout_s=2, retries=0, hedge_after_s=0.05)
+    start = time.monotonic()
+    assert llm.invoke([]).content == stub.response
+    assert time.monotonic() - start < 1.0
+    stats = llm.stats()
+    assert (stats["attempts"], stats["hedges"], stats["hedge_wins"]) == (1, 1, 1)
+
+
+def test_stream_is_hedged_until_its_first_token():
+    stub = FlakyChatModel(latency=0.05, slow_rate=0.5, slow_latency=3.0, error_rate=0, seed=FIRST_CALL_BAD_SEED)
+    llm = ResilientLLM(stub, timeout_s=2, retries=0, hedge_after_s=0.05)
+    assert "".join(chunk.content for chunk in llm.stream([])) == stub.response
+    assert llm.stats()["hedge_wins"] == 1
+
+
+def test_breaker_opens_admits_one_probe_and_closes():
+    stub = FlakyChatModel(latency=0.2, slow_rate=0, error_rate=0)
+    llm = ResilientLLM(stub, timeout_s=1, retries=0, hedge=False, breaker=CircuitBreaker(failures=2, reset_s=0.2))
+    stub.down = True
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            llm.invoke([])
+    assert llm.breaker.state == OPEN
+    with pytest.raises(LLMUnavailable):
+        llm.invoke([])
+    assert stub.calls == 2 and llm.stats()["rejected"] == 1
+
+    time.sleep(0.25)
+    stub.down = False
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(llm.invoke([]).content == stub.response)
+        except LLMUnavailable:
+            outcomes.append(False)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    assert llm.breaker.state == HALF_OPEN
+    for thread in threads:
+        thread.join()
+    # Only the probe reached the model; the calls meanwhile were turned away
+    assert sorted(outcomes) == [False, False, False, True] and stub.calls == 3
+    assert llm.breaker.state == CLOSED
+    assert llm.invoke([]).content == stub.response
+
+
+def test_failed_probe_opens_the_breaker_again():
+    stub = FlakyChatModel(latency=0.01, slow_rate=0, error_rate=0)
+    llm = ResilientLLM(stub, timeout_s=1, retries=2, hedge=False, breaker=CircuitBreaker(failures=1, reset_s=0.1))
+    stub.down = True
+    with pytest.raises(LLMUnavailable):
+        llm.invoke([])
+    calls = stub.calls
+    time.sleep(0.15)
+    with pytest.raises(LLMUnavailable):
+        llm.invoke([])
+    # The probe gets a single attempt, no retries
+    assert stub.calls == calls + 1
+    assert llm.breaker.state == OPEN and llm.breaker.times_opened == 2
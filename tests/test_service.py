@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+from assistant_core.fakes import FakeChatModel, FlakyChatModel
+from assistant_core.resilience import CLOSED, ResilientLLM
+from assistant_core.service import SERVICE_KEY, Coalescer, LLMSlots, create_app
+
+
+class StandInEngine:
+    """Streams numbered parts slowly, like a model generating an answer"""
+
+    def __init__(self, parts=20, delay=0.02):
+        self.parts = parts
+        self.delay = delay
+        self.streams = 0
+
+    def is_ready(self):
+        return True
+
+    async def aquery_stream(self, question, chat_history=None):
+        self.streams += 1
+        for i in range(self.parts):
+            await asyncio.sleep(self.delay)
+            yield f"part {i} "
+
+
+class StandInRegistry:
+    def __init__(self, engine):
+        self.engine = engine
+        self.llm = None
+
+    def get_engine(self, mode):
+        return self.engine
+
+    def warm_up(self, mode):
+        pass
+
+
+def test_cancelled_wait_gives_its_slot_back():
+    slots = LLMSlots(FakeChatModel(first_token_delay=0.1), limit=1)
+
+    async def scenario():
+        holder = asyncio.ensure_future(slots.ainvoke([]))
+        await asyncio.sleep(0.02)
+        waiter = asyncio.ensure_future(slots.ainvoke([]))
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        await holder
+        # The cancelled waiter's thread got the slot after the holder released it
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert slots.stats()["active"] == 0 and slots.stats()["waiting"] == 0
+    assert slots._slots.acquire(blocking=False)
+    assert slots.llm.calls == 1
+
+
+def test_waiting_for_a_slot_does_not_count_toward_llm_deadlines():
+    stub = FlakyChatModel(latency=0.2, slow_rate=0, error_rate=0)
+    app = create_app(ResilientLLM(stub, timeout_s=0.5), max_llm_calls=2)
+    registry = app[SERVICE_KEY].registry
+    llm = registry.shared_llm()
+    assert llm is app[SERVICE_KEY].llm_slots
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        answers = list(pool.map(lambda _: llm.invoke([]).content, range(12)))
+    assert answers == [stub.response] * 12
+    stats = registry.llm_stats()
+    assert (stats["failed"], stats["timeouts"], stats["breaker"]) == (0, 0, CLOSED)
+    assert app[SERVICE_KEY].llm_slots.stats()["calls"] == 12
+
+
+def test_identical_requests_share_one_computation():
+    coalescer = Coalescer()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "42"
+
+    async def scenario():
+        return await asyncio.gather(*(coalescer.run("key", answer) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert [result for result, _ in results] == ["42"] * 3
+    assert [shared for _, shared in results] == [False, True, True]
+    assert len(calls) == 1 and coalescer.in_flight() == 0
+
+
+def test_stream_client_disconnect_is_not_an_error():
+    engine = StandInEngine()
+    app = create_app(registry=StandInRegistry(engine))
+
+    async def scenario():
+        # Served like web.run_app does, which (unlike aiohttp's TestServer) doesn't cancel handlers on disconnect
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/query/stream"
+        body = {"question": "What is PISO?", "mode": "CFD"}
+        try:
+            async with aiohttp.ClientSession() as session:
+                # The first client leaves after one part; the second one shares the answer and reads it all
+                first = await session.post(url, json=body)
+                await first.content.readany()
+                second = await session.post(url, json=body)
+                first.close()
+                text = await second.text()
+                assert second.headers["X-Coalesced"] == "true"
+        finally:
+            await runner.cleanup()
+        return text
+
+    text = asyncio.run(scenario())
+    assert text.endswith("part 19 ") and "[error" not in text
+    assert engine.streams == 1
+    assert app[SERVICE_KEY].counts["errors"] == 0
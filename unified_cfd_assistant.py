@@ -1,10 +1,21 @@
 import os
 import sys
-import streamlit as st
-from dotenv import load_dotenv
 import json
 from datetime import datetime
-import importlib.util
+
+from assistant_core.startup import IMPORT, get_startup_profile
+
+# Only light modules here: LangChain, Chroma, Gemini and the upload libraries load on first use
+profile = get_startup_profile()
+with profile.step("import streamlit", IMPORT):
+    import streamlit as st
+with profile.step("import dotenv", IMPORT):
+    from dotenv import load_dotenv
+with profile.step("import assistant_core", IMPORT):
+    from assistant_core.config import AUTO_MODE, DOMAINS, STORE_DIRECTORY
+    from assistant_core.engines import get_registry
+    from assistant_core.kb_stats import get_kb_stats
+    from assistant_core.tracing import STAGES, get_tracer
 
 load_dotenv()
 
@@ -59,6 +70,11 @@ st.markdown("""
         color: white;
     }
     
+    .mode-auto {
+        background: linear-gradient(135deg, #1e88e5 0%, #c8102e 100%);
+        color: white;
+    }
+    
     .feature-list {
         list-style: none;
         padding: 0;
@@ -96,11 +112,18 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Radio label -> mode; Auto searches every domain collection of the shared store
+MODE_LABELS = {"Auto (CFD + OpenFOAM)": AUTO_MODE, "CFD GPT": "CFD", "OpenFOAM GPT": "OpenFOAM"}
+MODE_BADGES = {AUTO_MODE: ("mode-auto", "🧭"), "CFD": ("mode-cfd", "🌊"), "OpenFOAM": ("mode-openfoam", "⚙️")}
+
+# Queries shown in the sidebar's recent requests panel
+RECENT_TRACES = 10
+
 def export_chat_history():
     """Export chat history as JSON"""
     if "messages" in st.session_state and st.session_state.messages:
         export_data = {
-            "mode": st.session_state.get("mode", "CFD"),
+            "mode": st.session_state.get("mode", AUTO_MODE),
             "exported_at": datetime.now().isoformat(),
             "messages": st.session_state.messages
         }
@@ -110,9 +133,10 @@ def export_chat_history():
 def main():
     # Initialize session state
     if "mode" not in st.session_state:
-        st.session_state.mode = "CFD"
+        st.session_state.mode = AUTO_MODE
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    stats_pending = False
     
     # Header
     st.markdown("""
@@ -127,23 +151,23 @@ def main():
         st.markdown("### 🎛️ Mode Selection")
         
         # Mode selector
+        labels = list(MODE_LABELS)
         mode = st.radio(
             "Choose Assistant",
-            ["CFD GPT", "OpenFOAM GPT"],
-            index=0 if st.session_state.mode == "CFD" else 1,
-            help="Switch between general CFD and OpenFOAM-specific assistance"
+            labels,
+            index=list(MODE_LABELS.values()).index(st.session_state.mode),
+            help="Auto picks the best knowledge base per question; CFD and OpenFOAM search only their own"
         )
         
-        # Update mode and clear chat if changed
-        new_mode = "CFD" if mode == "CFD GPT" else "OpenFOAM"
-        if new_mode != st.session_state.mode:
-            st.session_state.mode = new_mode
-            st.session_state.messages = []
-            st.rerun()
+        # All modes share one store, so switching keeps the conversation
+        st.session_state.mode = MODE_LABELS[mode]
+        
+        # Load the embedding model and engine in the background while the rest of the page is drawn
+        registry = get_registry()
+        registry.warm_up(st.session_state.mode)
         
         # Display current mode badge
-        badge_class = "mode-cfd" if st.session_state.mode == "CFD" else "mode-openfoam"
-        icon = "🌊" if st.session_state.mode == "CFD" else "⚙️"
+        badge_class, icon = MODE_BADGES[st.session_state.mode]
         st.markdown(f'<div class="mode-badge {badge_class}">{icon} {mode} Active</div>', unsafe_allow_html=True)
         
         st.markdown("---")
@@ -151,7 +175,15 @@ def main():
         # Mode-specific capabilities
         st.markdown("### 🎯 Capabilities")
         
-        if st.session_state.mode == "CFD":
+        if st.session_state.mode == AUTO_MODE:
+            st.markdown("""
+            <ul class="feature-list">
+                <li>Routes each question to CFD or OpenFOAM knowledge</li>
+                <li>Combines both for theory-plus-setup questions</li>
+                <li>One embedding per question, both collections searched in parallel</li>
+            </ul>
+            """, unsafe_allow_html=True)
+        elif st.session_state.mode == "CFD":
             st.markdown("""
             <ul class="feature-list">
                 <li>Fundamental CFD concepts</li>
@@ -181,22 +213,67 @@ def main():
         # Knowledge base status
         st.markdown("### 📊 Status")
         
-        db_path = "./cfd_gpt/chroma_db" if st.session_state.mode == "CFD" else "./openfoam_gpt/chroma_db"
+        shown = list(DOMAINS) if st.session_state.mode == AUTO_MODE else [st.session_state.mode]
         
-        if os.path.exists(db_path):
+        if os.path.exists(STORE_DIRECTORY):
             st.success(f"✓ {mode} Knowledge Loaded")
-            try:
-                import chromadb
-                client = chromadb.PersistentClient(path=db_path)
-                collections = client.list_collections()
-                if collections:
-                    count = collections[0].count()
-                    st.info(f"📚 {count} chunks")
-            except:
-                pass
+            # Cached per collection version: reruns don't query the database
+            kb_stats = get_kb_stats()
+            disk_bytes = None
+            for domain in shown:
+                stats = kb_stats.get(domain, wait=False)
+                if stats is None:
+                    if registry.warming():
+                        st.caption(f"⏳ Loading the {domain} knowledge base...")
+                        stats_pending = True
+                    continue
+                st.info(f"📚 {domain}: {stats['chunks']} chunks from {len(stats['by_source'])} sources")
+                types = " · ".join(f"{kind} {count}" for kind, count in stats["by_type"].items())
+                last_ingest = (datetime.fromtimestamp(stats["last_ingest"]).strftime("%Y-%m-%d %H:%M")
+                               if stats["last_ingest"] else "unknown")
+                st.caption(f"{types} · last ingest {last_ingest}")
+                disk_bytes = stats["disk_bytes"]
+            if disk_bytes is not None:
+                st.caption(f"💾 {disk_bytes / 1e6:.1f} MB on disk")
         else:
             st.warning(f"⚠ {mode} DB not found")
         
+        timings = registry.timings().get(st.session_state.mode)
+        if timings and timings["cold_start_s"] is not None:
+            warm = timings["warm_start_s"]
+            warm_text = f"{warm * 1000:.2f} ms" if warm is not None else "n/a"
+            st.caption(f"⏱️ Engine cold start {timings['cold_start_s']:.2f}s · warm start {warm_text}")
+        
+        # Per-stage timings of recent queries, to tell slow retrieval from slow generation
+        with st.expander("🔍 Recent requests"):
+            traces = get_tracer().recent(RECENT_TRACES)
+            if traces:
+                st.dataframe([
+                    {
+                        "time": trace["timestamp"][11:],
+                        "engine": trace["engine"] + (f" → {'+'.join(trace['route'])}" if trace["route"] else ""),
+                        "cached": trace["cached"],
+                        **{f"{stage} ms": round(trace["spans"][stage] * 1000, 1)
+                           for stage in STAGES if stage in trace["spans"]},
+                        "total ms": round((trace["total_s"] or 0) * 1000, 1),
+                        "chunks": trace["counters"].get("retrieved_chunks", 0),
+                        "prompt tokens": trace["counters"].get("prompt_tokens", 0),
+                    }
+                    for trace in traces
+                ], hide_index=True, use_container_width=True)
+                st.caption(f"Full traces: {get_tracer().jsonl_path}")
+            else:
+                st.caption("No requests yet")
+        
+        with st.expander("🚀 Startup profile"):
+            startup = profile.report()
+            st.dataframe([
+                {"step": step["name"], "kind": step["kind"], "at s": round(step["at_s"], 3),
+                 "ms": round(step["seconds"] * 1000, 1), "thread": step["thread"]}
+                for step in startup["steps"]
+            ], hide_index=True, use_container_width=True)
+            st.caption(f"Saved to {profile.path}")
+        
         st.markdown("---")
         
         # File upload
@@ -210,42 +287,44 @@ def main():
             label_visibility="collapsed"
         )
         
+        # Uploads go into one domain's collection; Auto mode asks which
+        if st.session_state.mode == AUTO_MODE:
+            upload_domain = st.selectbox("Add to", list(DOMAINS))
+        else:
+            upload_domain = st.session_state.mode
+        
         if uploaded_files:
             if st.button("🚀 Process Files", use_container_width=True):
-                # Import the correct processor based on mode using importlib
-                import importlib.util
-                
-                processor_path = f"./{st.session_state.mode.lower()}_gpt/document_processor.py"
-                spec = importlib.util.spec_from_file_location("doc_processor", processor_path)
-                doc_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(doc_module)
-                
-                processor = doc_module.DocumentProcessor(persist_directory=db_path)
+                from assistant_core.indexing import format_near_duplicate_report
+
+                # Reuse the cached processor (and its embedding model) for this domain
+                processor = registry.get_document_processor(upload_domain)
                 
                 with st.spinner("Processing..."):
                     total_chunks = 0
                     progress_bar = st.progress(0)
                     
-                    for i, uploaded_file in enumerate(uploaded_files):
-                        st.caption(f"Processing {uploaded_file.name}...")
-                        
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                            tmp_file.write(uploaded_file.read())
-                            tmp_path = tmp_file.name
-                        
-                        try:
-                            file_type = uploaded_file.name.split('.')[-1].lower()
-                            chunks = processor.process_and_ingest(tmp_path, file_type)
-                            total_chunks += chunks
-                            st.success(f"✓ {uploaded_file.name}: {chunks} chunks")
-                        except Exception as e:
-                            st.error(f"✗ {uploaded_file.name}: {str(e)}")
-                        finally:
-                            os.unlink(tmp_path)
-                        
-                        progress_bar.progress((i + 1) / len(uploaded_files))
+                    # Parse all files in parallel from memory, then embed and write them in one batch
+                    files = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+                    for event in processor.process_uploads(files):
+                        if event["event"] == "file":
+                            if event["error"]:
+                                st.error(f"✗ {event['name']}: {event['error']}")
+                            elif event["ocr_pages"]:
+                                st.success(f"✓ {event['name']}: {event['chunks']} chunks "
+                                           f"(OCR {event['ocr_pages']} page(s), {event['ocr_pages_per_s']:.1f} pages/s)")
+                            else:
+                                st.success(f"✓ {event['name']}: {event['chunks']} chunks")
+                            progress_bar.progress(event["done"] / event["total"])
+                        elif event["event"] == "indexing":
+                            st.caption(f"Embedding {event['chunks']} chunks...")
+                        elif event["event"] == "indexed":
+                            # Only chunks that were not stored already
+                            total_chunks = event["added"]
+                            if event["stats"].get("near_duplicates"):
+                                st.caption(f"♻️ {format_near_duplicate_report(event['stats'])}")
                     
+                    registry.refresh_engine(upload_domain)
                     st.balloons()
                     st.success(f"🎉 Added {total_chunks} chunks!")
         
@@ -275,22 +354,11 @@ def main():
         st.markdown("---")
         st.caption("CFD Assistant Suite v1.0")
 
-    # Initialize appropriate RAG pipeline using importlib
-    import importlib.util
-    
-    if st.session_state.mode == "CFD":
-        # Load CFD RAG module
-        spec = importlib.util.spec_from_file_location("cfd_rag", "./cfd_gpt/rag.py")
-        cfd_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(cfd_module)
-        rag = cfd_module.CFDRAG(persist_directory="./cfd_gpt/chroma_db")
+    if st.session_state.mode == AUTO_MODE:
+        placeholder_text = "🤔 Ask about CFD theory, OpenFOAM setup, or both..."
+    elif st.session_state.mode == "CFD":
         placeholder_text = "🤔 Ask me anything about CFD..."
     else:
-        # Load OpenFOAM RAG module
-        spec = importlib.util.spec_from_file_location("openfoam_rag", "./openfoam_gpt/rag.py")
-        openfoam_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(openfoam_module)
-        rag = openfoam_module.OpenFOAMRAG(persist_directory="./openfoam_gpt/chroma_db")
         placeholder_text = "🤔 Ask about OpenFOAM setup, solvers, or configuration..."
 
     # Display chat messages
@@ -298,8 +366,15 @@ def main():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
+    if profile.mark("first paint"):
+        profile.write()
+
     # Chat input
     if prompt := st.chat_input(placeholder_text):
+        # Get the RAG pipeline from the process-wide registry (built once, reused on every rerun);
+        # waits for the warm-up if it is still running
+        rag = registry.get_engine(st.session_state.mode)
+
         # Add user message
         st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
@@ -307,11 +382,22 @@ def main():
 
         # Generate response
         with st.chat_message("assistant"):
-            with st.spinner("🧠 Thinking..."):
-                full_response = rag.query(prompt, chat_history=st.session_state.messages[:-1])
-            st.markdown(full_response)
+            # Render tokens as they arrive instead of waiting for the whole answer. The timings and
+            # route come from this question's trace: the engine is shared with every other session
+            chunks, trace = rag.query_stream_with_trace(prompt, chat_history=st.session_state.messages[:-1])
+            full_response = st.write_stream(chunks)
+            if trace.total_s is not None:
+                route = ""
+                if st.session_state.mode == AUTO_MODE and trace.route:
+                    route = f" · 🧭 {' + '.join(trace.route)}"
+                st.caption(f"⚡ First token {trace.ttft_s:.2f}s · total {trace.total_s:.2f}s{route}")
         
         st.session_state.messages.append({"role": "assistant", "content": full_response})
 
+    # The page is on screen: wait for the warm-up, then draw it again with the knowledge base stats
+    if stats_pending:
+        registry.wait_for_warm_up()
+        st.rerun()
+
 if __name__ == "__main__":
     main()